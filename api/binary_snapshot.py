@@ -0,0 +1,347 @@
+"""
+バイナリスナップショットモジュール
+
+menus.jsonをパースしてインデックスまで構築済みの状態を、marshal形式のバイナリファイルとして
+menus.jsonの隣に保存・読み込みします。サーバーレス環境のコールドスタートで
+JSONのパースとインデックス構築を省略するために使用します。
+
+ファイル形式:
+    MAGIC（8バイト） + ヘッダー長（4バイト、リトルエンディアン） + marshal(ヘッダー辞書) + 本体
+
+本体:
+    marshal(インデックス辞書) + 遅延インデックス（インデックスごとのmarshal）
+    + マップするインデックス（インデックスごとにオフセットテーブル + 要素ごとのmarshal、辞書は整数キーのarray("Q")を前置）
+    + オフセットテーブル（array("Q")） + レコード（メニューごとのmarshal）
+
+遅延インデックス（MenuSnapshot.DEFERRED_INDEXES）は読み込み時にはデコードせず、初回アクセス時にデコードします
+（メモリマップ時はそれまでヒープを使いません）。
+マップするインデックス（MenuSnapshot.MAPPED_INDEXES）は、メモリマップ時は要素をアクセスごとにデコードする
+シーケンス（辞書は整数にしたキーを二分探索する読み取り専用の辞書）としてファイル上に残します。
+
+レコードはメニューごとに独立してmarshalしているため、オフセットテーブルを使って
+任意の1件だけをデコードできます（メモリマップ時の遅延読み込み）。
+複数回出現する文字列（キー・パーク・エリア・タグなど）はインターンして書き出すため、
+読み込み後はレコード間・インデックス間で同じ文字列オブジェクトを共有します。
+"""
+
+import marshal
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+from api.snapshot import FileIdentity, MenuSnapshot, index_code_fingerprint
+
+MAGIC = b"DMSNAP1\n"
+FORMAT_VERSION = 8
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def binary_snapshot_path(data_path: Path) -> Path:
+    """JSONファイルに対応するバイナリスナップショットのパス（例: data/menus.snapshot）"""
+    return data_path.with_suffix(".snapshot")
+
+
+class MappedRecords(Sequence):
+    """
+    メモリマップしたレコード領域の読み取り専用シーケンス
+
+    要素へのアクセスごとにその1件だけをデコードして新しい辞書を返します。
+    ページはOSのページキャッシュと共有されるため、同じファイルをマップした複数のワーカー間で共有されます。
+    """
+
+    __slots__ = ("_buffer", "_base", "_offsets")
+
+    def __init__(self, buffer: memoryview, base: int, offsets: array):
+        """
+        初期化
+
+        Args:
+            buffer: ファイル全体のバッファ
+            base: レコード領域の開始位置
+            offsets: レコード領域内の各レコードの開始位置（末尾に終端位置を含む）
+        """
+        self._buffer = buffer
+        self._base = base
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        start = self._base + self._offsets[index]
+        end = self._base + self._offsets[index + 1]
+        return marshal.loads(self._buffer[start:end])
+
+
+class MappedIndex(Mapping):
+    """
+    昇順に並べた整数のキーと値のレコードを参照する、短い文字列キーの読み取り専用の辞書
+
+    キーは _encode_key で順序を保った整数にしてファイル上の array("Q") に並べるため、
+    デコードせずに二分探索できます。見つかった値だけをデコードするため、ヒープにはキー・値を保持しません。
+    """
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, keys: memoryview, values: MappedRecords):
+        """
+        初期化
+
+        Args:
+            keys: 昇順に並べた _encode_key の結果（array("Q") と同じ形式）
+            values: キーと同じ順序の値のレコード
+        """
+        self._keys = keys.cast("Q")
+        self._values = values
+
+    def __getitem__(self, key):
+        if not isinstance(key, str) or not 0 < len(key) <= _KEY_MAX_CHARS:
+            raise KeyError(key)
+        code = _encode_key(key)
+        position = bisect_left(self._keys, code)
+        if position < len(self._keys) and self._keys[position] == code:
+            return self._values[position]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return map(_decode_key, self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+_KEY_MAX_CHARS = 2
+_KEY_SIZE = 8
+
+
+def _encode_key(key: str) -> int:
+    """
+    _KEY_MAX_CHARS 文字以下の文字列を、文字列の順序を保った64ビット整数にする
+
+    UTF-32（ビッグエンディアン）の末尾をNULで埋めて整数として読むため、整数の大小がコードポイント順と一致します。
+
+    Raises:
+        ValueError: 空文字列、または _KEY_MAX_CHARS 文字を超える場合
+    """
+    if not 0 < len(key) <= _KEY_MAX_CHARS:
+        raise ValueError(f"mapped index keys must have 1 to {_KEY_MAX_CHARS} characters: {key!r}")
+    return int.from_bytes(key.encode("utf-32-be").ljust(_KEY_SIZE, b"\0"), "big")
+
+
+def _decode_key(code: int) -> str:
+    """_encode_key の逆変換"""
+    return code.to_bytes(_KEY_SIZE, "big").decode("utf-32-be").rstrip("\0")
+
+
+def _record_table(values) -> Tuple[bytes, bytes]:
+    """値ごとにmarshalしたレコードと、そのオフセットテーブル（array("Q")、末尾に終端位置を含む）"""
+    records = [marshal.dumps(value) for value in values]
+    offsets = array("Q", [0])
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    return offsets.tobytes(), b"".join(records)
+
+
+def _map_records(buffer: memoryview, start: int, count: int) -> Tuple[MappedRecords, int]:
+    """
+    start から始まるオフセットテーブルとレコードを参照するシーケンス
+
+    Args:
+        buffer: ファイル全体のバッファ
+        start: オフセットテーブルの開始位置
+        count: レコード数
+
+    Returns:
+        (シーケンス, レコード領域の終端位置)
+
+    Raises:
+        ValueError: ファイルが途中で切れている場合
+    """
+    records_start = start + (count + 1) * array("Q").itemsize
+    offsets = array("Q")
+    offsets.frombytes(buffer[start:records_start])
+    if len(offsets) != count + 1 or records_start + offsets[-1] > len(buffer):
+        raise ValueError("truncated binary snapshot")
+    return MappedRecords(buffer, records_start, offsets), records_start + offsets[-1]
+
+
+def _count_strings(value, counter: Counter) -> None:
+    """値に含まれる文字列の出現回数を数える（辞書のキーを含む）"""
+    if isinstance(value, str):
+        counter[value] += 1
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            _count_strings(k, counter)
+            _count_strings(v, counter)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _count_strings(v, counter)
+
+
+def _intern_strings(value, table: Dict[str, str]):
+    """値に含まれる文字列のうち、テーブルにあるものをインターン済みの文字列に置き換える"""
+    if isinstance(value, str):
+        return table.get(value, value)
+    if isinstance(value, dict):
+        return {_intern_strings(k, table): _intern_strings(v, table) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern_strings(v, table) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_intern_strings(v, table) for v in value)
+    return value
+
+
+def write_binary_snapshot(snapshot: MenuSnapshot, path: Path) -> int:
+    """
+    スナップショットをバイナリファイルに書き出し
+
+    書き込みは一時ファイルへ行い、完了後にアトミックに置き換えます
+    （メモリマップ中の旧ファイルは置き換え後も有効なまま残ります）。
+
+    Args:
+        snapshot: 書き出すスナップショット（versionが設定されていること）
+        path: 出力先パス
+
+    Returns:
+        書き出したバイト数
+    """
+    counter: Counter = Counter()
+    _count_strings(snapshot.menus, counter)
+    table = {value: sys.intern(value) for value, count in counter.items() if count > 1}
+
+    menus = [_intern_strings(menu, table) for menu in snapshot.menus]
+    indexes = _intern_strings(snapshot.export_indexes(), table)
+    deferred = [(name, marshal.dumps(indexes.pop(name))) for name in MenuSnapshot.DEFERRED_INDEXES]
+    mapped = []
+    for name in MenuSnapshot.MAPPED_INDEXES:
+        value = indexes.pop(name)
+        if isinstance(value, dict):
+            # 辞書は昇順の整数キー（array("Q")）と値のレコードを別々に保存する（メモリマップ時はキーを二分探索）
+            keys = sorted(value, key=_encode_key)
+            key_bytes = array("Q", map(_encode_key, keys)).tobytes()
+            mapped.append((name, "mapping", len(keys), [key_bytes, *_record_table([value[key] for key in keys])]))
+        else:
+            mapped.append((name, "sequence", len(value), list(_record_table(value))))
+
+    index_bytes = marshal.dumps(indexes)
+    offset_bytes, record_bytes = _record_table(menus)
+    header = {
+        "format": FORMAT_VERSION,
+        "marshal": marshal.version,
+        "code": index_code_fingerprint(),
+        "byteorder": sys.byteorder,
+        "source_version": snapshot.version,
+        "count": len(menus),
+        "strings": len(table),
+        "indexes": len(index_bytes),
+        "deferred": [(name, len(data)) for name, data in deferred],
+        "mapped": [(name, kind, count) for name, kind, count, _ in mapped],
+    }
+    header_bytes = marshal.dumps(header)
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        f.write(index_bytes)
+        for _, data in deferred:
+            f.write(data)
+        for *_, tables in mapped:
+            for table in tables:
+                f.write(table)
+        f.write(offset_bytes)
+        f.write(record_bytes)
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+def read_binary_snapshot(
+    path: Path, source_version: str, identity: Optional[FileIdentity] = None, lazy: bool = False
+) -> Optional[MenuSnapshot]:
+    """
+    バイナリスナップショットを読み込み
+
+    ファイルが存在しない、形式が異なる、元のJSONと内容が一致しない（古い）、またはインデックスを構築するコード
+    （index_code_fingerprint()）が異なる場合はNoneを返します。
+    データはmarshalで書き出すため、marshalの形式バージョンが同じであればPythonのバージョンは問いません。
+
+    Args:
+        path: バイナリスナップショットのパス
+        source_version: 現在のJSONファイルのデータバージョン
+        identity: JSONファイルの同一性（復元したスナップショットに設定）
+        lazy: Trueの場合はファイルをメモリマップし、レコードをアクセス時にデコード
+
+    Returns:
+        インデックス構築済みのスナップショットまたはNone
+    """
+    try:
+        with open(path, "rb") as f:
+            if lazy:
+                buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                buffer = memoryview(f.read())
+    except (OSError, ValueError):
+        # ValueError: 空ファイルはメモリマップできない
+        return None
+    if buffer[: len(MAGIC)] != MAGIC:
+        return None
+
+    try:
+        offset = len(MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+        header = marshal.loads(buffer[offset : offset + header_length])
+        if (
+            not isinstance(header, dict)
+            or header.get("format") != FORMAT_VERSION
+            or header.get("marshal") != marshal.version
+            or header.get("code") != index_code_fingerprint()
+            or header.get("byteorder") != sys.byteorder
+            or header.get("source_version") != source_version
+        ):
+            return None
+
+        position = offset + header_length
+        indexes = marshal.loads(buffer[position : position + header["indexes"]])
+        position += header["indexes"]
+        deferred: Dict[str, Callable[[], object]] = {}
+        for name, length in header["deferred"]:
+            data = buffer[position : position + length]
+            # メモリマップ時はマップした領域をそのまま参照し、それ以外はファイル全体を保持しないようにコピーする
+            deferred[name] = partial(marshal.loads, data if lazy else bytes(data))
+            position += length
+        for name, kind, count in header["mapped"]:
+            if kind == "mapping":
+                keys_end = position + count * array("Q").itemsize
+                if keys_end > len(buffer):
+                    return None
+                keys = buffer[position:keys_end]
+                values, position = _map_records(buffer, keys_end, count)
+                mapping = MappedIndex(keys, values)
+                indexes[name] = mapping if lazy else dict(zip(mapping, values))
+            else:
+                items, position = _map_records(buffer, position, count)
+                indexes[name] = items if lazy else list(items)
+        records, position = _map_records(buffer, position, header["count"])
+        if position != len(buffer):
+            return None
+        menus = records if lazy else list(records)
+    except (struct.error, EOFError, ValueError, TypeError, KeyError):
+        return None
+
+    return MenuSnapshot.from_indexes(menus, indexes, version=source_version, identity=identity, deferred=deferred)
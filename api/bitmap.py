@@ -0,0 +1,78 @@
+"""
+ビットマップユーティリティ
+
+メニューの位置（menus内のインデックス）の集合をPythonの整数ビットセットで表現します。
+ビットiが立っていれば、i番目のメニューが集合に含まれます。
+"""
+
+from typing import Callable, Iterable, Iterator, List
+
+# 1バイト値ごとの立っているビット位置（iter_positions用の参照テーブル）
+_BYTE_POSITIONS = tuple(tuple(i for i in range(8) if value >> i & 1) for value in range(256))
+
+
+def from_positions(positions: Iterable[int]) -> int:
+    """
+    位置のリストからビットマップを生成
+
+    Args:
+        positions: メニュー位置（重複可・順不同）
+
+    Returns:
+        ビットマップ
+    """
+    positions = list(positions)
+    if not positions:
+        return 0
+    buf = bytearray(max(positions) // 8 + 1)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, "little")
+
+
+def iter_positions(bits: int) -> Iterator[int]:
+    """
+    ビットマップに含まれる位置を昇順で列挙
+
+    Args:
+        bits: ビットマップ
+
+    Yields:
+        メニュー位置（昇順）
+    """
+    if not bits:
+        return
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for byte_index, value in enumerate(data):
+        if value:
+            base = byte_index << 3
+            for offset in _BYTE_POSITIONS[value]:
+                yield base + offset
+
+
+def to_positions(bits: int) -> List[int]:
+    """ビットマップに含まれる位置を昇順のリストで取得"""
+    return list(iter_positions(bits))
+
+
+def membership(bits: int) -> Callable[[int], int]:
+    """
+    位置がビットマップに含まれるかを判定する関数（位置に展開せずにバイト列で判定）
+
+    Args:
+        bits: ビットマップ
+
+    Returns:
+        位置を受け取り、含まれる場合は0以外を返す関数
+    """
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    size = len(data)
+    return lambda pos: pos >> 3 < size and data[pos >> 3] >> (pos & 7) & 1
+
+
+def union(bitmaps: Iterable[int]) -> int:
+    """ビットマップの和集合"""
+    result = 0
+    for bits in bitmaps:
+        result |= bits
+    return result
@@ -0,0 +1,369 @@
+"""
+列指向（Struct of Arrays）メニューストア
+
+メニューレコード（辞書）とは別に、価格・カテゴリ・取得日時を
+メニュー位置ごとの配列として保持します。価格フィルタ・ソート・価格統計は
+レコードを辿らずにこれらの配列上で処理します。
+
+NumPyがインストールされている場合は配列をコピーせずにNumPy配列として参照し、ベクトル演算で処理します。
+インストールされていない場合は標準ライブラリのarrayモジュールで同じ結果を返します。
+"""
+
+import heapq
+from array import array
+from collections import Counter
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from api.bitmap import to_positions
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+def bits_to_positions(bits: int) -> Sequence[int]:
+    """
+    ビットマップに含まれる位置を昇順で取得
+
+    NumPy使用時はビット列を一括展開してndarrayを返します（以降の列演算で変換が不要）。
+
+    Args:
+        bits: ビットマップ
+
+    Returns:
+        メニュー位置（NumPy使用時はndarray、それ以外はlist）
+    """
+    if NUMPY_AVAILABLE:
+        data = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(data, bitorder="little"))
+    return to_positions(bits)
+
+
+class MenuColumns:
+    """
+    メニュー位置ごとの列データ
+
+    Attributes:
+        names: メニュー名
+        prices: 価格（array("q")、価格がない場合は0）
+        categories: カテゴリの一覧（category_codesの値に対応）
+        category_codes: カテゴリコード（array("H")）
+        scraped_at_values: 取得日時の一覧（昇順、重複なし）
+        scraped_at_ranks: 取得日時の順位（array("I")、scraped_at_valuesの位置）
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        prices: array,
+        categories: Tuple[Optional[str], ...],
+        category_codes: array,
+        scraped_at_values: Tuple[str, ...],
+        scraped_at_ranks: array,
+    ):
+        self.names = names
+        self.prices = prices
+        self.categories = categories
+        self.category_codes = category_codes
+        self.scraped_at_values = scraped_at_values
+        self.scraped_at_ranks = scraped_at_ranks
+        # NumPy配列ビュー（価格はarrayのバッファを共有。順位は符号反転できるようint64に変換）
+        if NUMPY_AVAILABLE:
+            self._np_prices = np.frombuffer(prices, dtype=np.int64)
+            self._np_scraped_at_ranks = np.frombuffer(scraped_at_ranks, dtype=np.uint32).astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    @classmethod
+    def build(cls, menus: Sequence[Dict]) -> "MenuColumns":
+        """
+        メニューデータから列を構築
+
+        Args:
+            menus: メニューデータリスト
+
+        Returns:
+            列データ
+        """
+        names = [menu.get("name", "") for menu in menus]
+
+        category_code: Dict[Optional[str], int] = {}
+        category_codes = array(
+            "H", (category_code.setdefault(menu.get("category", "other"), len(category_code)) for menu in menus)
+        )
+
+        scraped_at = [menu.get("scraped_at") or "" for menu in menus]
+        scraped_at_values = tuple(sorted(set(scraped_at)))
+        rank = {value: i for i, value in enumerate(scraped_at_values)}
+
+        return cls(
+            names=names,
+            prices=array("q", ((menu.get("price") or {}).get("amount") or 0 for menu in menus)),
+            categories=tuple(category_code),
+            category_codes=category_codes,
+            scraped_at_values=scraped_at_values,
+            scraped_at_ranks=array("I", (rank[value] for value in scraped_at)),
+        )
+
+    def to_state(self) -> Tuple:
+        """バイナリスナップショット保存用の組み込み型表現（配列はバイト列に変換）"""
+        return (
+            self.names,
+            self.prices.tobytes(),
+            self.categories,
+            self.category_codes.tobytes(),
+            self.scraped_at_values,
+            self.scraped_at_ranks.tobytes(),
+        )
+
+    @classmethod
+    def from_state(cls, state: Tuple) -> "MenuColumns":
+        """to_state() の結果から列を復元"""
+        names, prices, categories, category_codes, values, ranks = state
+
+        def restore(typecode: str, data: bytes) -> array:
+            column = array(typecode)
+            column.frombytes(data)
+            return column
+
+        return cls(
+            names=names,
+            prices=restore("q", prices),
+            categories=tuple(categories),
+            category_codes=restore("H", category_codes),
+            scraped_at_values=tuple(values),
+            scraped_at_ranks=restore("I", ranks),
+        )
+
+    def filter_price(
+        self, positions: Sequence[int], min_price: Optional[int] = None, max_price: Optional[int] = None
+    ) -> Sequence[int]:
+        """
+        価格範囲で絞り込み
+
+        Args:
+            positions: メニュー位置（list または ndarray）
+            min_price: 最低価格（以上）
+            max_price: 最高価格（以下）
+
+        Returns:
+            条件を満たすメニュー位置（元の順序、NumPy使用時はndarray）
+        """
+        if min_price is None and max_price is None:
+            return positions
+        if NUMPY_AVAILABLE:
+            pos = np.asarray(positions, dtype=np.intp)
+            prices = self._np_prices[pos]
+            mask = np.ones(len(pos), dtype=bool)
+            if min_price is not None:
+                mask &= prices >= min_price
+            if max_price is not None:
+                mask &= prices <= max_price
+            return pos[mask]
+
+        prices = self.prices
+        low = min_price if min_price is not None else float("-inf")
+        high = max_price if max_price is not None else float("inf")
+        return [pos for pos in positions if low <= prices[pos] <= high]
+
+    def sort_positions(self, positions: Sequence[int], key: str, reverse: bool = False) -> Sequence[int]:
+        """
+        メニュー位置をソート（安定ソート、sorted(..., reverse=reverse) と同じ順序）
+
+        Args:
+            positions: メニュー位置（list または ndarray）
+            key: ソートキー（price, name, scraped_at）
+            reverse: 降順の場合True
+
+        Returns:
+            ソート済みのメニュー位置（価格・取得日時でNumPy使用時はndarray）
+        """
+        if key == "name":
+            return sorted(positions, key=self.names.__getitem__, reverse=reverse)
+
+        if NUMPY_AVAILABLE:
+            values = self._np_prices if key == "price" else self._np_scraped_at_ranks
+            pos = np.asarray(positions, dtype=np.intp)
+            keys = values[pos]
+            # 降順でも同値の順序を保つため、符号を反転して安定ソートする
+            order = np.argsort(-keys if reverse else keys, kind="stable")
+            return pos[order]
+
+        values = self.prices if key == "price" else self.scraped_at_ranks
+        return sorted(positions, key=values.__getitem__, reverse=reverse)
+
+    def price_stats(self) -> Optional[Tuple[int, int, int]]:
+        """
+        価格統計（0より大きい価格のみ対象）
+
+        Returns:
+            (最低価格, 最高価格, 平均価格（切り捨て）) または None（対象がない場合）
+        """
+        if NUMPY_AVAILABLE:
+            prices = self._np_prices[self._np_prices > 0]
+            if not len(prices):
+                return None
+            return int(prices.min()), int(prices.max()), int(prices.sum()) // len(prices)
+
+        prices = [price for price in self.prices if price > 0]
+        if not prices:
+            return None
+        return min(prices), max(prices), sum(prices) // len(prices)
+
+    def last_scraped_at(self) -> Optional[str]:
+        """最新の取得日時（取得日時がない場合はNone）"""
+        latest = self.scraped_at_values[-1] if self.scraped_at_values else ""
+        return latest or None
+
+    def category_counts(self) -> Dict[Optional[str], int]:
+        """カテゴリごとのメニュー数"""
+        if NUMPY_AVAILABLE:
+            counts = np.bincount(np.frombuffer(self.category_codes, dtype=np.uint16), minlength=len(self.categories))
+            return {category: int(count) for category, count in zip(self.categories, counts)}
+        counts = Counter(self.category_codes)
+        return {category: counts[code] for code, category in enumerate(self.categories)}
+
+
+# 事前計算する並び順のソートキー
+SORT_KEYS = ("price", "name", "scraped_at")
+
+
+class SortOrders:
+    """
+    ソートキー・方向ごとの事前計算済みの並び順
+
+    全メニュー位置を各ソートキーで安定ソートした順列（array("I")）をスナップショットごとに保持します。
+    絞り込み結果の上位k件は、絞り込み結果が多い場合は順列を先頭から辿って絞り込み結果に含まれる位置を
+    k件集めるだけで求まり、ソートのコストは絞り込み件数ではなくページの深さに比例します。
+
+    Attributes:
+        orders: (ソートキー, 降順か) → メニュー位置の順列
+    """
+
+    def __init__(self, orders: Dict[Tuple[str, bool], array]):
+        self.orders = orders
+        # (ソートキー, 降順か) → 順列での順位（メニュー位置 → 順位、カーソルでの再開時に構築）
+        self._ranks: Dict[Tuple[str, bool], array] = {}
+
+    @classmethod
+    def build(cls, columns: MenuColumns) -> "SortOrders":
+        """
+        列データから構築
+
+        Args:
+            columns: 列データ
+
+        Returns:
+            並び順
+        """
+        values = {"price": columns.prices, "name": columns.names, "scraped_at": columns.scraped_at_ranks}
+        everything = range(len(columns))
+        return cls(
+            {
+                (key, reverse): array("I", sorted(everything, key=values[key].__getitem__, reverse=reverse))
+                for key in SORT_KEYS
+                for reverse in (False, True)
+            }
+        )
+
+    def to_state(self) -> Dict[Tuple[str, bool], bytes]:
+        """バイナリスナップショット保存用の組み込み型表現（配列はバイト列に変換）"""
+        return {name: order.tobytes() for name, order in self.orders.items()}
+
+    @classmethod
+    def from_state(cls, state: Dict[Tuple[str, bool], bytes]) -> "SortOrders":
+        """to_state() の結果から復元"""
+        orders = {}
+        for name, data in state.items():
+            order = array("I")
+            order.frombytes(data)
+            orders[tuple(name)] = order
+        return cls(orders)
+
+    def walkable(self, count: int, k: int) -> bool:
+        """
+        順列を辿る方が絞り込み結果をソートするより速いか
+
+        順列を辿る手数の期待値（k × 全件数 / 絞り込み件数）が絞り込み件数以下の場合に辿ります。
+
+        Args:
+            count: 絞り込み件数
+            k: 取得件数
+
+        Returns:
+            順列を辿る場合True
+        """
+        total = len(next(iter(self.orders.values()), ()))
+        return k * total <= count * count
+
+    def top(
+        self, contains: Optional[Callable[[int], object]], key: str, reverse: bool, k: int, start: int = 0
+    ) -> List[int]:
+        """
+        順列を辿って絞り込み結果の上位k件を取得（絞り込み結果を安定ソートした先頭k件と同じ順序）
+
+        Args:
+            contains: メニュー位置が絞り込み結果に含まれるかを判定する関数（Noneの場合は全メニュー）
+            key: ソートキー（price, name, scraped_at）
+            reverse: 降順の場合True
+            k: 取得件数
+            start: 辿り始める順位（カーソルで再開する場合は直前のページの最後のメニューの次の順位）
+
+        Returns:
+            メニュー位置のリスト
+        """
+        order = self.orders[(key, reverse)]
+        if contains is None:
+            return order[start : start + k].tolist()
+        return list(islice(filter(contains, memoryview(order)[start:]), k))
+
+    def ranks(self, key: str, reverse: bool) -> array:
+        """
+        メニュー位置ごとの順列での順位（順列の逆写像、初回のみ構築）
+
+        Args:
+            key: ソートキー（price, name, scraped_at）
+            reverse: 降順の場合True
+
+        Returns:
+            メニュー位置 → 順位の配列（array("I")）
+        """
+        ranks = self._ranks.get((key, reverse))
+        if ranks is None:
+            order = self.orders[(key, reverse)]
+            ranks = array("I", bytes(4 * len(order)))
+            for rank, pos in enumerate(order):
+                ranks[pos] = rank
+            self._ranks[(key, reverse)] = ranks
+        return ranks
+
+    def top_after(self, positions: Sequence[int], key: str, reverse: bool, after: int, k: int) -> List[int]:
+        """
+        並び順でメニュー位置 after より後にある、絞り込み結果の上位k件を取得（キーセットページネーション）
+
+        絞り込み結果が多い場合は after の次から順列を辿り、少ない場合は after より後の順位のものから
+        上位k件をヒープで選びます。いずれもコストは再開位置（ページの深さ）によりません。
+
+        Args:
+            positions: 絞り込み結果のメニュー位置（昇順）
+            key: ソートキー（price, name, scraped_at）
+            reverse: 降順の場合True
+            after: 直前のページの最後のメニュー位置
+            k: 取得件数
+
+        Returns:
+            メニュー位置のリスト
+        """
+        ranks = self.ranks(key, reverse)
+        start = ranks[after] + 1
+        if self.walkable(len(positions), k):
+            contains = None if len(positions) == len(ranks) else set(positions).__contains__
+            return self.top(contains, key, reverse, k, start)
+        candidates = [pos for pos in positions if ranks[pos] >= start]
+        return heapq.nsmallest(k, candidates, key=ranks.__getitem__)
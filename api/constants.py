@@ -10,7 +10,8 @@
 - features: 特徴
 """
 
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
 
 # タグカテゴリ定義（Phase 4対応: 統合済み、新規メニュー反映）
 TAG_CATEGORIES: Dict[str, List[str]] = {
@@ -75,6 +76,19 @@ TAG_CATEGORIES: Dict[str, List[str]] = {
     ],
 }
 
+
+def _build_tag_category_map() -> Mapping[str, str]:
+    """タグ → カテゴリの逆引き表を構築（複数カテゴリに属するタグは定義順で最初のカテゴリ）"""
+    tag_to_category: Dict[str, str] = {}
+    for category, category_tags in TAG_CATEGORIES.items():
+        for tag in category_tags:
+            tag_to_category.setdefault(tag, category)
+    return MappingProxyType(tag_to_category)
+
+
+# タグ → カテゴリの逆引き表（読み取り専用）
+TAG_CATEGORY_MAP: Mapping[str, str] = _build_tag_category_map()
+
 # カテゴリ名（日本語）
 CATEGORY_LABELS: Dict[str, str] = {
     "food_type": "料理の種類",
@@ -128,3 +142,6 @@ MENU_CATEGORIES: Dict[str, Dict[str, any]] = {
         "description": "上記に該当しないメニュー",
     },
 }
+
+# /menus/facets の価格帯の下限（円、昇順）。各価格帯は次の下限の1円前まで、最後の価格帯は上限なし
+PRICE_BUCKETS: Tuple[int, ...] = (0, 500, 1000, 1500, 2000, 3000, 5000)
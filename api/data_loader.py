@@ -2,15 +2,28 @@
 メニューデータローダーモジュール
 
 JSONファイルからメニューデータを読み込み、フィルタリング機能を提供します。
-キャッシュ機構により効率的なデータアクセスを実現しています。
+パース済みデータはスナップショットとして保持し、ファイルが変更されるまで再利用します。
 """
 
 import os
 import json
+import hashlib
+import sqlite3
+import threading
+import weakref
 from pathlib import Path
-from typing import List, Dict, Optional
-from functools import lru_cache
-from datetime import datetime, date
+from typing import List, Dict, Optional, Tuple
+from datetime import date
+
+from api.binary_snapshot import binary_snapshot_path, read_binary_snapshot
+from api.query import MenuQuery, RefinementCache, facet_counts, search_positions, search_snapshot
+from api.records import compact_menus
+from api.reloader import SnapshotReloader
+from api.snapshot import FileIdentity, MenuSnapshot, availability_intervals, today_jst
+from api.sqlite_store import SQLiteMenuStore, sqlite_store_path, write_sqlite_store
+
+# 検索バックエンド
+BACKENDS = ("json", "sqlite")
 
 
 class MenuDataLoader:
@@ -20,16 +33,38 @@ class MenuDataLoader:
     メニューデータの読み込み、キャッシュ管理、フィルタリング機能を提供します。
     """
 
-    def __init__(self, data_path: str = "data/menus.json"):
+    def __init__(
+        self,
+        data_path: str = "data/menus.json",
+        background_reload: bool = False,
+        poll_interval: Optional[float] = None,
+        use_binary_snapshot: bool = True,
+        lazy_records: bool = False,
+        compact_records: bool = False,
+        backend: str = "json",
+    ):
         """
         初期化
 
         Args:
             data_path: メニューデータJSONファイルのパス（デフォルト: data/menus.json）
+            background_reload: Trueの場合、ファイル変更時の再構築をバックグラウンドで行い、
+                完了までは現在のスナップショットを返す（デフォルト: False）
+            poll_interval: バックグラウンド再構築時のファイル変更ポーリング間隔（秒）
+            use_binary_snapshot: Trueの場合、JSONと内容が一致するバイナリスナップショット
+                （例: data/menus.snapshot）があればそちらを読み込む（デフォルト: True）
+            lazy_records: Trueの場合、バイナリスナップショットをメモリマップし、メニューレコードを
+                アクセス時に1件ずつデコードする（検索・ソート用の列とインデックスのみ常駐）
+            compact_records: Trueの場合、メニューを辞書ではなく __slots__ のレコードと辞書符号化した文字列で保持し、
+                レストランを全メニューで共有するレストラン表の行に正規化する（メモリマップしたレコードには適用しない）
+            backend: /menus の検索バックエンド（デフォルト: json）。
+                "sqlite" の場合はデータをSQLiteファイル（例: data/menus.sqlite）に取り込み、1つのSQLクエリで検索する
+                （取り込めない場合はメモリ上のインデックスで検索）
         """
-        # Path Traversal対策: 絶対パスに解決し、許可されたディレクトリ内かチェック
-        import os
+        if backend not in BACKENDS:
+            raise ValueError(f"Invalid backend: {backend}. Must be one of {', '.join(BACKENDS)}.")
 
+        # Path Traversal対策: 絶対パスに解決し、許可されたディレクトリ内かチェック
         # プロジェクトルートディレクトリを基準にする
         project_root = Path(__file__).parent.parent
 
@@ -50,112 +85,275 @@ class MenuDataLoader:
             raise ValueError(f"Invalid data path: {data_path}. Must be within 'data/' directory.")
 
         self.data_path = resolved_path
-        self._cache_timestamp: Optional[datetime] = None
+        self.binary_snapshot_path = binary_snapshot_path(resolved_path)
+        self.use_binary_snapshot = use_binary_snapshot
+        self.lazy_records = lazy_records
+        self.compact_records = compact_records
+        self.backend = backend
+        self.sqlite_path = sqlite_store_path(resolved_path)
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._store: Optional[SQLiteMenuStore] = None
+        # 入力途中の検索文字列の絞り込みキャッシュ（メモリ上のインデックスで検索する場合のみ使用）
+        self.refinement_cache = RefinementCache()
+        self._reload_lock = threading.Lock()
+        # パースに失敗したファイルの同一性（同じ内容で再試行し続けないように記録）
+        self._failed_identity: Optional[FileIdentity] = None
+        self._reloader: Optional[SnapshotReloader] = (
+            SnapshotReloader(self._reload, poll_interval=poll_interval) if background_reload else None
+        )
         self.debug = os.getenv("DEBUG", "false").lower() == "true"
 
-    def load_menus(self, force_reload: bool = False) -> List[Dict]:
+    def load_snapshot(self, force_reload: bool = False) -> MenuSnapshot:
         """
-        メニューデータを読み込み
+        メニューデータのスナップショットを取得
+
+        ファイルの同一性（mtime・サイズ・inode）を `stat` で確認し、
+        変更がなければ前回パースしたスナップショットをそのまま返します。
 
         Args:
             force_reload: Trueの場合、キャッシュを無視して再読み込み（デフォルト: False）
 
         Returns:
-            メニューデータのリスト（各メニューは辞書型）
+            メニューデータのスナップショット
         """
-        if not self.data_path.exists():
+        identity = self._stat()
+        if identity is None:
+            return MenuSnapshot(menus=[])
+
+        # キャッシュが有効かチェック（statのみで判定）
+        snapshot = self._snapshot
+        if not force_reload and snapshot is not None:
+            if snapshot.is_current(identity) or identity == self._failed_identity:
+                return snapshot
+
+            # バックグラウンド再構築: 完成した次のスナップショットに差し替わるまで現在のものを返す
+            if self._reloader is not None:
+                self._reloader.request()
+                return snapshot
+
+        return self._reload(force=force_reload)
+
+    def close(self) -> None:
+        """バックグラウンド再構築スレッドを停止し、SQLiteストアの接続を閉じる"""
+        if self._reloader is not None:
+            self._reloader.stop()
+        store, self._store = self._store, None
+        if store is not None:
+            store.close()
+
+    def _stat(self) -> Optional[FileIdentity]:
+        """データファイルの同一性を取得（ファイルがない場合はNone）"""
+        try:
+            return FileIdentity.from_stat(os.stat(self.data_path))
+        except FileNotFoundError:
             if self.debug:
                 print(f"Warning: Data file not found: {self.data_path}")
-            return []
+            return None
 
-        # ファイルの更新時刻をチェック
-        file_mtime = datetime.fromtimestamp(self.data_path.stat().st_mtime)
+    def _reload(self, force: bool = False) -> MenuSnapshot:
+        """
+        スナップショットを再構築して差し替え
+
+        再構築は1スレッドずつ行い、待機中に他のスレッドが同じファイルを読み込み済みであれば
+        その結果を再利用します。インデックスをすべて構築してから参照を差し替えるため、
+        他のスレッドが構築途中のスナップショットを参照することはありません。
 
-        # キャッシュが有効かチェック
-        if not force_reload and self._cache_timestamp and file_mtime <= self._cache_timestamp:
-            return self._load_from_cache()
+        Args:
+            force: Trueの場合、ファイルが変更されていなくても再構築
+
+        Returns:
+            現在のスナップショット
+        """
+        with self._reload_lock:
+            identity = self._stat()
+            if identity is None:
+                return MenuSnapshot(menus=[])
+
+            snapshot = self._snapshot
+            if not force and snapshot is not None and snapshot.is_current(identity):
+                return snapshot
+
+            # ファイルから読み込み
+            with open(self.data_path, "rb") as f:
+                # 読み込んだ内容と一致する同一性を記録する
+                identity = FileIdentity.from_stat(os.fstat(f.fileno()))
+                raw = f.read()
+            version = hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+            # 内容が一致するバイナリスナップショットがあればパースとインデックス構築を省略
+            new_snapshot = None
+            if self.use_binary_snapshot:
+                new_snapshot = read_binary_snapshot(
+                    self.binary_snapshot_path, version, identity, lazy=self.lazy_records
+                )
+
+            if new_snapshot is None:
+                try:
+                    data = json.loads(raw)
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    if self.debug:
+                        print(f"Warning: Invalid JSON in {self.data_path}: {e}")
+                    self._failed_identity = identity
+                    # 書き込み途中などで読めない場合は直前のスナップショットを使い続ける
+                    return snapshot if snapshot is not None else MenuSnapshot(menus=[])
+
+                new_snapshot = MenuSnapshot(menus=data, version=version, identity=identity)
+
+            new_snapshot.warm()
+            if self.compact_records and isinstance(new_snapshot.menus, list):
+                # インデックスは辞書のまま構築し（高速）、保持するメニューのみコンパクトな表現に置き換える
+                new_snapshot = new_snapshot.with_menus(compact_menus(new_snapshot.menus)).warm()
+            if self.backend == "sqlite":
+                store = self._open_store(new_snapshot)
+                if store is not None:
+                    # 接続はスナップショットが参照されなくなった時点で閉じる
+                    # （旧スナップショットで処理中のリクエストが旧ストアを使い終えてから）
+                    weakref.finalize(new_snapshot, store.close)
+                # スナップショットより先に差し替え、検索時にバージョンが一致するものだけを使う
+                self._store = store
+            # 参照の代入はアトミックなため、リクエストは旧・新いずれかの完成したスナップショットを参照する
+            self._snapshot = new_snapshot
+            self._failed_identity = None
+
+            # ポーリングが有効な場合は初回読み込み後に監視を開始
+            if self._reloader is not None and self._reloader.poll_interval:
+                self._reloader.start()
+            return new_snapshot
+
+    def _open_store(self, snapshot: MenuSnapshot) -> Optional[SQLiteMenuStore]:
+        """
+        スナップショットと内容が一致するSQLiteストアを開く（古い・存在しない場合は取り込み直す）
+
+        Args:
+            snapshot: 現在のスナップショット
 
-        # ファイルから読み込み
+        Returns:
+            ストアまたはNone（書き込めない場合）
+        """
+        store = SQLiteMenuStore.open(self.sqlite_path, snapshot.version)
+        if store is not None:
+            return store
         try:
-            with open(self.data_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except json.JSONDecodeError as e:
+            write_sqlite_store(snapshot, self.sqlite_path)
+        except (OSError, sqlite3.Error) as e:
             if self.debug:
-                print(f"Warning: Invalid JSON in {self.data_path}: {e}")
-            return []
+                print(f"Warning: Could not write SQLite store {self.sqlite_path}: {e}")
+            return None
+        return SQLiteMenuStore.open(self.sqlite_path, snapshot.version)
+
+    def search_menus(self, query: MenuQuery) -> Tuple[List[Dict], int]:
+        """
+        /menus の検索（フィルタ・ソート・ページネーション）を実行
+
+        backend="sqlite" でスナップショットと同じバージョンのストアがあればSQLiteで、
+        それ以外はメモリ上のインデックスで検索します（結果は同一）。
+        メモリ上のインデックスで検索する場合、直前の検索文字列を前方に含む検索文字列は
+        その結果のみを候補として確認します（refinement_cache）。
+
+        Args:
+            query: 検索条件
+
+        Returns:
+            (ページ内のメニューデータ, 条件に一致した総件数)
+        """
+        snapshot = self.load_snapshot()
+        store = self._store
+        if store is not None and store.version == snapshot.version:
+            return store.search(query)
+        return search_snapshot(snapshot, query, self.refinement_cache)
 
-        self._cache_timestamp = datetime.now()
-        return data
+    def search_menu_json(self, query: MenuQuery) -> Tuple[List[bytes], int, Optional[Tuple[object, int]]]:
+        """
+        /menus の検索を実行し、ページ内のメニューをJSONバイト列で取得
 
-    def _load_from_cache(self) -> List[Dict]:
-        """キャッシュから読み込み（内部使用）"""
-        # ファイルの更新時刻をチェック
-        file_mtime = datetime.fromtimestamp(self.data_path.stat().st_mtime)
+        search_menus() と同じ検索を行い、メニューはスナップショットごとにシリアライズ済みのバイト列
+        （SQLiteの場合は保存済みのJSON）を返します。レスポンスはバイト列の連結で組み立てられます。
 
-        # キャッシュが古い場合は再読み込み
-        if self._cache_timestamp and file_mtime > self._cache_timestamp:
-            with open(self.data_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+        Args:
+            query: 検索条件
 
-        # キャッシュが有効な場合
-        with open(self.data_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        Returns:
+            (ページ内のメニューのJSONバイト列, 条件に一致した総件数,
+            ページの最後のメニューの (ソートキーの値, メニュー位置)（次のページのカーソル用、ページが空の場合はNone）)
+
+        Raises:
+            ValueError: カーソル（query.after）が現在のデータの並び順と一致しない場合
+        """
+        snapshot = self.load_snapshot()
+        store = self._store
+        if store is not None and store.version == snapshot.version:
+            return store.search_json(query)
+        positions, total = search_positions(snapshot, query, self.refinement_cache)
+        last_key = None
+        if len(positions):
+            last = int(positions[-1])
+            last_key = (snapshot.sort_value(last, query.sort, query.q), last)
+        return snapshot.menu_json(positions), total, last_key
+
+    def get_facets(self, query: MenuQuery) -> Dict:
+        """
+        /menus と同じ条件の絞り込み結果について、フィルタの値ごとのメニュー数を集計
+
+        バックエンドによらず、スナップショットの転置インデックスのビットマップ演算で集計します。
+
+        Args:
+            query: 検索条件（ソート・ページネーションは使用しない）
+
+        Returns:
+            {"total", "tags", "categories", "parks", "areas", "restaurants", "price"} の辞書
+        """
+        return facet_counts(self.load_snapshot(), query, self.refinement_cache)
+
+    def get_metrics(self) -> Dict:
+        """
+        キャッシュなどの実行時メトリクスを取得
+
+        Returns:
+            メトリクス（refinement_cache: 検索文字列の絞り込みキャッシュのヒット数・省略したメニュー数など）
+        """
+        return {"refinement_cache": self.refinement_cache.metrics()}
+
+    def load_menus(self, force_reload: bool = False) -> List[Dict]:
+        """
+        メニューデータを読み込み
+
+        ファイルが変更されるまで同じリストオブジェクトを返します（変更しないこと）。
+        lazy_records=True でメモリマップから読み込んだ場合は、アクセス時にデコードする読み取り専用シーケンスを返します。
+
+        Args:
+            force_reload: Trueの場合、キャッシュを無視して再読み込み（デフォルト: False）
+
+        Returns:
+            メニューデータのリスト（各メニューは辞書型）
+        """
+        return self.load_snapshot(force_reload=force_reload).menus
 
     def filter_by_availability(self, menus: List[Dict], check_date: Optional[date] = None) -> List[Dict]:
         """
         販売中のメニューのみフィルタ
 
+        スナップショット全体に対しては `MenuSnapshot.available_bits` の方が高速です。
+
         Args:
             menus: メニューデータリスト
-            check_date: チェック日付（Noneの場合は今日）
+            check_date: チェック日付（Noneの場合は今日（JST））
 
         Returns:
             販売中のメニューリスト
         """
         if check_date is None:
-            check_date = date.today()
-
-        available_menus = []
-        for menu in menus:
-            # 各レストランで販売期間をチェック
-            has_available_restaurant = False
-
-            for restaurant in menu.get("restaurants", []):
-                availability = restaurant.get("availability")
-
-                # 販売期間指定がない場合は常に販売中
-                if not availability:
-                    has_available_restaurant = True
-                    break
-
-                start = availability.get("start_date")
-                end = availability.get("end_date")
-
-                # 開始日チェック
-                if start:
-                    try:
-                        start_date = date.fromisoformat(start)
-                        if check_date < start_date:
-                            continue
-                    except ValueError:
-                        pass  # 無効な日付の場合はスキップ
-
-                # 終了日チェック
-                if end:
-                    try:
-                        end_date = date.fromisoformat(end)
-                        if check_date > end_date:
-                            continue
-                    except ValueError:
-                        pass
-
-                has_available_restaurant = True
-                break
-
-            if has_available_restaurant:
-                available_menus.append(menu)
-
-        return available_menus
+            check_date = today_jst()
+        ordinal = check_date.toordinal()
+
+        # いずれかのレストランで販売期間内なら販売中
+        return [
+            menu
+            for menu in menus
+            if any(
+                (start is None or start <= ordinal) and (end is None or ordinal <= end)
+                for start, end in availability_intervals(menu)
+            )
+        ]
 
     def get_menu_by_id(self, menu_id: str) -> Optional[Dict]:
         """
@@ -167,8 +365,7 @@ class MenuDataLoader:
         Returns:
             メニューデータまたはNone
         """
-        menus = self.load_menus()
-        return next((m for m in menus if m["id"] == menu_id), None)
+        return self.load_snapshot().get_menu(menu_id)
 
     def get_all_tags(self) -> List[str]:
         """
@@ -177,13 +374,7 @@ class MenuDataLoader:
         Returns:
             タグのリスト（重複なし、ソート済み）
         """
-        menus = self.load_menus()
-        tags = set()
-
-        for menu in menus:
-            tags.update(menu.get("tags", []))
-
-        return sorted(list(tags))
+        return self.load_snapshot().all_tags
 
     def get_all_categories(self) -> List[str]:
         """
@@ -192,13 +383,7 @@ class MenuDataLoader:
         Returns:
             カテゴリのリスト（重複なし、ソート済み）
         """
-        menus = self.load_menus()
-        categories = set()
-
-        for menu in menus:
-            categories.update(menu.get("categories", []))
-
-        return sorted(list(categories))
+        return self.load_snapshot().all_categories
 
     def get_all_restaurants(self) -> List[Dict]:
         """
@@ -207,45 +392,16 @@ class MenuDataLoader:
         Returns:
             レストランのリスト（重複なし）
         """
-        menus = self.load_menus()
-        restaurants = {}
-
-        for menu in menus:
-            for restaurant in menu.get("restaurants", []):
-                rid = restaurant["id"]
-                if rid not in restaurants:
-                    restaurants[rid] = restaurant
+        return self.load_snapshot().all_restaurants
 
-        return list(restaurants.values())
-
-    def get_stats(self) -> Dict:
+    def get_stats(self, check_date: Optional[date] = None) -> Dict:
         """
         統計情報を取得
 
+        Args:
+            check_date: 販売中メニュー数の基準日（Noneの場合は今日（JST））
+
         Returns:
             統計情報の辞書
         """
-        menus = self.load_menus()
-        available_menus = self.filter_by_availability(menus)
-
-        prices = [m["price"]["amount"] for m in menus if m.get("price", {}).get("amount", 0) > 0]
-
-        stats = {
-            "total_menus": len(menus),
-            "available_menus": len(available_menus),
-            "total_tags": len(self.get_all_tags()),
-            "total_categories": len(self.get_all_categories()),
-            "total_restaurants": len(self.get_all_restaurants()),
-        }
-
-        if prices:
-            stats["min_price"] = min(prices)
-            stats["max_price"] = max(prices)
-            stats["avg_price"] = sum(prices) // len(prices)
-
-        if menus:
-            scraped_dates = [m.get("scraped_at") for m in menus if m.get("scraped_at")]
-            if scraped_dates:
-                stats["last_updated"] = max(scraped_dates)
-
-        return stats
+        return self.load_snapshot().get_stats(check_date)
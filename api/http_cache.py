@@ -0,0 +1,150 @@
+"""
+HTTPキャッシュ（条件付きリクエスト）
+
+データの読み取りエンドポイントのレスポンスに ETag・Last-Modified・Cache-Control を付与し、
+If-None-Match / If-Modified-Since が一致する場合は検索・シリアライズを行わずに 304 を返すための関数群です。
+
+ETagはスナップショットのバージョン（ファイル内容のハッシュ）、レスポンスを生成するコード（apiパッケージのソース）の
+フィンガープリントとリクエストのパス・クエリパラメータから算出するため、データとコードが変わらない限り同じリクエストには
+同じETagを返します（サーバーレスのインスタンス間でも同一）。
+"""
+
+import hashlib
+from datetime import date, datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Set
+from urllib.parse import urlencode
+
+# ブラウザのキャッシュ期間（秒、以降はETagで再検証）
+CACHE_MAX_AGE = 60
+
+# CDN（Vercel Edge Network）のキャッシュ期間と、期限切れ後に再検証しながら古いレスポンスを返す期間（秒）
+CDN_MAX_AGE = 3600
+CDN_STALE_WHILE_REVALIDATE = 86400
+
+
+@lru_cache(maxsize=None)
+def response_code_fingerprint() -> str:
+    """
+    レスポンスを生成するコードのフィンガープリント（apiパッケージのすべてのモジュールのソースのハッシュ）
+
+    データが同じでもデプロイでレスポンスの形式・検索の挙動が変わった場合に、ブラウザ・CDNが古いレスポンスを
+    304で使い続けないようにETagに含めます。
+
+    Returns:
+        16進数16文字のハッシュ
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(path.name.encode("utf-8") + b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def compute_etag(version: str, path: str, params: Mapping[str, str], today: Optional[date] = None) -> str:
+    """
+    ETagを算出（強いETag）
+
+    Args:
+        version: スナップショットのバージョン
+        path: リクエストのパス（root_pathを除く）
+        params: クエリパラメータ（順序は問わない）
+        today: レスポンスが今日（JST）に依存する場合はその日付
+
+    Returns:
+        ETag（引用符付き）
+    """
+    items = params.multi_items() if hasattr(params, "multi_items") else params.items()
+    source = "\0".join(
+        (response_code_fingerprint(), version, path, urlencode(sorted(items)), today.isoformat() if today else "")
+    )
+    return '"' + hashlib.blake2b(source.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def http_date(value: datetime) -> str:
+    """HTTP日付（IMF-fixdate）に変換"""
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _if_none_match_tags(headers: Mapping[str, str]) -> Optional[Set[str]]:
+    """If-None-Match のエンティティタグ（W/ を除く、ヘッダーがない場合はNone）"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is None:
+        return None
+    return {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+
+def etag_matches(headers: Mapping[str, str], etag: str) -> bool:
+    """
+    If-None-Match に現在のETagそのものが含まれるか（"*" は含めない）
+
+    ETagは200のレスポンスにのみ付与するため、一致する場合は同じリクエストが200になることが分かっています。
+    入力の検証後、検索・シリアライズの前に304を返してよいかの判定に使用します。
+
+    Args:
+        headers: リクエストヘッダー
+        etag: 現在のETag
+
+    Returns:
+        一致する場合True
+    """
+    tags = _if_none_match_tags(headers)
+    return tags is not None and etag in tags
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    条件付きリクエストの条件を満たすか（200のレスポンスの代わりに304を返してよいか）
+
+    If-None-Match がある場合はETagのみで判定し（弱い比較）、ない場合は If-Modified-Since と最終更新日時で判定します。
+    "*" と If-Modified-Since はリクエストが200になるかを示さないため、エンドポイントが200を返した後に判定してください。
+
+    Args:
+        headers: リクエストヘッダー
+        etag: 現在のETag
+        last_modified: 現在の最終更新日時（不明な場合はNone）
+
+    Returns:
+        変更がない場合True
+    """
+    tags = _if_none_match_tags(headers)
+    if tags is not None:
+        return "*" in tags or etag in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime], max_age: Optional[int] = None) -> Dict[str, str]:
+    """
+    レスポンス（200・304）に付与するキャッシュ関連ヘッダー
+
+    Args:
+        etag: ETag
+        last_modified: 最終更新日時（不明な場合はNone）
+        max_age: レスポンスの有効期限（秒、日付が変わると内容が変わる場合は日付が変わるまでの秒数）
+
+    Returns:
+        ヘッダー名 → 値
+    """
+    if max_age is None:
+        cache_control = (
+            f"public, max-age={CACHE_MAX_AGE}, s-maxage={CDN_MAX_AGE}, "
+            f"stale-while-revalidate={CDN_STALE_WHILE_REVALIDATE}"
+        )
+    else:
+        cache_control = f"public, max-age={min(CACHE_MAX_AGE, max_age)}, s-maxage={min(CDN_MAX_AGE, max_age)}"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
@@ -6,13 +6,20 @@ FastAPI application for Disney Menu API
 """
 
 import os
-from fastapi import FastAPI, Query, HTTPException
+import re
+from datetime import date, datetime, timedelta
+from fastapi import Depends, FastAPI, Query, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 from api.data_loader import MenuDataLoader
-from api.models import MenuItem, ParkType
-from api.constants import TAG_CATEGORIES, CATEGORY_LABELS, MENU_CATEGORIES
+from api.http_cache import cache_headers, compute_etag, etag_matches, is_not_modified
+from api.models import ParkType
+from api.constants import MENU_CATEGORIES
+from api.query import MenuQuery, canonical_query, decode_cursor, encode_cursor
+from api.response_cache import RESPONSE_CACHE_BYTES, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, ResponseCache
+from api.serialization import dump_json
+from api.snapshot import JST, today_jst
 
 # デバッグモード（環境変数で制御）
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
@@ -31,6 +38,90 @@ app = FastAPI(
     redoc_url="/redoc" if DEBUG else None,
 )
 
+# 条件付きリクエスト（ETag / Last-Modified）の対象: データのみに依存する読み取りエンドポイント
+CONDITIONAL_PATHS = re.compile(r"^/(menus(/[^/]+)?|suggest|restaurants|tags(/grouped)?|categories|stats)$")
+
+# /menus/batch で一度に取得できるメニューIDの最大件数
+BATCH_MAX_IDS = 100
+
+# bool型クエリパラメータの偽の値（それ以外はFastAPIが真と解釈するか422を返す）
+_FALSE_VALUES = ("0", "false", "f", "n", "no", "off")
+
+
+def depends_on_today(path: str, params) -> bool:
+    """
+    レスポンスが今日（JST）を基準にするか（日付が変わると同じデータでも内容が変わる）
+
+    Args:
+        path: リクエストのパス（root_pathを除く）
+        params: クエリパラメータ
+
+    Returns:
+        今日を基準にする場合True（販売日を date で指定した場合はFalse）
+    """
+    if "date" in params:
+        return False
+    if path == "/stats":
+        return True
+    return path in ("/menus", "/menus/facets") and params.get("only_available", "false").lower() not in _FALSE_VALUES
+
+
+# CORSより内側で処理する（304にもCORSヘッダーを付与するため、CORSより先に登録）
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """
+    データの読み取りエンドポイントの200のレスポンスにETag・Last-Modified・Cache-Controlを付与し、
+    If-None-Match / If-Modified-Since が一致する場合は304を返す
+
+    304はルーティング・入力の検証を通って200になるリクエストにのみ返す（存在しないID・不正なパラメータは404・400・422）。
+    検索を伴うエンドポイントは入力の検証後に not_modified() でETagの一致を確認し、検索・シリアライズを行わずに304を返す。
+    """
+    path = request.scope["path"]
+    root_path = request.scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path) :]
+    if request.method != "GET" or not CONDITIONAL_PATHS.match(path):
+        return await call_next(request)
+
+    snapshot = loader.load_snapshot()
+    params = request.query_params
+    last_modified = snapshot.last_modified
+    max_age = None
+    today = None
+    if depends_on_today(path, params):
+        # 日付が変わるまで有効（最終更新日時は今日の0時（JST）以降）
+        today = today_jst()
+        midnight = datetime.combine(today, datetime.min.time(), JST)
+        last_modified = max(last_modified, midnight) if last_modified else midnight
+        max_age = int((midnight + timedelta(days=1) - datetime.now(JST)).total_seconds())
+    etag = compute_etag(snapshot.version, path, params, today)
+    headers = cache_headers(etag, last_modified, max_age)
+
+    request.state.etag = etag
+    response = await call_next(request)
+    if response.status_code == 304 or (
+        response.status_code == 200 and is_not_modified(request.headers, etag, last_modified)
+    ):
+        return Response(status_code=304, headers=headers)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
+
+
+def not_modified(request: Request) -> bool:
+    """
+    クライアントが現在のETagのレスポンスを持っているか（入力の検証後に呼び出し、Trueの場合は304を返す）
+
+    Args:
+        request: リクエスト（conditional_get がETagを設定）
+
+    Returns:
+        If-None-Match が現在のETagと一致する場合True
+    """
+    etag = getattr(request.state, "etag", None)
+    return etag is not None and etag_matches(request.headers, etag)
+
+
 # CORS設定（本番環境では特定のオリジンのみ許可）
 app.add_middleware(
     CORSMiddleware,
@@ -41,8 +132,28 @@ app.add_middleware(
     max_age=600,  # プリフライトリクエストのキャッシュ時間（10分）
 )
 
-# データローダー
-loader = MenuDataLoader()
+# データローダー（ファイル変更時はバックグラウンドで再構築し、完成後にスナップショットを差し替え）
+# MENU_LAZY_RECORDS=1 の場合はバイナリスナップショットをメモリマップし、レコードを必要時にのみデコード
+# MENU_COMPACT_RECORDS=1 の場合はメニューを __slots__ のレコードで保持してメモリを削減
+# MENU_BACKEND=sqlite の場合は /menus の検索をSQLiteファイル（data/menus.sqlite）上の1つのSQLクエリで実行
+RELOAD_INTERVAL = float(os.getenv("MENU_RELOAD_INTERVAL", "0"))
+LAZY_RECORDS = os.getenv("MENU_LAZY_RECORDS", "0") == "1"
+COMPACT_RECORDS = os.getenv("MENU_COMPACT_RECORDS", "0") == "1"
+BACKEND = os.getenv("MENU_BACKEND", "json")
+loader = MenuDataLoader(
+    background_reload=True,
+    poll_interval=RELOAD_INTERVAL or None,
+    lazy_records=LAZY_RECORDS,
+    compact_records=COMPACT_RECORDS,
+    backend=BACKEND,
+)
+
+# /menus のレスポンスキャッシュ（件数・合計バイト数・有効期限で破棄、MENU_RESPONSE_CACHE_SIZE=0 で無効）
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("MENU_RESPONSE_CACHE_SIZE", str(RESPONSE_CACHE_SIZE))),
+    max_bytes=int(os.getenv("MENU_RESPONSE_CACHE_BYTES", str(RESPONSE_CACHE_BYTES))),
+    ttl=float(os.getenv("MENU_RESPONSE_CACHE_TTL", str(RESPONSE_CACHE_TTL))),
+)
 
 
 class MenuListResponse(BaseModel):
@@ -60,6 +171,14 @@ class MenuResponse(BaseModel):
     data: dict
 
 
+class MenuBatchResponse(BaseModel):
+    """複数メニューレスポンス（存在しないIDの位置は null）"""
+
+    success: bool = True
+    data: List[Optional[dict]]
+    meta: dict
+
+
 class ListResponse(BaseModel):
     """リストレスポンス（タグ、レストラン等）"""
 
@@ -82,18 +201,26 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "menus": "/api/menus",
+            "menu_facets": "/api/menus/facets",
+            "menus_batch": "/api/menus/batch",
             "menu_by_id": "/api/menus/{id}",
+            "suggest": "/api/suggest",
             "restaurants": "/api/restaurants",
             "tags": "/api/tags",
             "categories": "/api/categories",
             "stats": "/api/stats",
+            "metrics": "/api/metrics",
         },
     }
 
 
-@app.get("/menus", response_model=MenuListResponse, tags=["Menus"])
-async def get_menus(
-    q: Optional[str] = Query(None, min_length=1, max_length=200, description="検索クエリ（名前、説明）"),
+def menu_filters(
+    q: Optional[str] = Query(
+        None,
+        min_length=1,
+        max_length=200,
+        description="検索クエリ（名前、説明。ひらがな・カタカナ、全角・半角を区別しない）",
+    ),
     tags: Optional[str] = Query(None, max_length=500, description="タグフィルタ（カンマ区切り）"),
     categories: Optional[str] = Query(None, max_length=200, description="カテゴリフィルタ（カンマ区切り）"),
     min_price: Optional[int] = Query(None, ge=0, le=100000, description="最小価格"),
@@ -103,124 +230,155 @@ async def get_menus(
     restaurant: Optional[str] = Query(None, max_length=200, description="レストランフィルタ（レストラン名）"),
     character: Optional[str] = Query(None, max_length=100, description="キャラクターフィルタ"),
     only_available: bool = Query(False, description="販売中のみ（デフォルト: すべて表示）"),
+    check_date: Optional[date] = Query(
+        None, alias="date", description="指定日（YYYY-MM-DD）に販売中のメニューのみ（省略時は今日（JST）を基準）"
+    ),
+) -> MenuQuery:
+    """
+    /menus・/menus/facets に共通の絞り込み条件（ソート・ページネーションは既定値）
+    """
+    return MenuQuery(
+        q=q,
+        tags=tuple(t.strip() for t in tags.split(",")) if tags else (),
+        categories=tuple(c.strip() for c in categories.split(",")) if categories else (),
+        min_price=min_price,
+        max_price=max_price,
+        park=park.value if park else None,
+        area=area,
+        restaurant=restaurant,
+        character=character,
+        only_available=only_available,
+        check_date=check_date,
+    )
+
+
+@app.get("/menus", response_model=MenuListResponse, tags=["Menus"])
+async def get_menus(
+    request: Request,
+    filters: MenuQuery = Depends(menu_filters),
     sort: Optional[str] = Query(
-        None, pattern="^(price|name|scraped_at)$", description="ソート項目 (price, name, scraped_at)"
+        None,
+        pattern="^(price|name|scraped_at|relevance)$",
+        description="ソート項目 (price, name, scraped_at, relevance: 検索クエリとの関連度順。order は無視)",
     ),
     order: Optional[str] = Query("asc", pattern="^(asc|desc)$", description="ソート順 (asc, desc)"),
     page: int = Query(1, ge=1, le=10000, description="ページ番号"),
     limit: int = Query(50, ge=1, le=100, description="1ページあたりの件数"),
+    cursor: Optional[str] = Query(
+        None,
+        min_length=1,
+        max_length=500,
+        description="前のレスポンスの meta.next_cursor（指定した場合は page を無視して続きから取得）",
+    ),
 ):
     """
     メニュー一覧を取得
 
     各種フィルタリング、ソート、ページネーションに対応。
     検索クエリ、タグ、カテゴリ、価格範囲、パーク、エリア、キャラクターなどで絞り込み可能。
+    無限スクロールでは meta.next_cursor を cursor に渡すと、ページの深さによらず同じコストで続きを取得できます。
     """
-    menus = loader.load_menus()
-
     # デバッグログ（本番環境では無効化）
     if DEBUG:
-        print(
-            f"[API /menus] Total loaded: {len(menus)}, only_available: {only_available}, page: {page}, limit: {limit}"
-        )
-
-    # 販売中のみフィルタ
-    if only_available:
-        menus = loader.filter_by_availability(menus)
-        if DEBUG:
-            print(f"[API /menus] After availability filter: {len(menus)}")
-
-    # 検索フィルタ
-    if q:
-        q_lower = q.lower()
-        menus = [m for m in menus if q_lower in m["name"].lower() or q_lower in m.get("description", "").lower()]
-
-    # タグフィルタ（同じカテゴリ内はOR、異なるカテゴリ間はAND）
-    if tags:
-        from collections import defaultdict
-
-        tag_list = [t.strip() for t in tags.split(",")]
-
-        # タグをカテゴリ別にグループ化
-        tags_by_category = defaultdict(list)
-        for tag in tag_list:
-            category_found = False
-
-            # 定義済みカテゴリから検索
-            for category, category_tags in TAG_CATEGORIES.items():
-                if tag in category_tags:
-                    tags_by_category[category].append(tag)
-                    category_found = True
-                    break
-
-            # エリア・レストランは動的に判定（すべてのメニューをスキャン）
-            if not category_found:
-                # エリアまたはレストランとして扱う（動的カテゴリ）
-                # 同じタグは同じカテゴリとして扱う
-                tags_by_category[f"dynamic_{tag}"].append(tag)
-
-        # フィルタリング: 各カテゴリ内はOR、カテゴリ間はAND
-        def matches_tag_filter(menu):
-            menu_tags = set(menu.get("tags", []))
-
-            # 各カテゴリについて、少なくとも1つのタグがマッチする必要がある（AND）
-            for category, category_tag_list in tags_by_category.items():
-                # このカテゴリのタグのいずれかがマッチするか（OR）
-                if not any(tag in menu_tags for tag in category_tag_list):
-                    return False
-
-            return True
-
-        menus = [m for m in menus if matches_tag_filter(m)]
-
-    # カテゴリフィルタ（category フィールドと照合）
-    if categories:
-        category_list = [c.strip() for c in categories.split(",")]
-        menus = [m for m in menus if m.get("category") in category_list]
-
-    # 価格フィルタ
-    if min_price is not None:
-        menus = [m for m in menus if m["price"]["amount"] >= min_price]
-    if max_price is not None:
-        menus = [m for m in menus if m["price"]["amount"] <= max_price]
-
-    # パークフィルタ
-    if park:
-        menus = [m for m in menus if any(r["park"] == park for r in m.get("restaurants", []))]
-
-    # エリアフィルタ
-    if area:
-        menus = [m for m in menus if any(area.lower() in r["area"].lower() for r in m.get("restaurants", []))]
-
-    # レストランフィルタ（レストラン名で完全一致または部分一致）
-    if restaurant:
-        restaurant_lower = restaurant.lower()
-        menus = [m for m in menus if any(restaurant_lower in r["name"].lower() for r in m.get("restaurants", []))]
-
-    # キャラクターフィルタ
-    if character:
-        menus = [m for m in menus if any(character.lower() in c.lower() for c in m.get("characters", []))]
-
-    # ソート処理
-    if sort:
-        reverse = order == "desc"
-        if sort == "price":
-            menus = sorted(menus, key=lambda x: x["price"]["amount"], reverse=reverse)
-        elif sort == "name":
-            menus = sorted(menus, key=lambda x: x["name"], reverse=reverse)
-        elif sort == "scraped_at":
-            menus = sorted(menus, key=lambda x: x.get("scraped_at", ""), reverse=reverse)
-
-    # ページネーション
-    total = len(menus)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_menus = menus[start:end]
-
-    return MenuListResponse(
-        data=paginated_menus, meta={"total": total, "page": page, "limit": limit, "pages": (total + limit - 1) // limit}
+        print(f"[API /menus] only_available: {filters.only_available}, page: {page}, limit: {limit}")
+
+    # フィルタ・ソート・ページネーションはバックエンド（メモリ上のインデックスまたはSQLite）で実行
+    query = filters._replace(
+        sort=sort,
+        reverse=order == "desc",
+        offset=(page - 1) * limit,
+        limit=limit,
     )
 
+    snapshot = loader.load_snapshot()
+
+    # カーソルは同じデータ・同じ並び順の場合のみ有効（データが更新された場合は最初のページからやり直す）
+    if cursor is not None:
+        try:
+            query = query._replace(offset=0, after=decode_cursor(cursor, snapshot.version, query))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # クライアントが同じデータ・同じ条件のレスポンスを持っている場合は検索しない
+    if not_modified(request):
+        return Response(status_code=304)
+
+    # 同じ結果になる検索条件（タグの順序・表記の揺れなど）は同じキーでキャッシュする
+    key = canonical_query(query)
+    body = response_cache.get(snapshot, key)
+    if body is None:
+        # メニューはスナップショットごとにシリアライズ済みのバイト列を連結する（モデルでの再検証・再シリアライズなし）
+        try:
+            menu_bodies, total, last_key = loader.search_menu_json(query)
+        except ValueError as e:
+            # カーソルの位置・ソートキーの値が現在のデータと一致しない
+            if query.after is None:
+                raise
+            raise HTTPException(status_code=400, detail=str(e))
+        # 次のページがある場合のみ次のカーソルを返す（カーソルでは後続の件数が不明なため、ページが埋まれば返す）
+        has_next = len(menu_bodies) == limit and (cursor is not None or query.offset + limit < total)
+        meta = {
+            "total": total,
+            "page": None if cursor is not None else page,
+            "limit": limit,
+            "pages": (total + limit - 1) // limit,
+            "next_cursor": encode_cursor(snapshot.version, query, last_key) if has_next else None,
+        }
+        body = b'{"success":true,"data":[' + b",".join(menu_bodies) + b'],"meta":' + dump_json(meta) + b"}"
+        response_cache.put(snapshot, key, body)
+
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/menus/facets", response_model=StatsResponse, tags=["Menus"])
+async def get_menu_facets(request: Request, filters: MenuQuery = Depends(menu_filters)):
+    """
+    絞り込み結果のフィルタの値ごとのメニュー数を取得
+
+    /menus と同じ絞り込み条件を受け付け、その結果に含まれるメニュー数をタグ・カテゴリ・パーク・エリア・
+    レストラン・価格帯ごとに返します（フィルタを追加した場合の件数表示用）。
+    """
+    if not_modified(request):
+        return Response(status_code=304)
+    snapshot = loader.load_snapshot()
+    # /menus と同じ正規化でキャッシュする（一覧とはキーを区別）
+    key = ("facets", canonical_query(filters))
+    body = response_cache.get(snapshot, key)
+    if body is None:
+        body = dump_json({"success": True, "data": loader.get_facets(filters)})
+        response_cache.put(snapshot, key, body)
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/menus/batch", response_model=MenuBatchResponse, tags=["Menus"])
+async def get_menus_batch(
+    ids: str = Query(
+        ...,
+        min_length=4,
+        # 文字数ではなく件数（BATCH_MAX_IDS）で制限する（カンマ後の空白を含む指定でも400を返すため）。
+        # 件数は分割する前にカンマの数で確認するため、長い文字列を分割することはない
+        description=f"メニューID（4桁の数字、カンマ区切り、最大{BATCH_MAX_IDS}件）",
+    ),
+):
+    """
+    複数のメニューをIDで一括取得
+
+    指定した順序でメニューを返します。存在しないIDの位置は null で、meta.not_found にそのIDを返します。
+    お気に入り・共有リストの表示で、メニューごとに /menus/{menu_id} を呼ぶ代わりに使用します。
+    """
+    # 区切りの数で件数を確認してから分割する（空の区切りも1件として数える）
+    if ids.count(",") >= BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many menu IDs. Maximum is {BATCH_MAX_IDS}.")
+    menu_ids = [menu_id.strip() for menu_id in ids.split(",") if menu_id.strip()]
+
+    # 入力バリデーション: 4桁の数字のみ許可
+    if not menu_ids or not all(re.match(r"^[0-9]{4}$", menu_id) for menu_id in menu_ids):
+        raise HTTPException(status_code=400, detail="Invalid menu ID format. Must be 4 digits.")
+
+    # IDインデックスで位置を求め、事前シリアライズ済みのメニューを連結する（O(件数)）
+    body = loader.load_snapshot().get_batch_body(menu_ids)
+    return Response(content=body, media_type="application/json")
+
 
 @app.get("/menus/{menu_id}", response_model=MenuResponse, tags=["Menus"])
 async def get_menu(menu_id: str):
@@ -231,17 +389,35 @@ async def get_menu(menu_id: str):
         menu_id: メニューID（4桁の数字）
     """
     # 入力バリデーション: 4桁の数字のみ許可
-    import re
-
     if not re.match(r"^[0-9]{4}$", menu_id):
         raise HTTPException(status_code=400, detail="Invalid menu ID format. Must be 4 digits.")
 
-    menu = loader.get_menu_by_id(menu_id)
+    # IDインデックスで事前シリアライズ済みのボディを取得（O(1)）
+    body = loader.load_snapshot().get_detail_body(menu_id)
 
-    if not menu:
+    if body is None:
         raise HTTPException(status_code=404, detail="Menu not found")
 
-    return MenuResponse(data=menu)
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/suggest", response_model=ListResponse, tags=["Menus"])
+async def get_suggestions(
+    prefix: str = Query(
+        ..., min_length=1, max_length=100, description="入力中の文字列（ひらがな・カタカナ、全角・半角を区別しない）"
+    ),
+    limit: int = Query(10, ge=1, le=20, description="最大件数"),
+):
+    """
+    検索候補（オートコンプリート）を取得
+
+    メニュー名・タグ・レストラン名・エリア・キャラクターのうち、入力中の文字列に前方一致するものを
+    メニュー数の多い順に返します。
+    """
+    return Response(
+        content=dump_json({"success": True, "data": loader.load_snapshot().suggest(prefix, limit)}),
+        media_type="application/json",
+    )
 
 
 @app.get("/restaurants", response_model=ListResponse, tags=["Restaurants"])
@@ -249,16 +425,21 @@ async def get_restaurants(park: Optional[ParkType] = Query(None, description="
     """
     レストラン一覧を取得
     """
-    restaurants = loader.get_all_restaurants()
 
-    # パークフィルタ
-    if park:
-        restaurants = [r for r in restaurants if r["park"] == park]
+    def build() -> Dict[str, Any]:
+        restaurants = loader.get_all_restaurants()
+
+        # パークフィルタ
+        if park:
+            restaurants = [r for r in restaurants if r["park"] == park]
 
-    # エリアでソート
-    restaurants = sorted(restaurants, key=lambda r: (r["park"], r["area"], r["name"]))
+        # エリアでソート
+        restaurants = sorted(restaurants, key=lambda r: (r["park"], r["area"], r["name"]))
+        return {"success": True, "data": restaurants}
 
-    return ListResponse(data=restaurants)
+    # スナップショットごとにシリアライズ済みのボディを返す（パーク別もメモ化）
+    body = loader.load_snapshot().response_body(("restaurants", park.value if park else None), build)
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/tags", response_model=ListResponse, tags=["Tags"])
@@ -266,8 +447,8 @@ async def get_tags():
     """
     タグ一覧を取得
     """
-    tags = loader.get_all_tags()
-    return ListResponse(data=tags)
+    body = loader.load_snapshot().response_body("tags", lambda: {"success": True, "data": loader.get_all_tags()})
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/tags/grouped", tags=["Tags"])
@@ -291,68 +472,8 @@ async def get_grouped_tags(park: Optional[str] = None) -> Dict[str, Any]:
             ...
         }
     """
-    # メニューデータから実際に使用されているタグを抽出
-    menus = loader.load_menus()
-
-    # パークでフィルタリング
-    if park:
-        filtered_menus = []
-        for menu in menus:
-            for restaurant in menu.get("restaurants", []):
-                if restaurant.get("park", "").lower() == park.lower():
-                    filtered_menus.append(menu)
-                    break
-        menus = filtered_menus
-
-    # カテゴリごとのタグを格納
-    all_tags_by_category: Dict[str, set] = {category: set() for category in TAG_CATEGORIES.keys()}
-    all_tags_by_category["area"] = set()
-    all_tags_by_category["restaurant"] = set()
-
-    for menu in menus:
-        tags = menu.get("tags", [])
-
-        # 各カテゴリに分類
-        for tag in tags:
-            categorized = False
-
-            # 定義済みカテゴリに分類
-            for category, category_tags in TAG_CATEGORIES.items():
-                if tag in category_tags:
-                    all_tags_by_category[category].add(tag)
-                    categorized = True
-                    break
-
-            if categorized:
-                continue
-
-            # エリアタグの判定
-            for restaurant in menu.get("restaurants", []):
-                if tag == restaurant.get("area"):
-                    all_tags_by_category["area"].add(tag)
-                    categorized = True
-                    break
-
-            if categorized:
-                continue
-
-            # レストランタグの判定
-            for restaurant in menu.get("restaurants", []):
-                if tag == restaurant.get("name"):
-                    all_tags_by_category["restaurant"].add(tag)
-                    categorized = True
-                    break
-
-    # レスポンス構築
-    result = {}
-    for category, tags in all_tags_by_category.items():
-        if tags:  # タグが存在する場合のみ含める
-            result[category] = {
-                "label": CATEGORY_LABELS.get(category, category),
-                "tags": sorted(list(tags)),  # アルファベット順にソート
-            }
-
-    return result
+    # スナップショットごとに集計・シリアライズ済みのボディを返す（パーク別もメモ化）
+    return Response(content=loader.load_snapshot().grouped_tags_body(park), media_type="application/json")
 
 
 @app.get("/categories", response_model=ListResponse, tags=["Categories"])
@@ -360,32 +481,46 @@ async def get_categories():
     """
     メニューカテゴリ一覧とそれぞれのメニュー数を取得
     """
-    from collections import Counter
+    snapshot = loader.load_snapshot()
 
-    menus = loader.load_menus()
-    category_counts = Counter(menu.get("category", "other") for menu in menus)
+    def build() -> Dict[str, Any]:
+        category_counts = snapshot.category_counts
 
-    categories = []
-    for key, info in MENU_CATEGORIES.items():
-        categories.append(
-            {
-                "key": key,
-                "label": info["label"],
-                "description": info["description"],
-                "count": category_counts.get(key, 0),
-            }
-        )
+        categories = []
+        for key, info in MENU_CATEGORIES.items():
+            categories.append(
+                {
+                    "key": key,
+                    "label": info["label"],
+                    "description": info["description"],
+                    "count": category_counts.get(key, 0),
+                }
+            )
+        return {"success": True, "data": categories}
 
-    return ListResponse(data=categories)
+    body = snapshot.response_body("categories", build)
+    return Response(content=body, media_type="application/json")
 
 
 @app.get("/stats", response_model=StatsResponse, tags=["Stats"])
-async def get_stats():
+async def get_stats(
+    check_date: Optional[date] = Query(
+        None, alias="date", description="販売中メニュー数の基準日（YYYY-MM-DD、省略時は今日（JST））"
+    ),
+):
     """
     統計情報を取得
     """
-    stats = loader.get_stats()
-    return StatsResponse(data=stats)
+    stats = loader.get_stats(check_date)
+    return Response(content=dump_json({"success": True, "data": stats}), media_type="application/json")
+
+
+@app.get("/metrics", response_model=StatsResponse, tags=["Stats"])
+async def get_metrics():
+    """
+    実行時メトリクス（キャッシュのヒット率など）を取得
+    """
+    return StatsResponse(data={**loader.get_metrics(), "response_cache": response_cache.metrics()})
 
 
 # Vercel用: appをそのままエクスポート
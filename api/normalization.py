@@ -0,0 +1,38 @@
+"""
+検索用の文字列正規化モジュール
+
+検索文字列と、スナップショットごとに事前計算するメニューの検索キーに同じ正規化を適用し、
+表記の揺れ（ひらがな・カタカナ、全角・半角、大文字・小文字、長音符）を区別せずに部分一致させます。
+
+    >>> normalize_search_text("ぴざ") == normalize_search_text("ﾋﾟｻﾞ") == normalize_search_text("ピザ")
+    True
+"""
+
+import re
+import unicodedata
+
+# ひらがな（ぁ〜ゖ、ゝゞ） → カタカナ
+_KANA_FOLD = {code: code + 0x60 for code in range(0x3041, 0x3097)}
+_KANA_FOLD.update({0x309D: 0x30FD, 0x309E: 0x30FE})
+
+# カタカナ・長音符の直後のハイフン類（長音符の代わりに入力されるもの）と連続する長音符を1つの長音符にまとめる
+_LONG_VOWEL = re.compile("(?<=[ァ-ヺー])[ー\\-‐-―−]+")
+
+
+def normalize_search_text(text: str) -> str:
+    """
+    検索用に文字列を正規化
+
+    1. NFKC正規化（半角カタカナ → 全角、全角英数字・記号 → 半角、濁点・半濁点の合成）
+    2. 大文字小文字の統一（casefold）
+    3. ひらがな → カタカナ
+    4. 長音符の統一（カタカナの直後のハイフン類を長音符に置き換え、連続する長音符は1つにまとめる）
+
+    Args:
+        text: 対象文字列
+
+    Returns:
+        正規化した文字列
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_KANA_FOLD)
+    return _LONG_VOWEL.sub("ー", text)
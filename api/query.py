@@ -0,0 +1,449 @@
+"""
+ビットマップクエリエンジン
+
+スナップショットの転置インデックスを使い、フィルタ条件をビットマップ演算で評価します。
+"""
+
+import base64
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import date
+from itertools import islice
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from api.bitmap import from_positions, iter_positions
+from api.constants import TAG_CATEGORY_MAP
+from api.normalization import normalize_search_text
+from api.snapshot import MenuSnapshot, today_jst
+
+# 定義済みカテゴリに属さないタグ（エリア・レストラン）のグループ名接頭辞
+DYNAMIC_CATEGORY_PREFIX = "dynamic_"
+
+# 検索文字列との関連度順のソートキー（q がない場合は元の順序）
+RELEVANCE_SORT = "relevance"
+
+
+class MenuQuery(NamedTuple):
+    """
+    /menus の検索条件（フィルタ・ソート・ページネーション）
+
+    文字列のリストはタプルで保持します（空の場合はフィルタなし）。
+    sort が RELEVANCE_SORT の場合は常に関連度の高い順で、reverse は無視します。
+    after を指定した場合（カーソル）は offset を無視し、並び順でそのメニューより後から limit 件を返します。
+    """
+
+    q: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    park: Optional[str] = None
+    area: Optional[str] = None
+    restaurant: Optional[str] = None
+    character: Optional[str] = None
+    only_available: bool = False
+    check_date: Optional[date] = None
+    sort: Optional[str] = None
+    reverse: bool = False
+    offset: int = 0
+    limit: int = 50
+    after: Optional[Tuple[object, int]] = None
+
+
+def group_tags(tag_list: List[str]) -> Dict[str, List[str]]:
+    """
+    タグをカテゴリ別にグループ化
+
+    定義済みカテゴリのタグはそのカテゴリに、それ以外（エリア・レストラン）は
+    タグごとに独立した動的カテゴリ（dynamic_<タグ>）に分類します。
+
+    Args:
+        tag_list: タグのリスト
+
+    Returns:
+        カテゴリ → タグリストの辞書（カテゴリの初出順）
+    """
+    tags_by_category: Dict[str, List[str]] = {}
+    for tag in tag_list:
+        category = TAG_CATEGORY_MAP.get(tag)
+        if category is None:
+            # 同じタグは同じカテゴリとして扱う
+            category = f"{DYNAMIC_CATEGORY_PREFIX}{tag}"
+        tags_by_category.setdefault(category, []).append(tag)
+    return tags_by_category
+
+
+def tag_filter_bits(snapshot: MenuSnapshot, tag_list: List[str]) -> int:
+    """
+    タグフィルタに一致するメニューのビットマップ
+
+    同じカテゴリ内のタグはOR、異なるカテゴリ間はANDで結合します。
+
+    Args:
+        snapshot: メニューデータのスナップショット
+        tag_list: タグのリスト
+
+    Returns:
+        ビットマップ
+    """
+    tag_index = snapshot.postings.tags
+    bits = snapshot.all_bits
+    for category_tags in group_tags(tag_list).values():
+        bits &= snapshot.union_bits(tag_index, category_tags)
+        if not bits:
+            break
+    return bits
+
+
+# 昇順・降順を指定できるソートキー
+ORDERED_SORTS = ("price", "name", "scraped_at")
+
+
+def canonical_query(query: MenuQuery) -> MenuQuery:
+    """
+    同じ結果になる検索条件を同じ値にそろえる（キャッシュのキー用）
+
+    - タグ・カテゴリは順序・重複を問わない（ソートして重複を除く）
+    - 部分一致の文字列は normalize_search_text() で正規化
+    - 販売中のみ（only_available）は基準日（今日（JST））に解決
+    - 順序を指定できないソート（関連度順・ソートなし）の reverse は無視
+
+    Args:
+        query: 検索条件
+
+    Returns:
+        正規化した検索条件（検索の実行には元の検索条件を使用すること）
+    """
+    check_date = query.check_date
+    if check_date is None and query.only_available:
+        check_date = today_jst()
+    return query._replace(
+        q=normalize_search_text(query.q) if query.q else None,
+        tags=tuple(sorted(set(query.tags))),
+        categories=tuple(sorted(set(query.categories))),
+        area=normalize_search_text(query.area) if query.area else None,
+        restaurant=normalize_search_text(query.restaurant) if query.restaurant else None,
+        character=normalize_search_text(query.character) if query.character else None,
+        only_available=False,
+        check_date=check_date,
+        reverse=query.reverse and query.sort in ORDERED_SORTS,
+    )
+
+
+def encode_cursor(version: str, query: MenuQuery, key: Tuple[object, int]) -> str:
+    """
+    次のページのカーソルを作成
+
+    カーソルはスナップショットのバージョン・ソート項目と方向・ページの最後のメニューの
+    (ソートキーの値, メニュー位置) をJSONにしてURLセーフなBase64で符号化した文字列です（クライアントには不透明）。
+    同じ並び順の中ではメニュー位置が同じソートキーの値の順序を決めるため、位置をIDの代わりに記録します。
+
+    Args:
+        version: スナップショットのバージョン
+        query: 検索条件
+        key: ページの最後のメニューの (ソートキーの値, メニュー位置)
+
+    Returns:
+        カーソル
+    """
+    reverse = query.reverse and query.sort in ORDERED_SORTS
+    payload = json.dumps([version, query.sort, reverse, key[0], key[1]], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, version: str, query: MenuQuery) -> Tuple[object, int]:
+    """
+    カーソルを検証して (ソートキーの値, メニュー位置) を取得
+
+    Args:
+        cursor: encode_cursor() で作成したカーソル
+        version: 現在のスナップショットのバージョン
+        query: 検索条件（ソート項目と方向がカーソルと一致すること）
+
+    Returns:
+        直前のページの最後のメニューの (ソートキーの値, メニュー位置)
+
+    Raises:
+        ValueError: カーソルが不正、データが更新された、またはソート項目・方向が異なる場合
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_version, sort, reverse, value, pos = payload
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(pos, int) or isinstance(value, (list, dict, float)):
+        raise ValueError("Invalid cursor")
+    if cursor_version != version:
+        raise ValueError("Cursor expired because the data was updated. Start again from the first page.")
+    if sort != query.sort or reverse != (query.reverse and query.sort in ORDERED_SORTS):
+        raise ValueError("Cursor does not match the sort order")
+    return value, pos
+
+
+# 検索文字列の絞り込みキャッシュの最大件数
+REFINEMENT_CACHE_SIZE = 256
+
+
+class RefinementCache:
+    """
+    入力途中の検索文字列（q）の絞り込み結果のLRUキャッシュ
+
+    検索文字列以外のフィルタ（タグ・カテゴリ・パーク・エリア・レストラン・キャラクター・販売日）と
+    正規化した検索文字列の組 → 検索文字列まで適用したビットマップを保持します。
+    「チュ」→「チュロ」→「チュロス」のように、キャッシュ済みの検索文字列を前方に含む検索文字列は
+    キャッシュ済みの結果のみを候補として確認します（含む文字列の一致結果は、含まれる文字列の一致結果の部分集合）。
+
+    スナップショットが変わるとキャッシュを破棄します。複数スレッドから使用できます。
+    """
+
+    def __init__(self, maxsize: int = REFINEMENT_CACHE_SIZE):
+        """
+        初期化
+
+        Args:
+            maxsize: 最大件数
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple, int]" = OrderedDict()
+        self._snapshot_ref: Optional[weakref.ref] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.refinements = 0
+        self.misses = 0
+        # キャッシュにより確認を省略したメニュー数
+        self.skipped_candidates = 0
+
+    @staticmethod
+    def filter_key(query: MenuQuery) -> Tuple:
+        """検索文字列より前に適用するフィルタのキー（canonical_query() で正規化）"""
+        query = canonical_query(query)
+        return (
+            query.tags,
+            query.categories,
+            query.park,
+            query.area,
+            query.restaurant,
+            query.character,
+            query.check_date,
+        )
+
+    def _lookup(self, snapshot: MenuSnapshot, key: Tuple, q_key: str) -> Tuple[Optional[str], int]:
+        """キャッシュ済みで最も長い前方部分の検索文字列とそのビットマップ（ロック内で呼び出す）"""
+        if self._snapshot_ref is None or self._snapshot_ref() is not snapshot:
+            self._entries.clear()
+            self._snapshot_ref = weakref.ref(snapshot)
+            return None, 0
+        for end in range(len(q_key), 0, -1):
+            bits = self._entries.get((key, q_key[:end]))
+            if bits is not None:
+                self._entries.move_to_end((key, q_key[:end]))
+                return q_key[:end], bits
+        return None, 0
+
+    def text_bits(self, snapshot: MenuSnapshot, query: MenuQuery, bits: int) -> int:
+        """
+        検索文字列で絞り込んだビットマップ（MenuSnapshot.text_bits() と同じ結果）
+
+        Args:
+            snapshot: メニューデータのスナップショット
+            query: 検索条件（q が空でないこと）
+            bits: 検索文字列より前のフィルタを適用したビットマップ
+
+        Returns:
+            ビットマップ
+        """
+        q_key = normalize_search_text(query.q)
+        if not q_key:
+            return bits
+        key = self.filter_key(query)
+        with self._lock:
+            cached_q, cached_bits = self._lookup(snapshot, key, q_key)
+        if cached_q == q_key:
+            result = cached_bits
+        else:
+            result = snapshot.text_bits(query.q, cached_bits if cached_q is not None else bits)
+
+        with self._lock:
+            if cached_q == q_key:
+                self.hits += 1
+                self.skipped_candidates += bits.bit_count()
+            elif cached_q is not None:
+                self.refinements += 1
+                self.skipped_candidates += bits.bit_count() - cached_bits.bit_count()
+            else:
+                self.misses += 1
+            self._entries[(key, q_key)] = result
+            self._entries.move_to_end((key, q_key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return result
+
+    def metrics(self) -> Dict:
+        """ヒット率と省略した処理量"""
+        with self._lock:
+            lookups = self.hits + self.refinements + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "refinements": self.refinements,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.refinements) / lookups if lookups else 0.0,
+                "skipped_candidates": self.skipped_candidates,
+            }
+
+
+def filter_bits(snapshot: MenuSnapshot, query: MenuQuery, cache: Optional[RefinementCache] = None) -> int:
+    """
+    インデックスで判定できるフィルタ（価格以外）に一致するメニューのビットマップ
+
+    Args:
+        snapshot: メニューデータのスナップショット
+        query: 検索条件（ソート・ページネーションは使用しない）
+        cache: 検索文字列の絞り込みキャッシュ（Noneの場合は使用しない）
+
+    Returns:
+        ビットマップ
+    """
+    postings = snapshot.postings
+    bits = snapshot.all_bits
+
+    # タグフィルタ（同じカテゴリ内はOR、異なるカテゴリ間はAND）
+    if query.tags:
+        bits &= tag_filter_bits(snapshot, list(query.tags))
+
+    # カテゴリフィルタ（category フィールドと照合）
+    if query.categories:
+        bits &= snapshot.union_bits(postings.categories, list(query.categories))
+
+    # パークフィルタ
+    if query.park:
+        bits &= postings.parks.get(query.park, 0)
+
+    # エリアフィルタ
+    if query.area:
+        bits &= snapshot.substring_bits("areas", query.area)
+
+    # レストランフィルタ（レストラン名で完全一致または部分一致）
+    if query.restaurant:
+        bits &= snapshot.substring_bits("restaurant_names", query.restaurant)
+
+    # キャラクターフィルタ
+    if query.character:
+        bits &= snapshot.substring_bits("characters", query.character)
+
+    # 販売中のみフィルタ（販売期間インデックスで判定）
+    if query.only_available or query.check_date is not None:
+        bits &= snapshot.available_bits(query.check_date)
+
+    # 検索フィルタ（n-gramインデックスで候補を絞り込み、候補のみ文字列で確認）
+    if query.q and bits:
+        if cache is not None:
+            bits = cache.text_bits(snapshot, query, bits)
+        else:
+            bits = snapshot.text_bits(query.q, bits)
+
+    return bits
+
+
+def facet_counts(snapshot: MenuSnapshot, query: MenuQuery, cache: Optional[RefinementCache] = None) -> Dict:
+    """
+    /menus と同じ条件の絞り込み結果について、フィルタの値ごとのメニュー数を集計
+
+    価格フィルタがある場合のみ、価格列で絞り込んだメニュー位置をビットマップに戻します。
+
+    Args:
+        snapshot: メニューデータのスナップショット
+        query: 検索条件（ソート・ページネーションは使用しない）
+        cache: 検索文字列の絞り込みキャッシュ（Noneの場合は使用しない）
+
+    Returns:
+        MenuSnapshot.facet_counts() の結果
+    """
+    bits = filter_bits(snapshot, query, cache)
+    if query.min_price is not None or query.max_price is not None:
+        bits = from_positions(snapshot.columns.filter_price(snapshot.positions(bits), query.min_price, query.max_price))
+    return snapshot.facet_counts(bits)
+
+
+def search_snapshot(
+    snapshot: MenuSnapshot, query: MenuQuery, cache: Optional[RefinementCache] = None
+) -> Tuple[List[Dict], int]:
+    """
+    スナップショットに対して /menus の検索を実行
+
+    Args:
+        snapshot: メニューデータのスナップショット
+        query: 検索条件
+        cache: 検索文字列の絞り込みキャッシュ（Noneの場合は使用しない）
+
+    Returns:
+        (ページ内のメニューデータ, 条件に一致した総件数)
+    """
+    positions, total = search_positions(snapshot, query, cache)
+    return snapshot.records(positions), total
+
+
+def search_positions(
+    snapshot: MenuSnapshot, query: MenuQuery, cache: Optional[RefinementCache] = None
+) -> Tuple[List[int], int]:
+    """
+    スナップショットに対して /menus の検索を実行し、ページ内のメニュー位置を取得
+
+    インデックスで判定できるフィルタ（検索文字列を含む）はビットマップ演算で絞り込み、価格・ソートは
+    メニュー位置と列で処理します。レコードの取得・シリアライズは呼び出し側でページ分のみ行います。
+
+    Args:
+        snapshot: メニューデータのスナップショット
+        query: 検索条件
+        cache: 検索文字列の絞り込みキャッシュ（Noneの場合は使用しない）
+
+    Returns:
+        (ページ内のメニュー位置, 条件に一致した総件数)
+
+    Raises:
+        ValueError: カーソル（after）がこのスナップショットの並び順と一致しない場合
+    """
+    bits = filter_bits(snapshot, query, cache)
+
+    # 価格フィルタがなく、元の順序または並び順を辿ってページを求められる場合はメニュー位置に展開しない（件数はビット数）
+    if query.min_price is None and query.max_price is None:
+        if not query.sort:
+            total = bits.bit_count()
+            offset = query.offset
+            if query.after is not None:
+                # カーソルのメニュー位置より後のビットのみ残す
+                bits &= -1 << (snapshot.check_cursor(query.after, None, None)[1] + 1)
+                offset = 0
+            return list(islice(iter_positions(bits), offset, offset + query.limit)), total
+        if query.sort in ORDERED_SORTS:
+            k = query.limit if query.after is not None else query.offset + query.limit
+            page = snapshot.walk_bits(bits, query.sort, query.reverse, k, query.after)
+            if page is not None:
+                return (page if query.after is not None else page[query.offset :]), bits.bit_count()
+
+    # 以降はメニュー位置で絞り込み・ソートし、ページ分のレコードのみ取得する
+    positions = snapshot.positions(bits)
+
+    # 価格フィルタ（価格列で判定）
+    positions = snapshot.columns.filter_price(positions, query.min_price, query.max_price)
+
+    total = len(positions)
+
+    # カーソル（直前のページの最後のメニューより後から再開する）
+    if query.after is not None:
+        return snapshot.page_after(positions, query.sort, query.reverse, query.q, query.after, query.limit), total
+
+    end = query.offset + query.limit
+
+    # 関連度順（上位 offset + limit 件のみ順位付けする）
+    if query.sort == RELEVANCE_SORT:
+        if query.q:
+            positions = snapshot.rank_positions(positions, query.q, end)
+    # ソート処理
+    elif query.sort:
+        positions = snapshot.sort_positions(positions, query.sort, reverse=query.reverse, limit=end)
+
+    return list(positions[query.offset : end]), total
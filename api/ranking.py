@@ -0,0 +1,200 @@
+"""
+検索結果の関連度ランキング（sort=relevance）
+
+正規化したメニュー名・説明文・タグ・キャラクターの文字グラム（1文字・2文字）を語として、
+BM25F（フィールドごとに重み付けしたBM25）のスコアを計算します。
+クエリに依存しない (語, メニュー) ごとのスコア寄与はスナップショットごとに事前計算し、
+リクエスト時は検索文字列のグラムの寄与を合計して、ヒープで上位k件のみを順位付けします。
+
+スコア寄与は SCORE_SCALE 倍した整数で保持するため、合計の順序によらず同じスコアになります
+（SQLiteバックエンドでも同一の順位になります）。
+"""
+
+import heapq
+import math
+from bisect import bisect_left
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# フィールドの重み（名前での一致を最も重視する）
+FIELD_WEIGHTS: Dict[str, float] = {"name": 3.0, "tags": 1.5, "characters": 1.5, "description": 1.0}
+
+# BM25のパラメータ（語の出現回数の飽和、フィールド長の正規化）
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# スコア寄与を整数化する倍率
+SCORE_SCALE = 1_000_000
+
+# 対象のメニュー数がポスティング長のこの割合未満の場合は、ポスティングを走査せず二分探索で寄与を求める
+BISECT_RATIO = 1 / 4
+
+
+def gram_counts(text: str) -> Counter:
+    """文字列に含まれる1文字・2文字のグラムの出現回数"""
+    counts = Counter(text)
+    counts.update(text[i : i + 2] for i in range(len(text) - 1))
+    return counts
+
+
+class RelevanceIndex:
+    """
+    BM25Fの事前計算済み転置インデックス
+
+    ポスティングは語ごとの配列ではなく、すべての語のポスティングを連結した配列と語ごとの開始位置で保持します
+    （語ごとに配列を持つと、数千個の配列オブジェクトのヘッダー・余剰領域がデータ本体と同程度のメモリを使うため）。
+
+    Attributes:
+        terms: 語 → 語番号
+        offsets: 語番号ごとのポスティングの開始位置（末尾に終端位置を含む、array("I")）
+        positions: メニュー位置（語番号順に連結、語ごとに昇順、array("I")）
+        contributions: positions と同じ並びのスコア寄与（array("I")）
+    """
+
+    def __init__(self, terms: Dict[str, int], offsets: array, positions: array, contributions: array):
+        self.terms = terms
+        self.offsets = offsets
+        self.positions = positions
+        self.contributions = contributions
+        # スライスしてもコピーしないビュー
+        self._positions = memoryview(positions)
+        self._contributions = memoryview(contributions)
+
+    @classmethod
+    def build(cls, fields: Dict[str, Sequence[Iterable[str]]]) -> "RelevanceIndex":
+        """
+        フィールドの文字列から構築
+
+        Args:
+            fields: フィールド名（FIELD_WEIGHTSのキー） → メニュー位置ごとの文字列の並び（正規化済み）
+
+        Returns:
+            インデックス
+        """
+        count = len(next(iter(fields.values()), []))
+        # フィールドごとの語の出現回数と長さ
+        field_counts: Dict[str, List[Counter]] = {}
+        field_lengths: Dict[str, List[int]] = {}
+        for name, values in fields.items():
+            counts = []
+            lengths = []
+            for texts in values:
+                counter: Counter = Counter()
+                length = 0
+                for text in texts:
+                    counter.update(gram_counts(text))
+                    length += len(text)
+                counts.append(counter)
+                lengths.append(length)
+            field_counts[name] = counts
+            field_lengths[name] = lengths
+
+        # 語ごとに、フィールドの重みと長さで正規化した出現回数を合計する
+        weighted: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for name, counts in field_counts.items():
+            weight = FIELD_WEIGHTS[name]
+            lengths = field_lengths[name]
+            average = sum(lengths) / count if count else 0
+            for pos, counter in enumerate(counts):
+                norm = 1 - BM25_B + BM25_B * lengths[pos] / average if average else 1
+                for term, tf in counter.items():
+                    weighted[term][pos] = weighted[term].get(pos, 0.0) + weight * tf / norm
+
+        terms: Dict[str, int] = {}
+        offsets = array("I", [0])
+        positions = array("I")
+        contributions = array("I")
+        for term, tfs in weighted.items():
+            idf = math.log(1 + (count - len(tfs) + 0.5) / (len(tfs) + 0.5))
+            term_positions = sorted(tfs)
+            terms[term] = len(terms)
+            positions.extend(term_positions)
+            contributions.extend(
+                round(idf * tfs[pos] * (BM25_K1 + 1) / (tfs[pos] + BM25_K1) * SCORE_SCALE) for pos in term_positions
+            )
+            offsets.append(len(positions))
+        return cls(terms, offsets, positions, contributions)
+
+    def posting(self, term: str) -> Optional[Tuple[Sequence[int], Sequence[int]]]:
+        """
+        語のポスティング
+
+        Args:
+            term: 語（グラム）
+
+        Returns:
+            (メニュー位置の昇順の並び, スコア寄与の並び)（コピーしないビュー）。語がない場合はNone
+        """
+        number = self.terms.get(term)
+        if number is None:
+            return None
+        start, end = self.offsets[number], self.offsets[number + 1]
+        return self._positions[start:end], self._contributions[start:end]
+
+    def items(self) -> Iterator[Tuple[str, Sequence[int], Sequence[int]]]:
+        """すべての語と (メニュー位置の並び, スコア寄与の並び) を語番号順に列挙"""
+        for term in self.terms:
+            positions, contributions = self.posting(term)
+            yield term, positions, contributions
+
+    def to_state(self) -> Tuple[List[str], bytes, bytes, bytes]:
+        """バイナリスナップショット保存用の組み込み型表現（語は語番号順のリスト、配列はバイト列に変換）"""
+        return list(self.terms), self.offsets.tobytes(), self.positions.tobytes(), self.contributions.tobytes()
+
+    @classmethod
+    def from_state(cls, state: Tuple[List[str], bytes, bytes, bytes]) -> "RelevanceIndex":
+        """to_state() の結果から復元"""
+        terms, *buffers = state
+        offsets, positions, contributions = (array("I") for _ in buffers)
+        for values, data in zip((offsets, positions, contributions), buffers):
+            values.frombytes(data)
+        return cls({term: number for number, term in enumerate(terms)}, offsets, positions, contributions)
+
+    def scores(self, terms: Iterable[str], positions: Optional[Sequence[int]] = None) -> Dict[int, int]:
+        """
+        語の集合に対するメニューごとのスコア
+
+        Args:
+            terms: 検索文字列の語（グラム）
+            positions: 対象のメニュー位置（昇順、Noneの場合は全メニュー）
+
+        Returns:
+            メニュー位置 → スコア（いずれの語も含まないメニューは含まない。
+            positions を指定した場合、対象外のメニューを含むことがある）
+        """
+        scores: Dict[int, int] = defaultdict(int)
+        for term in terms:
+            posting = self.posting(term)
+            if posting is None:
+                continue
+            term_positions, term_scores = posting
+            if positions is not None and len(positions) < len(term_positions) * BISECT_RATIO:
+                # 対象が少ない場合は対象ごとにポスティングを二分探索する（対象は昇順のため前回の位置から探索）
+                size = len(term_positions)
+                i = 0
+                for pos in positions:
+                    i = bisect_left(term_positions, pos, i)
+                    if i < size and term_positions[i] == pos:
+                        scores[pos] += term_scores[i]
+            else:
+                for pos, score in zip(term_positions, term_scores):
+                    scores[pos] += score
+        return scores
+
+    def top_k(self, positions: Sequence[int], terms: Iterable[str], k: int) -> List[int]:
+        """
+        スコアの高い順に上位k件のメニュー位置を取得（ヒープで上位k件のみを順位付け）
+
+        同じスコアの場合は元の順序（メニュー位置の昇順）を保ちます。
+
+        Args:
+            positions: 対象のメニュー位置（昇順）
+            terms: 検索文字列の語（グラム）
+            k: 取得件数
+
+        Returns:
+            メニュー位置のリスト（スコアの降順）
+        """
+        get = self.scores(terms, positions).get
+        return heapq.nlargest(k, positions, key=lambda pos: get(pos, 0))
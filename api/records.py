@@ -0,0 +1,279 @@
+"""
+コンパクトなメニューレコード
+
+json.loadsで得た辞書の代わりに、__slots__ を使ったレコード（メニュー・レストラン・価格・販売期間）で
+メニューデータを保持し、メモリ使用量を削減します。
+
+- 文字列は辞書符号化（同じ値は同じオブジェクトを共有）
+- リストはタプルに変換し、同じ内容のタプル（タグの組み合わせなど）も共有
+- 同じ内容の価格・販売期間のレコードは1つのオブジェクトを共有
+- レストランは正規化し、レストラン表の行（RestaurantRecord）をメニュー間で共有。
+  メニューごとに異なる販売期間は関連レコード（MenuRestaurantRecord）に保持
+
+レコードは読み取り専用のMappingとして振る舞うため、インデックス構築などで辞書と同じように
+`menu.get("tags", [])` の形で参照できます。APIから返す際は `to_dict()` でJSONと同じ形（辞書とリスト）に変換します。
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Record(Mapping):
+    """
+    __slots__ を使った読み取り専用レコードの基底クラス
+
+    FIELDS に定義したキーはスロットに格納し、未設定のスロットは「キーなし」として扱います。
+    FIELDS 以外のキーは _extra 辞書に格納します。
+    """
+
+    __slots__ = ("_extra",)
+    FIELDS: Tuple[str, ...] = ()
+    _descriptors: Dict[str, Any] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # キー → スロット記述子（getattrと違いメソッド名と衝突しない）
+        cls._descriptors = {name: cls.__dict__[name] for name in cls.FIELDS}
+
+    def __getitem__(self, key: str) -> Any:
+        descriptor = self._descriptors.get(key)
+        if descriptor is not None:
+            try:
+                return descriptor.__get__(self, None)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        descriptor = self._descriptors.get(key)
+        if descriptor is not None:
+            try:
+                return descriptor.__get__(self, None)
+            except AttributeError:
+                return default
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for key, descriptor in self._descriptors.items():
+            try:
+                descriptor.__get__(self, None)
+            except AttributeError:
+                continue
+            yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict:
+        """JSONと同じ形（辞書とリスト）に変換"""
+        return {key: to_json_shape(self[key]) for key in self}
+
+
+class AvailabilityRecord(Record):
+    """販売期間"""
+
+    FIELDS = ("start_date", "end_date")
+    __slots__ = FIELDS
+
+
+class PriceRecord(Record):
+    """価格"""
+
+    FIELDS = ("amount", "unit", "tax_included")
+    __slots__ = FIELDS
+
+
+class RestaurantRecord(Record):
+    """
+    レストラン表の行（販売期間を除くレストラン情報）
+
+    同じ内容の行は全メニューで1つのオブジェクトを共有します。
+    availability はキーの順序を定義するためのスロットで、行には設定しません。
+    """
+
+    FIELDS = ("id", "name", "park", "area", "url", "availability", "service_types")
+    __slots__ = FIELDS
+
+
+class MenuRestaurantRecord(Record):
+    """
+    メニューとレストランの関連（メニューの restaurants の要素）
+
+    販売期間のみを保持し、それ以外の項目はレストラン表の行を参照します。
+    キーの順序は元のレストラン情報と同じです。
+    """
+
+    FIELDS = ("availability",)
+    __slots__ = ("restaurant",) + FIELDS
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "availability":
+            return super().__getitem__(key)
+        return self.restaurant[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "availability":
+            return super().get(key, default)
+        return self.restaurant.get(key, default)
+
+    def __iter__(self) -> Iterator[str]:
+        restaurant = self.restaurant
+        for key in RestaurantRecord.FIELDS:
+            if key == "availability":
+                if super().get(key, _MISSING) is not _MISSING:
+                    yield key
+            elif restaurant.get(key, _MISSING) is not _MISSING:
+                yield key
+        if restaurant._extra is not None:
+            yield from restaurant._extra
+
+
+class MenuRecord(Record):
+    """メニュー（キーの順序はスクレイパーが出力するJSONと同じ）"""
+
+    FIELDS = (
+        "id",
+        "name",
+        "description",
+        "price",
+        "image_urls",
+        "thumbnail_url",
+        "restaurants",
+        "categories",
+        "tags",
+        "characters",
+        "source_url",
+        "scraped_at",
+        "is_seasonal",
+        "is_available",
+        "allergens",
+        "nutritional_info",
+        "last_updated",
+        "is_new",
+        "category",
+    )
+    __slots__ = FIELDS
+
+
+_MISSING = object()
+
+# ネストした辞書をレコードに変換するキー
+_NESTED_RECORDS = {"price": PriceRecord, "restaurants": MenuRestaurantRecord, "availability": AvailabilityRecord}
+
+
+def to_json_shape(value: Any) -> Any:
+    """レコード・タプルを辞書・リストに変換（それ以外はそのまま）"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [to_json_shape(v) for v in value]
+    if isinstance(value, dict):
+        return {k: to_json_shape(v) for k, v in value.items()}
+    return value
+
+
+def as_dict(record: Mapping) -> Dict:
+    """メニュー・レストランをAPIのJSONと同じ形で取得（辞書の場合はそのまま返す）"""
+    return record.to_dict() if isinstance(record, Record) else record
+
+
+class _Compactor:
+    """辞書符号化テーブルとレコード共有キャッシュ（変換中のみ使用）"""
+
+    def __init__(self):
+        self.values: Dict[Any, Any] = {}
+        self.records: Dict[Tuple, Record] = {}
+
+    def value(self, value: Any, record_type: Optional[type] = None) -> Any:
+        """値をコンパクトな表現に変換"""
+        if isinstance(value, str):
+            return self.values.setdefault(value, value)
+        if isinstance(value, list):
+            items = tuple(self.value(v, record_type) for v in value)
+            try:
+                return self.values.setdefault(items, items)
+            except TypeError:
+                # レコードなどハッシュできない要素を含むタプルはそのまま
+                return items
+        if isinstance(value, dict):
+            if record_type is not None:
+                return self.record(record_type, value)
+            return {self.value(k): self.value(v) for k, v in value.items()}
+        return value
+
+    def record(self, record_type: type, data: Dict) -> Record:
+        """辞書をレコードに変換（同じ内容のレコードは共有）"""
+        if record_type is MenuRestaurantRecord:
+            return self.restaurant_edge(data)
+        # メニューは内容が一意なため共有しない
+        key = None if record_type is MenuRecord else (record_type, _freeze(data))
+        if key is not None:
+            record = self.records.get(key)
+            if record is not None:
+                return record
+
+        record = record_type.__new__(record_type)
+        extra = None
+        for name, value in data.items():
+            value = self.value(value, _NESTED_RECORDS.get(name))
+            descriptor = record_type._descriptors.get(name)
+            if descriptor is not None:
+                descriptor.__set__(record, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[self.value(name)] = value
+        record._extra = extra
+        if key is not None:
+            self.records[key] = record
+        return record
+
+    def restaurant_edge(self, data: Dict) -> MenuRestaurantRecord:
+        """メニュー内のレストラン情報をレストラン表の行と販売期間に分けて変換"""
+        row = self.record(RestaurantRecord, {key: value for key, value in data.items() if key != "availability"})
+        availability = data.get("availability", _MISSING)
+        key = (MenuRestaurantRecord, id(row), _freeze(availability))
+        edge = self.records.get(key)
+        if edge is None:
+            edge = MenuRestaurantRecord.__new__(MenuRestaurantRecord)
+            edge.restaurant = row
+            if availability is not _MISSING:
+                edge.availability = self.value(availability, AvailabilityRecord)
+            edge._extra = None
+            self.records[key] = edge
+        return edge
+
+
+def _freeze(value: Any) -> Any:
+    """辞書・リストをハッシュ可能な形に変換（共有キャッシュのキー用）"""
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def compact_menus(menus: Iterable[Dict]) -> List[MenuRecord]:
+    """
+    メニューデータ（辞書のリスト）をコンパクトなレコードのリストに変換
+
+    Args:
+        menus: メニューデータ（json.loadsの結果、イテレータ可）
+
+    Returns:
+        MenuRecordのリスト（元の順序）
+    """
+    compactor = _Compactor()
+    return [compactor.record(MenuRecord, menu) if isinstance(menu, dict) else compactor.value(menu) for menu in menus]
@@ -0,0 +1,81 @@
+"""
+スナップショット再構築マネージャー
+
+データファイルの変更を検知したとき、次のスナップショット（データとすべてのインデックス）を
+リクエスト処理とは別のバックグラウンドスレッドで構築します。
+再構築の要求が重なった場合は1回の再構築にまとめられます。
+"""
+
+import threading
+import traceback
+from typing import Callable, Optional
+
+
+class SnapshotReloader:
+    """
+    バックグラウンド再構築スレッドの管理クラス
+
+    `request()` で再構築を要求します。ワーカースレッドは要求があるか、
+    ポーリング間隔が経過するたびに `rebuild` を呼び出します。
+    再構築中に届いた要求は、完了後の1回の再構築にまとめられます。
+    """
+
+    def __init__(self, rebuild: Callable[[], object], poll_interval: Optional[float] = None):
+        """
+        初期化
+
+        Args:
+            rebuild: 再構築処理（変更がなければ何もしないこと）
+            poll_interval: ポーリング間隔（秒、Noneの場合は要求時のみ再構築）
+        """
+        self._rebuild = rebuild
+        self.poll_interval = poll_interval
+        self._requested = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.rebuild_count = 0
+
+    def start(self) -> None:
+        """ワーカースレッドを起動（起動済みの場合は何もしない）"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                thread = threading.Thread(target=self._run, name="menu-snapshot-reloader", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def request(self) -> None:
+        """再構築を要求（ブロックしない）"""
+        self.start()
+        self._requested.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        ワーカースレッドを停止
+
+        Args:
+            timeout: 停止を待つ最大秒数（Noneの場合は無制限）
+        """
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        self._requested.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        """ワーカースレッド本体"""
+        while True:
+            self._requested.wait(self.poll_interval)
+            if self._stopped:
+                return
+            # 再構築前にクリアし、再構築中の要求は次の1回にまとめる
+            self._requested.clear()
+            try:
+                self._rebuild()
+                self.rebuild_count += 1
+            except Exception:
+                # 再構築に失敗しても現在のスナップショットで処理を継続する
+                traceback.print_exc()
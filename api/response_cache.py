@@ -0,0 +1,138 @@
+"""
+レスポンスキャッシュ
+
+よく使われる検索条件（park=tdl、categories=dessert など）のレスポンスボディ（シリアライズ済みのバイト列）を
+プロセス内のLRUキャッシュに保持します。件数・合計バイト数・有効期限（TTL）で古いものから破棄し、
+スナップショットが変わるとすべて破棄します。
+"""
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from api.snapshot import MenuSnapshot
+
+# デフォルトの最大件数・最大合計バイト数・有効期限（秒）
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+RESPONSE_CACHE_TTL = 300.0
+
+
+class ResponseCache:
+    """
+    レスポンスボディのLRU/TTLキャッシュ
+
+    キーはスナップショットのバージョンと、呼び出し側で正規化した検索条件の組です。
+    複数スレッドから使用できます。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        max_bytes: int = RESPONSE_CACHE_BYTES,
+        ttl: float = RESPONSE_CACHE_TTL,
+    ):
+        """
+        初期化
+
+        Args:
+            maxsize: 最大件数（0の場合はキャッシュしない）
+            max_bytes: ボディの最大合計バイト数
+            ttl: 有効期限（秒）
+        """
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # キー → (ボディ, 有効期限（time.monotonic()）)
+        self._entries: "OrderedDict[Tuple, Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self._snapshot_ref: Optional[weakref.ref] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _check_snapshot(self, snapshot: MenuSnapshot) -> None:
+        """スナップショットが変わった場合はすべて破棄（ロック内で呼び出す）"""
+        if self._snapshot_ref is None or self._snapshot_ref() is not snapshot:
+            self._entries.clear()
+            self._bytes = 0
+            self._snapshot_ref = weakref.ref(snapshot)
+
+    def get(self, snapshot: MenuSnapshot, key: Hashable) -> Optional[bytes]:
+        """
+        キャッシュ済みのボディを取得
+
+        Args:
+            snapshot: 現在のスナップショット
+            key: 正規化した検索条件
+
+        Returns:
+            ボディまたはNone（キャッシュにない・期限切れの場合）
+        """
+        entry_key = (snapshot.version, key)
+        with self._lock:
+            self._check_snapshot(snapshot)
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(entry_key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, snapshot: MenuSnapshot, key: Hashable, body: bytes) -> None:
+        """
+        ボディを保存（件数・合計バイト数を超えた分は古いものから破棄）
+
+        Args:
+            snapshot: ボディを作成したスナップショット
+            key: 正規化した検索条件
+            body: レスポンスボディ
+        """
+        if self.maxsize <= 0 or len(body) > self.max_bytes:
+            return
+        entry_key = (snapshot.version, key)
+        with self._lock:
+            self._check_snapshot(snapshot)
+            if entry_key in self._entries:
+                self._remove(entry_key)
+            self._entries[entry_key] = (body, time.monotonic() + self.ttl)
+            self._bytes += len(body)
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_key: Tuple) -> None:
+        """エントリを削除（ロック内で呼び出す）"""
+        body, _ = self._entries.pop(entry_key)
+        self._bytes -= len(body)
+
+    def clear(self) -> None:
+        """すべて破棄"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> Dict:
+        """ヒット数・ミス数・破棄数と現在のサイズ"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
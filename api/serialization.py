@@ -0,0 +1,22 @@
+"""
+JSONシリアライズモジュール
+
+FastAPI（Starlette）のJSONResponseと同一のバイト列を生成します。
+事前シリアライズしたレスポンスボディはこのモジュールで作成します。
+"""
+
+import json
+from typing import Any
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    JSONResponseと同じ形式でシリアライズ
+
+    Args:
+        content: シリアライズ対象（dict, list等）
+
+    Returns:
+        UTF-8エンコードされたJSONバイト列
+    """
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,1193 @@
+"""
+メニューデータスナップショットモジュール
+
+menus.jsonを一度だけパースした結果を不変のスナップショットとして保持します。
+スナップショットはファイルの同一性（mtime・サイズ・inode）に紐づき、
+ファイルが変更されるまで同じオブジェクトが再利用されます。
+フィルタ用の転置インデックス（ポスティングリスト）や集計結果もスナップショット単位で一度だけ構築します。
+"""
+
+import hashlib
+import heapq
+import os
+import sys
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from api.bitmap import from_positions, iter_positions, membership, to_positions
+from api.columnar import SORT_KEYS, MenuColumns, SortOrders, bits_to_positions
+from api.constants import CATEGORY_LABELS, PRICE_BUCKETS, TAG_CATEGORIES, TAG_CATEGORY_MAP
+from api.normalization import normalize_search_text
+from api.ranking import RelevanceIndex
+from api.records import as_dict
+from api.serialization import dump_json
+from api.suggest import SuggestIndex, build_suggest_index, suggest
+
+
+class FileIdentity(NamedTuple):
+    """ファイルの同一性（stat結果から算出）"""
+
+    mtime_ns: int
+    size: int
+    inode: int
+
+    @classmethod
+    def from_stat(cls, st: os.stat_result) -> "FileIdentity":
+        """os.stat_resultから生成"""
+        return cls(st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+# 日本標準時（パークの営業日基準、夏時間なし）
+JST = timezone(timedelta(hours=9), "JST")
+
+
+def today_jst() -> date:
+    """日本標準時での今日の日付"""
+    return datetime.now(JST).date()
+
+
+# 保存するインデックス・集計の内容を決めるモジュール（タグ分類・検索文字列の正規化・関連度の重みなど）
+INDEX_MODULES = (
+    "api.bitmap",
+    "api.columnar",
+    "api.constants",
+    "api.normalization",
+    "api.ranking",
+    "api.snapshot",
+    "api.suggest",
+)
+
+
+@lru_cache(maxsize=None)
+def index_code_fingerprint() -> str:
+    """
+    インデックスを構築するコードのフィンガープリント（INDEX_MODULES のソースのハッシュ）
+
+    バイナリスナップショットなどの事前構築済みのインデックスは、同じデータでもこの値が異なる場合は使用しません
+    （定数・正規化・重みの変更後に古い集計結果を返さないように）。
+
+    Returns:
+        16進数16文字のハッシュ
+    """
+    digest = hashlib.sha256()
+    for name in INDEX_MODULES:
+        digest.update(name.encode("utf-8") + b"\0")
+        digest.update(Path(sys.modules[name].__file__).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _parse_ordinal(value) -> Optional[int]:
+    """ISO形式の日付文字列を日序数に変換（未指定・無効な日付はNone）"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def availability_intervals(menu: Dict) -> List[Tuple[Optional[int], Optional[int]]]:
+    """
+    メニューの販売期間を日序数の区間リストに変換
+
+    区間の端がNoneの場合はその方向に無制限です。販売期間指定のないレストランがあれば
+    常に販売中（無制限の区間1つ）となり、レストランがなければ空リストになります。
+
+    Args:
+        menu: メニューデータ
+
+    Returns:
+        (開始日序数, 終了日序数) のリスト（いずれも含む）
+    """
+    intervals = []
+    for restaurant in menu.get("restaurants", []):
+        availability = restaurant.get("availability")
+
+        # 販売期間指定がない場合は常に販売中
+        if not availability:
+            return [(None, None)]
+
+        # 無効な日付はその端の制限なしとして扱う
+        intervals.append((_parse_ordinal(availability.get("start_date")), _parse_ordinal(availability.get("end_date"))))
+    return intervals
+
+
+class AvailabilityIndex(NamedTuple):
+    """
+    販売期間の区間インデックス
+
+    全区間の端点で日付軸を区切り、区切られた各区間ごとに販売中メニューのビットマップを保持します。
+    ある日付に販売中のメニューは二分探索1回で求まります。
+    """
+
+    boundaries: List[int]
+    segments: List[int]
+
+    def bits_on(self, ordinal: int) -> int:
+        """指定した日序数に販売中のメニューのビットマップ"""
+        return self.segments[bisect_right(self.boundaries, ordinal)]
+
+
+def build_availability_index(menus: List[Dict]) -> AvailabilityIndex:
+    """
+    メニューデータから販売期間インデックスを構築
+
+    Args:
+        menus: メニューデータリスト
+
+    Returns:
+        販売期間インデックス
+    """
+    menu_intervals = [availability_intervals(menu) for menu in menus]
+
+    # 区間の開始日と終了日の翌日が区切り位置
+    points = set()
+    for intervals in menu_intervals:
+        for start, end in intervals:
+            if start is not None:
+                points.add(start)
+            if end is not None:
+                points.add(end + 1)
+    boundaries = sorted(points)
+
+    segment_positions: List[List[int]] = [[] for _ in range(len(boundaries) + 1)]
+    for pos, intervals in enumerate(menu_intervals):
+        covered = set()
+        for start, end in intervals:
+            first = 0 if start is None else bisect_right(boundaries, start)
+            last = len(boundaries) if end is None else bisect_right(boundaries, end)
+            covered.update(range(first, last + 1))
+        for segment in covered:
+            segment_positions[segment].append(pos)
+
+    return AvailabilityIndex(boundaries, [from_positions(positions) for positions in segment_positions])
+
+
+# 検索文字列用n-gramインデックスのグラム長（これより短い検索文字列は1文字のグラムで絞り込む）
+TEXT_GRAM_SIZE = 2
+
+
+def text_grams(text: str) -> set:
+    """
+    文字列に含まれるグラム（1文字と TEXT_GRAM_SIZE 文字の部分文字列）
+
+    Args:
+        text: 対象文字列（正規化済み）
+
+    Returns:
+        グラムの集合
+    """
+    grams = set(text)
+    grams.update(text[i : i + TEXT_GRAM_SIZE] for i in range(len(text) - TEXT_GRAM_SIZE + 1))
+    return grams
+
+
+def query_grams(q_key: str) -> set:
+    """
+    検索文字列を含むテキストが必ず持つグラム
+
+    Args:
+        q_key: 検索文字列（正規化済み、空でないこと）
+
+    Returns:
+        グラムの集合（TEXT_GRAM_SIZE 未満の場合は検索文字列そのもの）
+    """
+    if len(q_key) < TEXT_GRAM_SIZE:
+        return {q_key}
+    return {q_key[i : i + TEXT_GRAM_SIZE] for i in range(len(q_key) - TEXT_GRAM_SIZE + 1)}
+
+
+class SearchKeys(NamedTuple):
+    """
+    検索用に正規化したメニュー名・説明文（メニュー位置ごと）
+
+    normalize_search_text() を適用した値をスナップショットごとに一度だけ計算します。
+    説明文はメモリマップしたバイナリスナップショットの場合、アクセス時にデコードする読み取り専用シーケンスです。
+    """
+
+    names: List[str]
+    descriptions: Sequence[str]
+
+
+class PostingLists(NamedTuple):
+    """
+    フィルタ項目ごとの転置インデックス
+
+    各辞書は値 → ビットマップ（その値を持つメニュー位置の集合）の対応です。
+    """
+
+    tags: Dict[str, int]
+    categories: Dict[str, int]
+    parks: Dict[str, int]
+    areas: Dict[str, int]
+    restaurant_ids: Dict[str, int]
+    restaurant_names: Dict[str, int]
+    characters: Dict[str, int]
+
+
+def build_posting_lists(menus: List[Dict]) -> PostingLists:
+    """
+    メニューデータから転置インデックスを構築
+
+    Args:
+        menus: メニューデータリスト
+
+    Returns:
+        転置インデックス
+    """
+    positions: Dict[str, Dict[str, List[int]]] = {name: defaultdict(list) for name in PostingLists._fields}
+
+    # 重複の除去は出現順を保つ dict.fromkeys で行う（setの反復順はハッシュのシードで変わり、
+    # バイナリスナップショットの内容がビルドごとに変わるため）
+    for pos, menu in enumerate(menus):
+        for tag in dict.fromkeys(menu.get("tags", [])):
+            positions["tags"][tag].append(pos)
+
+        category = menu.get("category")
+        if category is not None:
+            positions["categories"][category].append(pos)
+
+        for character in dict.fromkeys(menu.get("characters", [])):
+            positions["characters"][character].append(pos)
+
+        for restaurant in menu.get("restaurants", []):
+            for name, key in (
+                ("parks", "park"),
+                ("areas", "area"),
+                ("restaurant_ids", "id"),
+                ("restaurant_names", "name"),
+            ):
+                value = restaurant.get(key)
+                # 同一メニュー内の重複は1件として扱う
+                if value is not None and positions[name][value][-1:] != [pos]:
+                    positions[name][value].append(pos)
+
+    return PostingLists(
+        **{
+            name: {value: from_positions(pos_list) for value, pos_list in field_positions.items()}
+            for name, field_positions in positions.items()
+        }
+    )
+
+
+def classify_menu_tags(menu: Dict) -> List[Tuple[str, str]]:
+    """
+    メニューのタグをタググループ（/tags/grouped のカテゴリ）に分類
+
+    定義済みカテゴリに属さないタグは、そのメニューのレストランのエリア名・レストラン名と
+    一致する場合のみ area・restaurant に分類されます。
+
+    Args:
+        menu: メニューデータ
+
+    Returns:
+        (カテゴリ, タグ) のリスト（分類できないタグは含まない）
+    """
+    restaurants = menu.get("restaurants", [])
+    classified = []
+    for tag in menu.get("tags", []):
+        category = TAG_CATEGORY_MAP.get(tag)
+        if category is None:
+            if any(tag == restaurant.get("area") for restaurant in restaurants):
+                category = "area"
+            elif any(tag == restaurant.get("name") for restaurant in restaurants):
+                category = "restaurant"
+            else:
+                continue
+        classified.append((category, tag))
+    return classified
+
+
+@dataclass(frozen=True, eq=False)
+class MenuSnapshot:
+    """
+    パース済みメニューデータの不変スナップショット
+
+    Attributes:
+        menus: メニューデータのリスト（共有オブジェクトのため変更しないこと）。
+            メモリマップしたバイナリスナップショットの場合はアクセス時にデコードする読み取り専用シーケンス、
+            コンパクト表現の場合は MenuRecord のリスト（外部へ返す際は辞書に変換）
+        version: データバージョン（ファイル内容のハッシュ）
+        identity: 読み込み元ファイルの同一性（ファイル由来でない場合はNone）
+        deferred: バイナリスナップショットに保存された DEFERRED_INDEXES の状態をデコードする関数
+            （インデックス名 → 関数、初回アクセス時に一度だけ呼び出す）
+    """
+
+    menus: List[Dict]
+    version: str = ""
+    identity: Optional[FileIdentity] = field(default=None, compare=False)
+    deferred: Dict[str, Callable[[], object]] = field(default_factory=dict, compare=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.menus)
+
+    def is_current(self, identity: FileIdentity) -> bool:
+        """指定したファイル同一性と一致するか（再検証用）"""
+        return self.identity == identity
+
+    # 事前構築してバイナリスナップショットに保存するインデックス（名前 → 復元関数）
+    PERSISTED_INDEXES = {
+        "id_index": dict,
+        "all_bits": int,
+        "postings": lambda value: PostingLists(*value),
+        "columns": MenuColumns.from_state,
+        "availability": lambda value: AvailabilityIndex(*value),
+        "all_tags": list,
+        "all_categories": list,
+        "all_restaurants": list,
+        "category_counts": dict,
+        "_stats_base": dict,
+        "_normalized_postings": dict,
+        "name_keys": list,
+        "sort_orders": SortOrders.from_state,
+        "suggest_index": lambda value: SuggestIndex(*value),
+        "_grouped_tags_cache": dict,
+    }
+
+    # 説明文から作る大きなインデックス。バイナリスナップショットには要素ごとに保存し、メモリマップ時は
+    # ヒープに展開せずファイル上のまま参照する（検索文字列（q）の候補の確認・グラムの参照時に該当部分のみデコード）
+    MAPPED_INDEXES = ("description_keys", "text_index")
+
+    # 使用するリクエストでのみ必要なインデックス（名前 → 復元関数）。warm() では構築せず、
+    # バイナリスナップショットには別の領域として保存して初回アクセス時にデコードする
+    # （relevance_index: sort=relevance を指定した検索でのみ使用、
+    #  _menu_tag_groups: /tags/grouped の結果はパークごとに _grouped_tags_cache に保存するため通常は不要）
+    DEFERRED_INDEXES = {
+        "relevance_index": RelevanceIndex.from_state,
+        "_menu_tag_groups": list,
+    }
+
+    def export_indexes(self) -> Dict[str, object]:
+        """
+        保存対象のインデックス（MAPPED_INDEXES・DEFERRED_INDEXES を含む）を組み込み型のみで構成された辞書として取得
+
+        Returns:
+            インデックス名 → 値（NamedTupleはタプル、列データは to_state() の結果に変換）
+        """
+        self.warm()
+        indexes: Dict[str, object] = {}
+        for name in (*self.PERSISTED_INDEXES, *self.MAPPED_INDEXES, *self.DEFERRED_INDEXES):
+            value = getattr(self, name)
+            if isinstance(value, (MenuColumns, RelevanceIndex, SortOrders)):
+                value = value.to_state()
+            elif isinstance(value, tuple):
+                value = tuple(value)
+            indexes[name] = value
+        return indexes
+
+    @classmethod
+    def from_indexes(
+        cls,
+        menus: List[Dict],
+        indexes: Dict[str, object],
+        version: str = "",
+        identity: Optional[FileIdentity] = None,
+        deferred: Optional[Dict[str, Callable[[], object]]] = None,
+    ) -> "MenuSnapshot":
+        """
+        事前構築済みのインデックスからスナップショットを復元
+
+        Args:
+            menus: メニューデータのリスト
+            indexes: export_indexes() の結果（MAPPED_INDEXES はメモリマップしたシーケンス・辞書でもよい）
+            version: データバージョン
+            identity: 読み込み元ファイルの同一性
+            deferred: DEFERRED_INDEXES の状態をデコードする関数（インデックス名 → 関数）
+
+        Returns:
+            インデックス構築済みのスナップショット
+        """
+        deferred = dict(deferred or {})
+        for name in cls.DEFERRED_INDEXES:
+            if name in indexes:
+                deferred.setdefault(name, lambda state=indexes[name]: state)
+        snapshot = cls(menus=menus, version=version, identity=identity, deferred=deferred)
+        for name, restore in cls.PERSISTED_INDEXES.items():
+            if name in indexes:
+                # cached_propertyと同じくインスタンス辞書に直接格納する
+                snapshot.__dict__[name] = restore(indexes[name])
+        for name in cls.MAPPED_INDEXES:
+            if name in indexes:
+                snapshot.__dict__[name] = indexes[name]
+        return snapshot
+
+    def _restore_deferred(self, name: str) -> Optional[object]:
+        """
+        バイナリスナップショットに保存された DEFERRED_INDEXES のインデックスを復元
+
+        Args:
+            name: インデックス名
+
+        Returns:
+            復元したインデックス（保存されていない、または壊れている場合はNone）
+        """
+        load = self.deferred.pop(name, None)
+        if load is None:
+            return None
+        try:
+            return self.DEFERRED_INDEXES[name](load())
+        except (EOFError, ValueError, TypeError):
+            # 壊れている場合は構築し直す
+            return None
+
+    def with_menus(self, menus: Sequence[Dict]) -> "MenuSnapshot":
+        """
+        同じ内容を別の表現で保持するスナップショットを作成（構築済みのインデックスは引き継ぐ）
+
+        Args:
+            menus: 同じ順序・内容のメニューデータ（コンパクトなレコードなど）
+
+        Returns:
+            新しいスナップショット
+        """
+        snapshot = MenuSnapshot(menus=menus, version=self.version, identity=self.identity, deferred=dict(self.deferred))
+        for name in (*self.PERSISTED_INDEXES, *self.MAPPED_INDEXES, *self.DEFERRED_INDEXES):
+            if name in self.__dict__:
+                snapshot.__dict__[name] = self.__dict__[name]
+        return snapshot
+
+    def warm(self) -> "MenuSnapshot":
+        """
+        遅延構築されるインデックス・集計をすべて構築
+
+        公開前に呼び出すことで、リクエスト処理中にインデックス構築が走らないようにします。
+        DEFERRED_INDEXES は一部のリクエストでのみ使うため、初回の使用時に構築・復元します。
+
+        Returns:
+            自身
+        """
+        for name, attr in vars(type(self)).items():
+            if isinstance(attr, cached_property) and name not in self.DEFERRED_INDEXES:
+                getattr(self, name)
+        for park in (None, *self._lowered_parks):
+            self.grouped_tags(park)
+        return self
+
+    @cached_property
+    def last_modified(self) -> Optional[datetime]:
+        """
+        データの最終更新日時（UTC）
+
+        最新の取得日時（scraped_at、タイムゾーンなしはJST）と読み込み元ファイルの更新日時の遅い方です。
+        どちらも不明な場合はNone。
+        """
+        candidates = []
+        latest = self.columns.last_scraped_at()
+        if latest:
+            try:
+                scraped_at = datetime.fromisoformat(latest)
+            except ValueError:
+                scraped_at = None
+            if scraped_at is not None:
+                candidates.append(scraped_at if scraped_at.tzinfo else scraped_at.replace(tzinfo=JST))
+        if self.identity is not None:
+            candidates.append(datetime.fromtimestamp(self.identity.mtime_ns / 1_000_000_000, timezone.utc))
+        return max(candidates).astimezone(timezone.utc) if candidates else None
+
+    @cached_property
+    def id_index(self) -> Dict[str, int]:
+        """メニューID → メニュー位置（IDが重複する場合は先頭を優先）"""
+        index: Dict[str, int] = {}
+        for pos, menu in enumerate(self.menus):
+            index.setdefault(menu.get("id"), pos)
+        return index
+
+    @cached_property
+    def _detail_bodies(self) -> Dict[str, bytes]:
+        """詳細レスポンスボディのキャッシュ（メニューID → バイト列）"""
+        return {}
+
+    def get_menu(self, menu_id: str) -> Optional[Dict]:
+        """
+        IDでメニューを取得（O(1)）
+
+        Args:
+            menu_id: メニューID
+
+        Returns:
+            メニューデータまたはNone
+        """
+        pos = self.id_index.get(menu_id)
+        return None if pos is None else as_dict(self.menus[pos])
+
+    def get_detail_body(self, menu_id: str) -> Optional[bytes]:
+        """
+        /menus/{menu_id} のレスポンスボディ（事前シリアライズ済み）を取得
+
+        初回アクセス時にシリアライズし、以降はスナップショット内で再利用します。
+
+        Args:
+            menu_id: メニューID
+
+        Returns:
+            JSONバイト列またはNone（メニューが存在しない場合）
+        """
+        body = self._detail_bodies.get(menu_id)
+        if body is None:
+            pos = self.id_index.get(menu_id)
+            if pos is None:
+                return None
+            body = b'{"success":true,"data":' + self.menu_json([pos])[0] + b"}"
+            self._detail_bodies[menu_id] = body
+        return body
+
+    def get_batch_body(self, menu_ids: Sequence[str]) -> bytes:
+        """
+        /menus/batch のレスポンスボディを取得
+
+        IDインデックスで各メニューの位置を求め、シリアライズ済みのバイト列を指定した順序で連結します。
+        存在しないIDの位置は null とし、meta.not_found にそのIDを列挙します。
+
+        Args:
+            menu_ids: メニューIDのリスト（重複可、指定した順序で返す）
+
+        Returns:
+            JSONバイト列
+        """
+        positions = [self.id_index.get(menu_id) for menu_id in menu_ids]
+        bodies = iter(self.menu_json([pos for pos in positions if pos is not None]))
+        items = [b"null" if pos is None else next(bodies) for pos in positions]
+        not_found = [menu_id for menu_id, pos in zip(menu_ids, positions) if pos is None]
+        meta = {"requested": len(menu_ids), "found": len(menu_ids) - len(not_found), "not_found": not_found}
+        return b'{"success":true,"data":[' + b",".join(items) + b'],"meta":' + dump_json(meta) + b"}"
+
+    @cached_property
+    def _menu_json(self) -> List[Optional[bytes]]:
+        """メニューごとのJSONバイト列のキャッシュ（メニュー位置 → バイト列、未シリアライズはNone）"""
+        return [None] * len(self.menus)
+
+    def menu_json(self, positions: Sequence[int]) -> List[bytes]:
+        """
+        指定した位置のメニューのJSONバイト列を指定した順序で取得
+
+        各メニューは初回アクセス時に dump_json() でシリアライズし、以降はスナップショット内で再利用します。
+        レスポンスはバイト列を連結して組み立てます（dump_json() でレスポンス全体をシリアライズした場合と同一）。
+
+        Args:
+            positions: メニュー位置のリスト
+
+        Returns:
+            JSONバイト列のリスト
+        """
+        cache = self._menu_json
+        menus = self.menus
+        bodies = []
+        for pos in positions:
+            body = cache[pos]
+            if body is None:
+                body = cache[pos] = dump_json(as_dict(menus[pos]))
+            bodies.append(body)
+        return bodies
+
+    @cached_property
+    def _response_bodies(self) -> Dict[Hashable, bytes]:
+        """一覧エンドポイントのレスポンスボディのキャッシュ（キー → バイト列）"""
+        return {}
+
+    def response_body(self, key: Hashable, build: Callable[[], object]) -> bytes:
+        """
+        スナップショットの内容のみで決まるレスポンスボディを取得（初回のみ build() の結果をシリアライズ）
+
+        Args:
+            key: レスポンスを識別するキー（エンドポイントとパラメータ）
+            build: レスポンスの内容を返す関数
+
+        Returns:
+            JSONバイト列
+        """
+        body = self._response_bodies.get(key)
+        if body is None:
+            body = self._response_bodies[key] = dump_json(build())
+        return body
+
+    @cached_property
+    def all_bits(self) -> int:
+        """全メニューを表すビットマップ"""
+        return (1 << len(self.menus)) - 1
+
+    @cached_property
+    def postings(self) -> PostingLists:
+        """フィルタ用の転置インデックス（初回アクセス時に構築）"""
+        return build_posting_lists(self.menus)
+
+    @cached_property
+    def columns(self) -> MenuColumns:
+        """検索・価格フィルタ・ソート・統計用の列（初回アクセス時に構築）"""
+        return MenuColumns.build(self.menus)
+
+    @cached_property
+    def _normalized_postings(self) -> Dict[str, Tuple[Tuple[str, int], ...]]:
+        """部分一致フィルタ用: 正規化したキーとビットマップの組"""
+        return {
+            name: tuple((normalize_search_text(value), bits) for value, bits in getattr(self.postings, name).items())
+            for name in ("areas", "restaurant_names", "characters")
+        }
+
+    @cached_property
+    def name_keys(self) -> List[str]:
+        """検索文字列（q）用に正規化したメニュー名（メニュー位置ごと）"""
+        return [normalize_search_text(name) for name in self.columns.names]
+
+    @cached_property
+    def description_keys(self) -> Sequence[str]:
+        """検索文字列（q）用に正規化した説明文（メニュー位置ごと）"""
+        return [normalize_search_text(menu.get("description") or "") for menu in self.menus]
+
+    @cached_property
+    def search_keys(self) -> SearchKeys:
+        """検索文字列（q）用に正規化したメニュー名・説明文"""
+        return SearchKeys(names=self.name_keys, descriptions=self.description_keys)
+
+    @cached_property
+    def text_index(self) -> Mapping[str, int]:
+        """
+        検索文字列用のn-gram転置インデックス（グラム → ビットマップ）
+
+        正規化したメニュー名・説明文それぞれの1文字・2文字のグラムを対象とします
+        （日本語は単語境界がないため、単語ではなく文字のグラムで索引します）。
+        """
+        positions: Dict[str, List[int]] = defaultdict(list)
+        keys = self.search_keys
+        for pos, (name, description) in enumerate(zip(keys.names, keys.descriptions)):
+            for gram in text_grams(name) | text_grams(description):
+                positions[gram].append(pos)
+        # グラムの順に並べる（集合の反復順に依存せず、同じデータからは同じスナップショットを生成する）
+        return {gram: from_positions(positions[gram]) for gram in sorted(positions)}
+
+    @cached_property
+    def relevance_index(self) -> RelevanceIndex:
+        """関連度ランキング（sort=relevance）用のBM25Fインデックス（初回の関連度順の検索時に復元または構築）"""
+        restored = self._restore_deferred("relevance_index")
+        if restored is not None:
+            return restored
+        keys = self.search_keys
+        return RelevanceIndex.build(
+            {
+                "name": [(name,) for name in keys.names],
+                "description": [(description,) for description in keys.descriptions],
+                "tags": [[normalize_search_text(tag) for tag in menu.get("tags") or []] for menu in self.menus],
+                "characters": [
+                    [normalize_search_text(character) for character in menu.get("characters") or []]
+                    for menu in self.menus
+                ],
+            }
+        )
+
+    @cached_property
+    def suggest_index(self) -> SuggestIndex:
+        """検索候補（/suggest）用の前方一致インデックス"""
+        name_counts: Dict[str, int] = defaultdict(int)
+        for name in self.columns.names:
+            name_counts[name] += 1
+        postings = self.postings
+        return build_suggest_index(
+            {
+                "menu": name_counts,
+                "tag": {tag: bits.bit_count() for tag, bits in postings.tags.items()},
+                "restaurant": {name: bits.bit_count() for name, bits in postings.restaurant_names.items()},
+                "area": {area: bits.bit_count() for area, bits in postings.areas.items()},
+                "character": {character: bits.bit_count() for character, bits in postings.characters.items()},
+            }
+        )
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """
+        入力中の文字列に前方一致する検索候補（メニュー数の多い順）
+
+        Args:
+            prefix: 入力中の文字列
+            limit: 最大件数
+
+        Returns:
+            候補（text: 文字列, type: 種類, count: メニュー数）のリスト
+        """
+        return suggest(self.suggest_index, prefix, limit)
+
+    @cached_property
+    def availability(self) -> AvailabilityIndex:
+        """販売期間インデックス（初回アクセス時に構築）"""
+        return build_availability_index(self.menus)
+
+    @cached_property
+    def _available_today(self) -> Dict[int, int]:
+        """今日（JST）の販売中ビットマップのキャッシュ（日序数 → ビットマップ）"""
+        return {}
+
+    def available_bits(self, check_date: Optional[date] = None) -> int:
+        """
+        指定日に販売中のメニューのビットマップ
+
+        日付を省略した場合は今日（JST）のビットマップをキャッシュから返し、
+        JSTの日付が変わった後の最初の呼び出しで再計算します。
+
+        Args:
+            check_date: チェック日付（Noneの場合は今日（JST））
+
+        Returns:
+            ビットマップ
+        """
+        if check_date is not None:
+            return self.availability.bits_on(check_date.toordinal())
+
+        ordinal = today_jst().toordinal()
+        cache = self._available_today
+        bits = cache.get(ordinal)
+        if bits is None:
+            bits = self.availability.bits_on(ordinal)
+            cache.clear()
+            cache[ordinal] = bits
+        return bits
+
+    @cached_property
+    def all_tags(self) -> List[str]:
+        """全てのタグ（重複なし、ソート済み）"""
+        return sorted(self.postings.tags)
+
+    @cached_property
+    def all_categories(self) -> List[str]:
+        """全てのカテゴリ（categoriesフィールド、重複なし、ソート済み）"""
+        categories = set()
+        for menu in self.menus:
+            categories.update(menu.get("categories", []))
+        return sorted(categories)
+
+    @cached_property
+    def all_restaurants(self) -> List[Dict]:
+        """全てのレストラン（IDで重複除去、初出順）"""
+        restaurants: Dict[str, Dict] = {}
+        for menu in self.menus:
+            for restaurant in menu.get("restaurants", []):
+                if restaurant["id"] not in restaurants:
+                    restaurants[restaurant["id"]] = as_dict(restaurant)
+        return list(restaurants.values())
+
+    @cached_property
+    def category_counts(self) -> Dict[str, int]:
+        """メニューカテゴリ（categoryフィールド）ごとのメニュー数"""
+        return self.columns.category_counts()
+
+    @cached_property
+    def price_bucket_bits(self) -> List[int]:
+        """価格帯（PRICE_BUCKETS）ごとのメニューのビットマップ"""
+        bucket_positions: List[List[int]] = [[] for _ in PRICE_BUCKETS]
+        for pos, price in enumerate(self.columns.prices):
+            bucket_positions[max(bisect_right(PRICE_BUCKETS, price) - 1, 0)].append(pos)
+        return [from_positions(positions) for positions in bucket_positions]
+
+    def facet_counts(self, bits: int) -> Dict:
+        """
+        絞り込み結果に含まれるメニュー数をフィルタの値ごとに集計（/menus/facets のレスポンス）
+
+        各値のビットマップとの積のビット数を数えるため、メニューレコードは参照しません。
+        タグ・カテゴリ・パーク・エリア・レストランは件数が0の値を含まず、件数の多い順（同数は値の順）に並べます。
+        価格帯は件数が0の価格帯も含め、PRICE_BUCKETS の順に並べます。
+
+        Args:
+            bits: 絞り込み結果のビットマップ
+
+        Returns:
+            {"total", "tags", "categories", "parks", "areas", "restaurants", "price"} の辞書
+        """
+        postings = self.postings
+
+        def count(index: Dict[str, int]) -> Dict[str, int]:
+            counts = [(value, (bits & value_bits).bit_count()) for value, value_bits in index.items() if value]
+            return dict(sorted(((value, n) for value, n in counts if n), key=lambda item: (-item[1], item[0])))
+
+        price = []
+        for i, bucket_bits in enumerate(self.price_bucket_bits):
+            upper = PRICE_BUCKETS[i + 1] - 1 if i + 1 < len(PRICE_BUCKETS) else None
+            price.append({"min": PRICE_BUCKETS[i], "max": upper, "count": (bits & bucket_bits).bit_count()})
+
+        return {
+            "total": bits.bit_count(),
+            "tags": count(postings.tags),
+            "categories": count(postings.categories),
+            "parks": count(postings.parks),
+            "areas": count(postings.areas),
+            "restaurants": count(postings.restaurant_names),
+            "price": price,
+        }
+
+    @cached_property
+    def _stats_base(self) -> Dict:
+        """販売中メニュー数以外の統計情報"""
+        columns = self.columns
+        stats = {
+            "total_tags": len(self.all_tags),
+            "total_categories": len(self.all_categories),
+            "total_restaurants": len(self.all_restaurants),
+        }
+
+        price_stats = columns.price_stats()
+        if price_stats is not None:
+            stats["min_price"], stats["max_price"], stats["avg_price"] = price_stats
+
+        last_updated = columns.last_scraped_at()
+        if last_updated is not None:
+            stats["last_updated"] = last_updated
+
+        return stats
+
+    def get_stats(self, check_date: Optional[date] = None) -> Dict:
+        """
+        統計情報を取得
+
+        販売中メニュー数以外はスナップショットごとに一度だけ集計します。
+
+        Args:
+            check_date: 販売中メニュー数の基準日（Noneの場合は今日（JST））
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            "total_menus": len(self.menus),
+            "available_menus": self.available_bits(check_date).bit_count(),
+            **self._stats_base,
+        }
+
+    @cached_property
+    def _menu_tag_groups(self) -> List[List[Tuple[str, str]]]:
+        """メニューごとのタグ分類結果（/tags/grouped 用）"""
+        restored = self._restore_deferred("_menu_tag_groups")
+        if restored is not None:
+            return restored
+        return [classify_menu_tags(menu) for menu in self.menus]
+
+    @cached_property
+    def _grouped_tags_cache(self) -> Dict[Optional[str], Dict]:
+        """/tags/grouped のレスポンスキャッシュ（パーク（小文字） → レスポンス）"""
+        return {}
+
+    @cached_property
+    def _lowered_parks(self) -> Dict[str, int]:
+        """小文字化したパーク → ビットマップ"""
+        parks: Dict[str, int] = {}
+        for park, bits in self.postings.parks.items():
+            if isinstance(park, str):
+                parks[park.lower()] = parks.get(park.lower(), 0) | bits
+        return parks
+
+    def grouped_tags_body(self, park: Optional[str] = None) -> bytes:
+        """
+        grouped_tags() のシリアライズ済みJSONバイト列（パークごとにメモ化）
+
+        Args:
+            park: パークフィルタ（大文字小文字を区別しない）
+
+        Returns:
+            JSONバイト列
+        """
+        key = park.lower() if park else None
+        if key is not None and key not in self._lowered_parks:
+            # 存在しないパークはキャッシュしない
+            return dump_json(self.grouped_tags(park))
+        return self.response_body(("tags/grouped", key), lambda: self.grouped_tags(key))
+
+    def grouped_tags(self, park: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        カテゴリ別にグループ化されたタグ（/tags/grouped のレスポンス）
+
+        パークごとの結果もスナップショット内でメモ化します。
+
+        Args:
+            park: パークフィルタ（大文字小文字を区別しない）
+
+        Returns:
+            カテゴリ → {"label", "tags"} の辞書
+        """
+        key = park.lower() if park else None
+        result = self._grouped_tags_cache.get(key)
+        if result is not None:
+            return result
+
+        if key is None:
+            bits = self.all_bits
+        elif key in self._lowered_parks:
+            bits = self._lowered_parks[key]
+        else:
+            # 存在しないパークはキャッシュしない（任意の入力でキャッシュが肥大化しないように）
+            return {}
+
+        all_tags_by_category: Dict[str, set] = {category: set() for category in TAG_CATEGORIES}
+        all_tags_by_category["area"] = set()
+        all_tags_by_category["restaurant"] = set()
+
+        menu_tag_groups = self._menu_tag_groups
+        for pos in iter_positions(bits):
+            for category, tag in menu_tag_groups[pos]:
+                all_tags_by_category[category].add(tag)
+
+        result = {
+            category: {"label": CATEGORY_LABELS.get(category, category), "tags": sorted(tags)}
+            for category, tags in all_tags_by_category.items()
+            if tags
+        }
+        self._grouped_tags_cache[key] = result
+        return result
+
+    def union_bits(self, index: Dict[str, int], values: List[str]) -> int:
+        """
+        指定した値のいずれかを持つメニューのビットマップ（OR）
+
+        Args:
+            index: 転置インデックス（postingsの各フィールド）
+            values: 値のリスト
+
+        Returns:
+            ビットマップ
+        """
+        bits = 0
+        for value in values:
+            bits |= index.get(value, 0)
+        return bits
+
+    def substring_bits(self, name: str, needle: str) -> int:
+        """
+        値に部分一致するメニューのビットマップ
+
+        値と検索文字列はどちらも normalize_search_text() で正規化して比較します
+        （ひらがな・カタカナ、全角・半角、大文字・小文字、長音符の表記を区別しない）。
+
+        Args:
+            name: 転置インデックス名（areas, restaurant_names, characters）
+            needle: 検索文字列
+
+        Returns:
+            ビットマップ
+        """
+        needle = normalize_search_text(needle)
+        bits = 0
+        for value_key, value_bits in self._normalized_postings[name]:
+            if needle in value_key:
+                bits |= value_bits
+        return bits
+
+    def select(self, bits: int) -> List[Dict]:
+        """ビットマップに含まれるメニューを元の順序で取得"""
+        menus = self.menus
+        return [as_dict(menus[pos]) for pos in iter_positions(bits)]
+
+    def positions(self, bits: int) -> Sequence[int]:
+        """ビットマップに含まれる位置を昇順で取得（NumPy使用時はndarray）"""
+        return bits_to_positions(bits)
+
+    def records(self, positions: Sequence[int]) -> List[Dict]:
+        """指定した位置のメニューを指定した順序で取得"""
+        menus = self.menus
+        return [as_dict(menus[pos]) for pos in positions]
+
+    def text_bits(self, q: str, bits: Optional[int] = None) -> int:
+        """
+        メニュー名または説明文に部分一致するメニューのビットマップ
+
+        検索文字列は normalize_search_text() で正規化し、事前計算した検索キーと比較します。
+        検索文字列のグラムのポスティングを積集合して候補を求め、候補のみ検索キーで確認します
+        （グラムは名前・説明文のどちらか・どの位置にあってもよいため、候補には一致しないメニューも含まれます）。
+        検索文字列がグラム以下の長さの場合はポスティングが結果と一致するため、確認を省略します。
+
+        Args:
+            q: 検索文字列
+            bits: 対象を絞り込むビットマップ（Noneの場合は全メニュー）
+
+        Returns:
+            ビットマップ
+        """
+        candidates = self.all_bits if bits is None else bits
+        q_key = normalize_search_text(q)
+        if not q_key:
+            return candidates
+
+        index = self.text_index
+        # 検索文字列がグラム以下の長さの場合はポスティングがそのまま結果（入力途中の短い検索文字列）
+        if len(q_key) <= TEXT_GRAM_SIZE:
+            return candidates & index.get(q_key, 0)
+
+        # 該当件数の少ないグラムから積集合を取る
+        for posting in sorted((index.get(gram, 0) for gram in query_grams(q_key)), key=int.bit_count):
+            candidates &= posting
+            if not candidates:
+                return 0
+
+        names, descriptions = self.search_keys
+        return from_positions(
+            pos for pos in iter_positions(candidates) if q_key in names[pos] or q_key in descriptions[pos]
+        )
+
+    def match_text(self, positions: Sequence[int], q: str) -> List[int]:
+        """
+        メニュー名または説明文に部分一致する位置に絞り込み（判定は text_bits() と同じ）
+
+        Args:
+            positions: メニュー位置のリスト
+            q: 検索文字列
+
+        Returns:
+            一致したメニュー位置（元の順序）
+        """
+        matched = set(to_positions(self.text_bits(q)))
+        return [pos for pos in positions if pos in matched]
+
+    def rank_positions(self, positions: Sequence[int], q: str, k: int) -> List[int]:
+        """
+        検索文字列との関連度（BM25F）が高い順に上位k件のメニュー位置を取得
+
+        Args:
+            positions: メニュー位置のリスト（昇順、同じ関連度の場合はこの順序）
+            q: 検索文字列
+            k: 取得件数
+
+        Returns:
+            メニュー位置のリスト（関連度の降順）
+        """
+        q_key = normalize_search_text(q)
+        if not q_key:
+            return list(positions[:k])
+        return self.relevance_index.top_k(positions, query_grams(q_key), k)
+
+    def sort_value(self, pos: int, sort: Optional[str], q: Optional[str] = None) -> object:
+        """
+        メニューのソートキーの値（カーソルに記録する値、SQLiteバックエンドのソート列と同じ値）
+
+        Args:
+            pos: メニュー位置
+            sort: ソート項目（price, name, scraped_at, relevance、Noneの場合は元の順序）
+            q: 検索文字列（関連度順の場合）
+
+        Returns:
+            価格・メニュー名・取得日時・関連度のスコア（元の順序の場合はNone）
+        """
+        columns = self.columns
+        if sort == "price":
+            return columns.prices[pos]
+        if sort == "name":
+            return columns.names[pos]
+        if sort == "scraped_at":
+            return columns.scraped_at_values[columns.scraped_at_ranks[pos]]
+        q_key = normalize_search_text(q) if sort == "relevance" and q else ""
+        if q_key:
+            return self.relevance_index.scores(query_grams(q_key), [pos]).get(pos, 0)
+        return None
+
+    def check_cursor(self, after: Tuple[object, int], sort: Optional[str], q: Optional[str]) -> Tuple[object, int]:
+        """
+        カーソルの (ソートキーの値, メニュー位置) がこのスナップショットと一致するか検証
+
+        Args:
+            after: 直前のページの最後のメニューの (ソートキーの値, メニュー位置)
+            sort: ソート項目
+            q: 検索文字列（関連度順の場合）
+
+        Returns:
+            after
+
+        Raises:
+            ValueError: メニュー位置が範囲外、またはソートキーの値が一致しない場合
+        """
+        value, last = after
+        if not 0 <= last < len(self.menus) or self.sort_value(last, sort, q) != value:
+            raise ValueError("Invalid cursor")
+        return after
+
+    def walk_bits(
+        self, bits: int, key: str, reverse: bool, k: int, after: Optional[Tuple[object, int]] = None
+    ) -> Optional[List[int]]:
+        """
+        メニュー位置に展開せず、ビットマップのまま並び順を辿って上位k件を取得
+
+        絞り込み結果が少なく辿る手数が多くなる場合は None を返します（呼び出し側でメニュー位置に展開してソートする）。
+
+        Args:
+            bits: 絞り込み結果のビットマップ
+            key: ソートキー（price, name, scraped_at）
+            reverse: 降順の場合True
+            k: 取得件数
+            after: カーソル（直前のページの最後のメニューの (ソートキーの値, メニュー位置)、Noneの場合は先頭から）
+
+        Returns:
+            メニュー位置のリストまたはNone
+
+        Raises:
+            ValueError: カーソルがこのスナップショットと一致しない場合
+        """
+        orders = self.sort_orders
+        count = bits.bit_count()
+        if not orders.walkable(count, k):
+            return None
+        start = 0
+        if after is not None:
+            start = orders.ranks(key, reverse)[self.check_cursor(after, key, None)[1]] + 1
+        contains = None if count == len(self.menus) else membership(bits)
+        return orders.top(contains, key, reverse, k, start)
+
+    def page_after(
+        self,
+        positions: Sequence[int],
+        sort: Optional[str],
+        reverse: bool,
+        q: Optional[str],
+        after: Tuple[object, int],
+        limit: int,
+    ) -> List[int]:
+        """
+        並び順で直前のページの最後のメニューより後の limit 件を取得（キーセットページネーション）
+
+        Args:
+            positions: 絞り込み結果のメニュー位置（昇順）
+            sort: ソート項目（price, name, scraped_at, relevance、Noneの場合は元の順序）
+            reverse: 降順の場合True（関連度順・元の順序では無視）
+            q: 検索文字列（関連度順の場合）
+            after: 直前のページの最後のメニューの (ソートキーの値, メニュー位置)
+            limit: 取得件数
+
+        Returns:
+            メニュー位置のリスト
+
+        Raises:
+            ValueError: メニュー位置が範囲外、またはソートキーの値が一致しない場合
+        """
+        value, last = self.check_cursor(after, sort, q)
+        if sort in SORT_KEYS:
+            return self.sort_orders.top_after(positions, sort, reverse, last, limit)
+        if value is not None:
+            # 関連度の降順、同じ関連度はメニュー位置順で (value, last) より後のもの
+            get = self.relevance_index.scores(query_grams(normalize_search_text(q)), positions).get
+            candidates = [pos for pos in positions if get(pos, 0) < value or (get(pos, 0) == value and pos > last)]
+            return heapq.nsmallest(limit, candidates, key=lambda pos: (-get(pos, 0), pos))
+        start = bisect_right(positions, last)
+        return list(positions[start : start + limit])
+
+    @cached_property
+    def sort_orders(self) -> SortOrders:
+        """ソートキー・方向ごとの事前計算済みの並び順"""
+        return SortOrders.build(self.columns)
+
+    def sort_positions(
+        self, positions: Sequence[int], key: str, reverse: bool = False, limit: Optional[int] = None
+    ) -> Sequence[int]:
+        """
+        メニュー位置をソート（安定ソート）
+
+        limit を指定した場合は先頭 limit 件のみ返し、絞り込み結果が多ければ事前計算済みの並び順を
+        辿って求めます（絞り込み結果全体はソートしない）。
+
+        Args:
+            positions: メニュー位置のリスト（昇順）
+            key: ソートキー（price, name, scraped_at）
+            reverse: 降順の場合True
+            limit: 取得件数（Noneの場合はすべて）
+
+        Returns:
+            ソート済みのメニュー位置
+        """
+        if limit is not None and key in SORT_KEYS and self.sort_orders.walkable(len(positions), limit):
+            contains = None if len(positions) == len(self.menus) else set(positions).__contains__
+            return self.sort_orders.top(contains, key, reverse, limit)
+        positions = self.columns.sort_positions(positions, key, reverse=reverse)
+        return positions if limit is None else positions[:limit]
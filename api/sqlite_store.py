@@ -0,0 +1,411 @@
+"""
+SQLiteストレージバックエンド
+
+menus.jsonの内容をローカルのSQLiteファイル（例: data/menus.sqlite）に取り込み、
+/menus のフィルタ・ソート・ページネーションを1つのSQLクエリ（LIMIT/OFFSET）で実行します。
+大きなカタログでの検索や、sqlite3 CLIなどを使ったオフラインでの分析に使用します。
+
+テーブル:
+    meta: 形式バージョン・元データのバージョン・検索キーを作成したコードのフィンガープリント
+    menus: メニュー位置（主キー）・ID・名前・価格・カテゴリ・取得日時と元のJSON（data）
+    menu_restaurants: メニューとレストランの関連（レストランID・パーク・エリア・レストラン名）
+    menu_tags / menu_characters: タグ・キャラクターの結合テーブル
+    menu_availability: 販売期間（日序数の区間、NULLは無制限）
+    menu_terms: 関連度ランキング（sort=relevance）用のグラムごとのスコア寄与（RelevanceIndexと同じ整数値）
+    menu_fts: メニュー名・説明文のFTS5全文検索テーブル（trigram、FTS5が使えない場合は作成しない）
+
+メモリ上のバックエンド（api.query.search_snapshot）とバイト単位で同一のレスポンスを返すよう、
+検索キー（*_key列）にはPython側で normalize_search_text() を適用した値を格納し、
+部分一致は instr() で判定します（FTS5は候補の絞り込みに使用）。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from api.normalization import normalize_search_text
+from api.query import RELEVANCE_SORT, MenuQuery, group_tags
+from api.records import as_dict
+from api.serialization import dump_json
+from api.snapshot import MenuSnapshot, availability_intervals, index_code_fingerprint, query_grams, today_jst
+
+FORMAT_VERSION = 5
+
+# FTS5（trigram）で検索できる最短の文字数（これより短い検索文字列は instr() のみで判定）
+FTS_MIN_LENGTH = 3
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE menus (
+    pos INTEGER PRIMARY KEY,
+    id TEXT,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    description_key TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    category TEXT,
+    scraped_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX menus_id ON menus (id);
+CREATE INDEX menus_price ON menus (price, pos);
+CREATE INDEX menus_name ON menus (name, pos);
+CREATE INDEX menus_category ON menus (category, pos);
+CREATE INDEX menus_scraped_at ON menus (scraped_at, pos);
+CREATE TABLE menu_restaurants (
+    pos INTEGER NOT NULL,
+    restaurant_id TEXT,
+    park TEXT,
+    area TEXT,
+    area_key TEXT,
+    name_key TEXT
+);
+CREATE INDEX menu_restaurants_pos ON menu_restaurants (pos);
+CREATE INDEX menu_restaurants_id ON menu_restaurants (restaurant_id, pos);
+CREATE INDEX menu_restaurants_park ON menu_restaurants (park, pos);
+CREATE INDEX menu_restaurants_area ON menu_restaurants (area, pos);
+CREATE TABLE menu_tags (tag TEXT NOT NULL, pos INTEGER NOT NULL, PRIMARY KEY (tag, pos)) WITHOUT ROWID;
+CREATE TABLE menu_characters (
+    character TEXT NOT NULL,
+    character_key TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (character, pos)
+) WITHOUT ROWID;
+CREATE TABLE menu_availability (pos INTEGER NOT NULL, start_ordinal INTEGER, end_ordinal INTEGER);
+CREATE INDEX menu_availability_pos ON menu_availability (pos);
+CREATE TABLE menu_terms (
+    pos INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (pos, term)
+) WITHOUT ROWID;
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE menu_fts USING fts5(
+    name_key, description_key, content='menus', content_rowid='pos', tokenize='trigram case_sensitive 1'
+)
+"""
+
+# ソートキー → ORDER BY の列（同値はメニュー位置順で安定ソートと同じ順序にする）
+_SORT_COLUMNS = {"price": "m.price", "name": "m.name", "scraped_at": "m.scraped_at"}
+
+
+def sqlite_store_path(data_path: Path) -> Path:
+    """JSONファイルに対応するSQLiteファイルのパス（例: data/menus.sqlite）"""
+    return data_path.with_suffix(".sqlite")
+
+
+def write_sqlite_store(snapshot: MenuSnapshot, path: Path) -> None:
+    """
+    スナップショットの内容をSQLiteファイルに取り込み
+
+    一時ファイルに書き込んでからアトミックに置き換えます（開いている接続は旧ファイルを参照し続けます）。
+
+    Args:
+        snapshot: 取り込むスナップショット（versionが設定されていること）
+        path: 出力先パス
+    """
+    columns = snapshot.columns
+    keys = snapshot.search_keys
+    menu_rows = []
+    restaurant_rows = []
+    tag_rows = []
+    character_rows = []
+    availability_rows = []
+    for pos, record in enumerate(snapshot.menus):
+        menu = as_dict(record)
+        menu_rows.append(
+            (
+                pos,
+                menu.get("id"),
+                columns.names[pos],
+                keys.names[pos],
+                keys.descriptions[pos],
+                columns.prices[pos],
+                menu.get("category"),
+                columns.scraped_at_values[columns.scraped_at_ranks[pos]],
+                dump_json(menu).decode("utf-8"),
+            )
+        )
+        for restaurant in menu.get("restaurants", []):
+            area = restaurant.get("area")
+            name = restaurant.get("name")
+            restaurant_rows.append(
+                (
+                    pos,
+                    restaurant.get("id"),
+                    restaurant.get("park"),
+                    area,
+                    normalize_search_text(area) if area is not None else None,
+                    normalize_search_text(name) if name is not None else None,
+                )
+            )
+        tag_rows.extend((tag, pos) for tag in set(menu.get("tags", [])))
+        character_rows.extend(
+            (character, normalize_search_text(character), pos) for character in set(menu.get("characters", []))
+        )
+        availability_rows.extend((pos, start, end) for start, end in availability_intervals(menu))
+    term_rows = [
+        (pos, term, score)
+        for term, positions, contributions in snapshot.relevance_index.items()
+        for pos, score in zip(positions, contributions)
+    ]
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.executescript(_SCHEMA)
+        try:
+            connection.execute(_FTS_SCHEMA)
+            fts = True
+        except sqlite3.OperationalError:
+            # FTS5（trigram）が使えないSQLiteでは instr() のみで検索する
+            fts = False
+
+        connection.executemany("INSERT INTO menus VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", menu_rows)
+        connection.executemany("INSERT INTO menu_restaurants VALUES (?, ?, ?, ?, ?, ?)", restaurant_rows)
+        connection.executemany("INSERT INTO menu_tags VALUES (?, ?)", tag_rows)
+        connection.executemany("INSERT INTO menu_characters VALUES (?, ?, ?)", character_rows)
+        connection.executemany("INSERT INTO menu_availability VALUES (?, ?, ?)", availability_rows)
+        connection.executemany("INSERT INTO menu_terms VALUES (?, ?, ?)", term_rows)
+        if fts:
+            connection.execute("INSERT INTO menu_fts (menu_fts) VALUES ('rebuild')")
+        connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [
+                ("format", str(FORMAT_VERSION)),
+                ("source_version", snapshot.version),
+                ("code", index_code_fingerprint()),
+                ("fts", "1" if fts else "0"),
+            ],
+        )
+        connection.commit()
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+
+
+def _placeholders(values: Tuple) -> str:
+    """IN句のプレースホルダー（?, ?, ...）"""
+    return ", ".join("?" * len(values))
+
+
+class SQLiteMenuStore:
+    """
+    SQLiteファイルに取り込んだメニューデータの読み取り専用ストア
+
+    接続は1つのみ開き、クエリはロックで直列化します（どのスレッドからも使用可能）。
+    """
+
+    def __init__(self, connection: sqlite3.Connection, version: str, fts: bool):
+        """
+        初期化（通常は open() を使用）
+
+        Args:
+            connection: 読み取り専用で開いた接続
+            version: 取り込んだデータのバージョン
+            fts: FTS5テーブルがある場合True
+        """
+        self.version = version
+        self.fts = fts
+        self._connection = connection
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: Path, source_version: str) -> Optional["SQLiteMenuStore"]:
+        """
+        SQLiteファイルを開く
+
+        ファイルが存在しない、形式が異なる、元のJSONと内容が一致しない（古い）、または検索キーを作成したコード
+        （index_code_fingerprint()）が異なる場合はNoneを返します。
+
+        Args:
+            path: SQLiteファイルのパス
+            source_version: 現在のJSONファイルのデータバージョン
+
+        Returns:
+            ストアまたはNone
+        """
+        if not path.exists():
+            return None
+        try:
+            connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        except sqlite3.Error:
+            return None
+        try:
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+        except sqlite3.Error:
+            connection.close()
+            return None
+        if (
+            meta.get("format") != str(FORMAT_VERSION)
+            or meta.get("source_version") != source_version
+            or meta.get("code") != index_code_fingerprint()
+        ):
+            # 検索キー・関連度の寄与は正規化・重みのコードにも依存するため、コードが変わった場合も取り込み直す
+            connection.close()
+            return None
+        return cls(connection, source_version, fts=meta.get("fts") == "1")
+
+    def _where(self, query: MenuQuery) -> Tuple[str, List]:
+        """検索条件をWHERE句とパラメータに変換"""
+        conditions: List[str] = []
+        params: List = []
+
+        # タグフィルタ（同じカテゴリ内はOR、異なるカテゴリ間はAND）
+        if query.tags:
+            for category_tags in group_tags(list(query.tags)).values():
+                conditions.append(f"m.pos IN (SELECT pos FROM menu_tags WHERE tag IN ({_placeholders(category_tags)}))")
+                params.extend(category_tags)
+
+        if query.categories:
+            conditions.append(f"m.category IN ({_placeholders(query.categories)})")
+            params.extend(query.categories)
+
+        if query.park:
+            conditions.append("m.pos IN (SELECT pos FROM menu_restaurants WHERE park = ?)")
+            params.append(query.park)
+
+        # 部分一致はPythonで正規化した値同士で判定
+        for value, sql in (
+            (query.area, "m.pos IN (SELECT pos FROM menu_restaurants WHERE instr(area_key, ?) > 0)"),
+            (query.restaurant, "m.pos IN (SELECT pos FROM menu_restaurants WHERE instr(name_key, ?) > 0)"),
+            (query.character, "m.pos IN (SELECT pos FROM menu_characters WHERE instr(character_key, ?) > 0)"),
+        ):
+            if value:
+                conditions.append(sql)
+                params.append(normalize_search_text(value))
+
+        if query.only_available or query.check_date is not None:
+            ordinal = (query.check_date or today_jst()).toordinal()
+            conditions.append(
+                "m.pos IN (SELECT pos FROM menu_availability"
+                " WHERE (start_ordinal IS NULL OR start_ordinal <= ?) AND (end_ordinal IS NULL OR ? <= end_ordinal))"
+            )
+            params.extend((ordinal, ordinal))
+
+        if query.q:
+            q_key = normalize_search_text(query.q)
+            if self.fts and len(q_key) >= FTS_MIN_LENGTH:
+                # trigramのフレーズ検索で候補を絞り込む（表記の揺れは格納済みの正規化した値で吸収する）
+                conditions.append("m.pos IN (SELECT rowid FROM menu_fts WHERE menu_fts MATCH ?)")
+                params.append('"' + q_key.replace('"', '""') + '"')
+            conditions.append("(instr(m.name_key, ?) > 0 OR instr(m.description_key, ?) > 0)")
+            params.extend((q_key, q_key))
+
+        if query.min_price is not None:
+            conditions.append("m.price >= ?")
+            params.append(query.min_price)
+        if query.max_price is not None:
+            conditions.append("m.price <= ?")
+            params.append(query.max_price)
+
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def search(self, query: MenuQuery) -> Tuple[List[Dict], int]:
+        """
+        /menus の検索を実行
+
+        Args:
+            query: 検索条件
+
+        Returns:
+            (ページ内のメニューデータ, 条件に一致した総件数)
+        """
+        bodies, total, _ = self.search_json(query)
+        return [json.loads(body) for body in bodies], total
+
+    def search_json(self, query: MenuQuery) -> Tuple[List[bytes], int, Optional[Tuple[object, int]]]:
+        """
+        /menus の検索を1つのSQLクエリで実行し、ページ内のメニューをJSONバイト列で取得
+
+        絞り込み・ソート・LIMIT/OFFSETはメニュー位置とソートキーのみで行い、ページ内の行だけ元のJSONを結合します。
+        総件数はウィンドウ関数で同じクエリから取得します（ページが範囲外で行がない場合のみ件数を別途取得）。
+        カーソル（query.after）を指定した場合は、総件数を求めた後に (ソートキー, メニュー位置) で再開位置より後の行に
+        絞り込みます（OFFSETなし）。
+
+        Args:
+            query: 検索条件
+
+        Returns:
+            (ページ内のメニューのJSONバイト列（dump_json() と同一）, 条件に一致した総件数,
+            ページの最後のメニューの (ソートキーの値, メニュー位置)（ページが空の場合はNone）)
+
+        Raises:
+            ValueError: カーソルの位置・ソートキーの値がこのストアと一致しない場合
+        """
+        where, params = self._where(query)
+        sort_params: List[str] = []
+        if query.sort == RELEVANCE_SORT and query.q and normalize_search_text(query.q):
+            # 関連度（検索文字列のグラムのスコア寄与の合計）の降順、同じ関連度はメニュー位置順
+            terms = tuple(query_grams(normalize_search_text(query.q)))
+            sort_key = (
+                "(SELECT coalesce(sum(t.score), 0) FROM menu_terms AS t"
+                f" WHERE t.pos = m.pos AND t.term IN ({_placeholders(terms)}))"
+            )
+            sort_params.extend(terms)
+            direction = " DESC"
+        elif query.sort in _SORT_COLUMNS:
+            sort_key = _SORT_COLUMNS[query.sort]
+            direction = " DESC" if query.reverse else ""
+        else:
+            sort_key = "m.pos"
+            direction = ""
+        by_position = sort_key == "m.pos"
+
+        if query.after is None:
+            sql = (
+                "SELECT d.data, p.total, p.sort_key, p.pos FROM ("
+                f"SELECT m.pos, {sort_key} AS sort_key, count(*) OVER () AS total FROM menus AS m{where}"
+                f" ORDER BY sort_key{direction}, m.pos LIMIT ? OFFSET ?"
+                f") AS p JOIN menus AS d ON d.pos = p.pos ORDER BY p.sort_key{direction}, p.pos"
+            )
+            sql_params = [*sort_params, *params, query.limit, query.offset]
+        else:
+            value, last = query.after
+            if by_position:
+                keyset = "f.pos > ?"
+                keyset_params = [last]
+            else:
+                keyset = f"f.sort_key {'<' if direction else '>'} ? OR (f.sort_key = ? AND f.pos > ?)"
+                keyset_params = [value, value, last]
+            sql = (
+                "SELECT d.data, p.total, p.sort_key, p.pos FROM ("
+                "SELECT f.pos, f.sort_key, f.total FROM ("
+                f"SELECT m.pos, {sort_key} AS sort_key, count(*) OVER () AS total FROM menus AS m{where}"
+                f") AS f WHERE {keyset} ORDER BY f.sort_key{direction}, f.pos LIMIT ?"
+                f") AS p JOIN menus AS d ON d.pos = p.pos ORDER BY p.sort_key{direction}, p.pos"
+            )
+            sql_params = [*sort_params, *params, *keyset_params, query.limit]
+
+        with self._lock:
+            if query.after is not None:
+                value, last = query.after
+                row = self._connection.execute(
+                    f"SELECT {sort_key} FROM menus AS m WHERE m.pos = ?", [*sort_params, last]
+                ).fetchone()
+                if row is None or (None if by_position else row[0]) != value:
+                    raise ValueError("Invalid cursor")
+            rows = self._connection.execute(sql, sql_params).fetchall()
+            if rows:
+                total = rows[0][1]
+            elif query.offset or query.after is not None:
+                total = self._connection.execute(f"SELECT count(*) FROM menus AS m{where}", params).fetchone()[0]
+            else:
+                total = 0
+        last_key = None
+        if rows:
+            _, _, key, pos = rows[-1]
+            last_key = (None if by_position else key, pos)
+        return [data.encode("utf-8") for data, _, _, _ in rows], total, last_key
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        with self._lock:
+            self._connection.close()
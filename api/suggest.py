@@ -0,0 +1,89 @@
+"""
+検索候補（オートコンプリート）
+
+メニュー名・タグ・レストラン名・エリア・キャラクターを正規化したキーで昇順に並べた配列（前方一致インデックス）を
+スナップショットごとに構築し、入力途中の文字列に前方一致する候補を二分探索で求めます。
+候補の順位（メニュー数の多い順）も事前計算しておき、リクエスト時は一致範囲から上位N件を選ぶだけにします。
+"""
+
+import heapq
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Tuple
+
+from api.normalization import normalize_search_text
+
+# 候補の種類（同じ文字列が複数の種類にある場合は先の種類のみ、同じメニュー数の場合はこの順）
+# エリア・レストラン名はタグにも含まれるため、タグは最後にする
+SUGGEST_TYPES = ("menu", "restaurant", "area", "character", "tag")
+
+# 前方一致範囲の上限（キーの後ろに付く任意の文字より大きい文字）
+_PREFIX_END = chr(0x10FFFF)
+
+
+class SuggestIndex(NamedTuple):
+    """
+    検索候補の前方一致インデックス
+
+    keys・entries・ranks はキーの昇順で対応します。
+    """
+
+    keys: List[str]
+    entries: List[Tuple[str, str, int]]
+    ranks: List[int]
+
+
+def build_suggest_index(counts: Dict[str, Dict[str, int]]) -> SuggestIndex:
+    """
+    候補の文字列とメニュー数から前方一致インデックスを構築
+
+    Args:
+        counts: 種類（SUGGEST_TYPES） → 表示する文字列 → その値を持つメニュー数
+
+    Returns:
+        インデックス
+    """
+    items = []
+    seen = set()
+    for kind in SUGGEST_TYPES:
+        for text, count in counts.get(kind, {}).items():
+            key = normalize_search_text(text)
+            if key and count and text not in seen:
+                seen.add(text)
+                items.append((key, (text, kind, count)))
+    items.sort()
+
+    # 順位: メニュー数の多い順、同数は種類・キーの順
+    type_order = {kind: i for i, kind in enumerate(SUGGEST_TYPES)}
+    order = sorted(range(len(items)), key=lambda i: (-items[i][1][2], type_order[items[i][1][1]], i))
+    ranks = [0] * len(items)
+    for rank, i in enumerate(order):
+        ranks[i] = rank
+
+    return SuggestIndex(keys=[key for key, _ in items], entries=[entry for _, entry in items], ranks=ranks)
+
+
+def suggest(index: SuggestIndex, prefix: str, limit: int) -> List[Dict]:
+    """
+    前方一致する候補を順位の高い順に取得
+
+    Args:
+        index: 前方一致インデックス
+        prefix: 入力中の文字列（normalize_search_text() で正規化して比較）
+        limit: 最大件数
+
+    Returns:
+        候補（text, type, count）のリスト
+    """
+    key = normalize_search_text(prefix)
+    if not key:
+        return []
+    keys = index.keys
+    lo = bisect_left(keys, key)
+    hi = bisect_left(keys, key + _PREFIX_END, lo)
+    entries = index.entries
+    return [
+        {"text": text, "type": kind, "count": count}
+        for text, kind, count in (
+            entries[i] for i in heapq.nsmallest(limit, range(lo, hi), key=index.ranks.__getitem__)
+        )
+    ]
@@ -8,6 +8,7 @@ import type {
   MenuItem,
   MenuFilters,
   MenuListResponse,
+  MenuBatchResponse,
   Restaurant,
   StatsData,
 } from '../types/menu';
@@ -37,6 +38,20 @@ export function useMenu(id: string): UseQueryResult<MenuItem> {
   });
 }
 
+/**
+ * 複数のメニューをIDで一括取得するフック
+ *
+ * 100件（MENU_BATCH_MAX_IDS）を超える場合は menuAPI.getMenusByIds が分割してリクエストする
+ */
+export function useMenusByIds(ids: string[]): UseQueryResult<MenuBatchResponse> {
+  return useQuery({
+    queryKey: ['menus-batch', ids],
+    queryFn: () => menuAPI.getMenusByIds(ids),
+    enabled: ids.length > 0, // idがある場合のみ実行
+    staleTime: 10 * 60 * 1000, // 10分間キャッシュ
+  });
+}
+
 /**
  * レストラン一覧を取得するフック
  */
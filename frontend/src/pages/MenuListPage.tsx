@@ -202,8 +202,8 @@ export function MenuListPage() {
 
           {meta && (
             <Typography variant="body2" color="text.secondary" gutterBottom>
-              全{meta.total}件中 {(meta.page - 1) * meta.limit + 1}-
-              {Math.min(meta.page * meta.limit, meta.total)}件を表示
+              全{meta.total}件中 {((meta.page ?? page) - 1) * meta.limit + 1}-
+              {Math.min((meta.page ?? page) * meta.limit, meta.total)}件を表示
             </Typography>
           )}
 
@@ -7,6 +7,9 @@ import type {
   Restaurant,
   MenuFilters,
   MenuListResponse,
+  MenuBatchResponse,
+  MenuFacets,
+  MenuFacetsResponse,
   MenuResponse,
   ListResponse,
   StatsResponse,
@@ -15,6 +18,9 @@ import type {
 // API Base URL (開発環境・本番環境ともにプロキシ経由で統一)
 const API_BASE_URL = '/api';
 
+// /menus/batch で1回のリクエストに指定できるIDの最大数（api/index.py の BATCH_MAX_IDS）
+export const MENU_BATCH_MAX_IDS = 100;
+
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -57,6 +63,34 @@ apiClient.interceptors.response.use(
   }
 );
 
+/**
+ * /menus・/menus/facets に共通の絞り込みパラメータ
+ */
+const filterParams = (filters?: MenuFilters): Record<string, any> => {
+  const params: Record<string, any> = {
+    only_available: filters?.only_available ?? false,
+  };
+
+  // オプショナルなパラメータを追加
+  if (filters?.q) params.q = filters.q;
+  if (filters?.restaurant) params.restaurant = filters.restaurant;
+  if (filters?.tags) {
+    // 配列の場合はカンマ区切りに変換
+    params.tags = Array.isArray(filters.tags) ? filters.tags.join(',') : filters.tags;
+  }
+  if (filters?.categories) {
+    // 配列の場合はカンマ区切りに変換
+    params.categories = Array.isArray(filters.categories) ? filters.categories.join(',') : filters.categories;
+  }
+  if (filters?.min_price !== undefined) params.min_price = filters.min_price;
+  if (filters?.max_price !== undefined) params.max_price = filters.max_price;
+  if (filters?.park) params.park = filters.park;
+  if (filters?.area) params.area = filters.area;
+  if (filters?.character) params.character = filters.character;
+
+  return params;
+};
+
 export const menuAPI = {
   /**
    * メニュー一覧を取得
@@ -66,27 +100,12 @@ export const menuAPI = {
     const params: Record<string, any> = {
       page: filters?.page ?? 1,
       limit: filters?.limit ?? 50,
-      only_available: filters?.only_available ?? false,
+      ...filterParams(filters),
     };
 
-    // オプショナルなパラメータを追加
-    if (filters?.q) params.q = filters.q;
-    if (filters?.restaurant) params.restaurant = filters.restaurant;
-    if (filters?.tags) {
-      // 配列の場合はカンマ区切りに変換
-      params.tags = Array.isArray(filters.tags) ? filters.tags.join(',') : filters.tags;
-    }
-    if (filters?.categories) {
-      // 配列の場合はカンマ区切りに変換
-      params.categories = Array.isArray(filters.categories) ? filters.categories.join(',') : filters.categories;
-    }
-    if (filters?.min_price !== undefined) params.min_price = filters.min_price;
-    if (filters?.max_price !== undefined) params.max_price = filters.max_price;
-    if (filters?.park) params.park = filters.park;
-    if (filters?.area) params.area = filters.area;
-    if (filters?.character) params.character = filters.character;
     if (filters?.sort) params.sort = filters.sort;
     if (filters?.order) params.order = filters.order;
+    if (filters?.cursor) params.cursor = filters.cursor;
 
     // デバッグログ（開発環境のみ）
     if (import.meta.env.DEV) {
@@ -107,6 +126,14 @@ export const menuAPI = {
     return response.data;
   },
 
+  /**
+   * 絞り込み結果のフィルタの値ごとのメニュー数を取得（ソート・ページは無視）
+   */
+  getMenuFacets: async (filters?: MenuFilters): Promise<MenuFacets> => {
+    const response = await apiClient.get<MenuFacetsResponse>('/menus/facets', { params: filterParams(filters) });
+    return response.data.data;
+  },
+
   /**
    * 特定のメニューを取得
    */
@@ -115,6 +142,34 @@ export const menuAPI = {
     return response.data.data;
   },
 
+  /**
+   * 複数のメニューをIDで一括取得（お気に入り・共有リスト用）
+   *
+   * MENU_BATCH_MAX_IDS件ごとに分割してリクエストし、指定した順序で結果を結合する
+   */
+  getMenusByIds: async (ids: string[]): Promise<MenuBatchResponse> => {
+    const chunks: string[][] = [];
+    for (let i = 0; i < ids.length; i += MENU_BATCH_MAX_IDS) {
+      chunks.push(ids.slice(i, i + MENU_BATCH_MAX_IDS));
+    }
+    const responses = await Promise.all(
+      chunks.map((chunk) =>
+        apiClient.get<MenuBatchResponse>('/menus/batch', {
+          params: { ids: chunk.join(',') },
+        })
+      )
+    );
+    return {
+      success: responses.every((response) => response.data.success),
+      data: responses.flatMap((response) => response.data.data),
+      meta: {
+        requested: responses.reduce((sum, response) => sum + response.data.meta.requested, 0),
+        found: responses.reduce((sum, response) => sum + response.data.meta.found, 0),
+        not_found: responses.flatMap((response) => response.data.meta.not_found),
+      },
+    };
+  },
+
   /**
    * レストラン一覧を取得
    */
@@ -59,6 +59,7 @@ export interface MenuFilters {
   order?: 'asc' | 'desc';  // ソート順
   page?: number;
   limit?: number;
+  cursor?: string;  // 無限スクロール用カーソル（meta.next_cursor の値）
 }
 
 export interface SortOption {
@@ -77,17 +78,52 @@ export interface MenuListResponse {
   data: MenuItem[];
   meta: {
     total: number;
-    page: number;
+    page: number | null;  // cursor 指定時は null
     limit: number;
     pages: number;
+    next_cursor: string | null;  // 次ページのカーソル（最終ページでは null）
   };
 }
 
+export interface PriceBucket {
+  min: number;
+  max: number | null;  // 最後の価格帯は上限なし
+  count: number;
+}
+
+/**
+ * 絞り込み結果のフィルタの値ごとのメニュー数（/menus/facets）
+ */
+export interface MenuFacets {
+  total: number;
+  tags: Record<string, number>;
+  categories: Record<string, number>;
+  parks: Record<string, number>;
+  areas: Record<string, number>;
+  restaurants: Record<string, number>;  // レストラン名 → メニュー数
+  price: PriceBucket[];
+}
+
+export interface MenuFacetsResponse {
+  success: boolean;
+  data: MenuFacets;
+}
+
 export interface MenuResponse {
   success: boolean;
   data: MenuItem;
 }
 
+export interface MenuBatchResponse {
+  success: boolean;
+  data: (MenuItem | null)[];  // 指定した順序、存在しないIDは null
+  meta: {
+    requested: number;
+    found: number;
+    not_found: string[];
+  };
+}
+
 export interface ListResponse<T> {
   success: boolean;
   data: T[];
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+MenuDataLoader micro-benchmark
+
+使用方法:
+    python scripts/benchmark_loader.py                 # 全ベンチマークを実行
+    python scripts/benchmark_loader.py --only snapshot # 指定したベンチマークのみ実行
+    python scripts/benchmark_loader.py --only columnar --sizes 1000 100000 1000000
+    python scripts/benchmark_loader.py --only text_search --sizes 1000 100000
+    python scripts/benchmark_loader.py --only relevance --sizes 1000 100000
+    python scripts/benchmark_loader.py --only refinement --sizes 1000 100000
+    python scripts/benchmark_loader.py --only sort_orders --sizes 1000 100000
+    python scripts/benchmark_loader.py --only cursor --sizes 1000 100000
+    python scripts/benchmark_loader.py --only facets
+
+出力:
+    1リクエストあたりの処理時間（before: 従来方式 / after: 現行方式）
+"""
+
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+# Add parent directory to path to import api modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api import columnar
+from api.binary_snapshot import binary_snapshot_path
+from api.bitmap import to_positions
+from api.columnar import MenuColumns, bits_to_positions
+from api.data_loader import MenuDataLoader
+from api.normalization import normalize_search_text
+from api.query import (
+    MenuQuery,
+    RefinementCache,
+    canonical_query,
+    facet_counts,
+    search_positions,
+    search_snapshot,
+)
+from api.response_cache import ResponseCache
+from api.serialization import dump_json
+from api.snapshot import MenuSnapshot, query_grams
+
+
+def measure(func: Callable[[], object], number: int) -> float:
+    """1回あたりの実行時間（マイクロ秒）を計測（5回計測の最小値）"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000
+
+
+def print_result(label: str, before_us: float, after_us: float) -> None:
+    """計測結果を表示"""
+    speedup = before_us / after_us if after_us else float("inf")
+    print(f"{label:<40} before: {before_us:>12.1f} us   after: {after_us:>10.2f} us   x{speedup:,.0f}")
+
+
+def bench_snapshot(loader: MenuDataLoader) -> None:
+    """load_menus(): 毎回json.loadする従来方式 vs スナップショット再利用"""
+
+    def legacy_load():
+        with open(loader.data_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    loader.load_menus()  # ウォームアップ
+    print_result("load_menus() per request", measure(legacy_load, 20), measure(loader.load_menus, 20000))
+
+
+def bench_menu_by_id(loader: MenuDataLoader) -> None:
+    """/menus/{id}: 線形探索 + シリアライズ vs IDインデックス + 事前シリアライズ済みボディ"""
+    snapshot = loader.load_snapshot()
+    menu_id = snapshot.menus[-1]["id"]
+
+    def legacy_lookup():
+        menu = next((m for m in snapshot.menus if m["id"] == menu_id), None)
+        return dump_json({"success": True, "data": menu})
+
+    snapshot.get_detail_body(menu_id)  # ウォームアップ
+    print_result(
+        "/menus/{id} lookup (last id)",
+        measure(legacy_lookup, 2000),
+        measure(lambda: snapshot.get_detail_body(menu_id), 200000),
+    )
+
+
+# コールドスタート計測用の子プロセス: プロセス起動からAPI初回レスポンスまでの時間を出力
+_COLD_START_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from fastapi.testclient import TestClient
+from api import index
+from api.data_loader import MenuDataLoader
+index.loader = MenuDataLoader(data_path=sys.argv[2], use_binary_snapshot=sys.argv[3] == "1")
+response = TestClient(index.app).get("/api/menus?limit=1")
+assert response.status_code == 200
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def bench_cold_start(loader: MenuDataLoader) -> None:
+    """コールドスタート〜初回レスポンス: JSONパース + インデックス構築 vs バイナリスナップショット"""
+    root = str(Path(__file__).parent.parent)
+
+    def first_request_ms(use_binary: bool) -> float:
+        runs = []
+        for _ in range(5):
+            output = subprocess.run(
+                [sys.executable, "-c", _COLD_START_SCRIPT, root, str(loader.data_path), "1" if use_binary else "0"],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            runs.append(float(output.strip().splitlines()[-1]))
+        return statistics.median(runs)
+
+    if not binary_snapshot_path(loader.data_path).exists():
+        print("cold start: skipped (run scripts/build_snapshot.py first)")
+        return
+    before_ms = first_request_ms(False)
+    after_ms = first_request_ms(True)
+    # 表示単位はマイクロ秒に揃える
+    print_result("cold start to first /menus response", before_ms * 1000, after_ms * 1000)
+
+
+# メモリ計測用の子プロセス: スナップショット読み込みで確保されたPythonヒープ（KiB）を出力
+_MEMORY_SCRIPT = """
+import sys, tracemalloc
+sys.path.insert(0, sys.argv[1])
+from api.data_loader import MenuDataLoader
+loader = MenuDataLoader(data_path=sys.argv[2], lazy_records=sys.argv[3] == "1")
+tracemalloc.start()
+snapshot = loader.load_snapshot()
+snapshot.records(list(range(min(50, len(snapshot)))))  # 1ページ分を参照
+print(tracemalloc.get_traced_memory()[0] / 1024)
+"""
+
+
+def bench_memory(loader: MenuDataLoader) -> None:
+    """ワーカーごとの常駐メモリ: 全レコード展開 vs メモリマップ + 遅延デコード"""
+    root = str(Path(__file__).parent.parent)
+
+    def heap_kib(lazy: bool) -> float:
+        output = subprocess.run(
+            [sys.executable, "-c", _MEMORY_SCRIPT, root, str(loader.data_path), "1" if lazy else "0"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        return float(output.strip().splitlines()[-1])
+
+    if not binary_snapshot_path(loader.data_path).exists():
+        print("memory: skipped (run scripts/build_snapshot.py first)")
+        return
+    eager, lazy = heap_kib(False), heap_kib(True)
+    print(
+        f"{'snapshot heap per worker':<40} eager: {eager:>10,.0f} KiB   lazy: {lazy:>10,.0f} KiB   x{eager / lazy:,.1f}"
+    )
+
+
+# 合成データのメニュー件数（--sizes で変更可能）
+SYNTHETIC_SIZES: Sequence[int] = (1_000, 100_000, 1_000_000)
+
+
+def synthetic_menus(count: int, seed: int = 0) -> List[Dict]:
+    """列ストアの計測用の合成メニュー（価格・レストラン等の子オブジェクトは共有してメモリを節約）"""
+    rng = random.Random(seed)
+    prices = [{"amount": amount} for amount in range(100, 5001, 10)]
+    restaurants = [[{"park": "tdl"}], [{"park": "tds"}], [{"park": "tdl"}, {"park": "tds"}]]
+    categories = ["drink", "sweets", "main_dish", "snack", "other"]
+    return [
+        {
+            "name": f"menu{i}",
+            "price": rng.choice(prices),
+            "scraped_at": f"2025-01-{rng.randint(1, 28):02d}T00:00:00",
+            "category": rng.choice(categories),
+            "restaurants": rng.choice(restaurants),
+            "is_seasonal": rng.random() < 0.2,
+        }
+        for i in range(count)
+    ]
+
+
+def bench_columnar(loader: MenuDataLoader) -> None:
+    """価格フィルタ + 価格ソート + 価格統計: 辞書を辿る従来方式 vs 列ストア（合成データで規模別に計測）"""
+    backend = "numpy" if columnar.NUMPY_AVAILABLE else "array"
+    for count in SYNTHETIC_SIZES:
+        menus = synthetic_menus(count)
+        columns = MenuColumns.build(menus)
+        all_bits = (1 << count) - 1
+        number = max(1, 20_000 // count)
+
+        def legacy():
+            selected = [m for m in menus if m["price"]["amount"] >= 500]
+            selected = [m for m in selected if m["price"]["amount"] <= 3000]
+            sorted(selected, key=lambda x: x["price"]["amount"], reverse=True)
+            amounts = [m["price"]["amount"] for m in menus if m.get("price", {}).get("amount", 0) > 0]
+            return min(amounts), max(amounts), sum(amounts) // len(amounts)
+
+        def vectorised():
+            selected = columns.filter_price(bits_to_positions(all_bits), 500, 3000)
+            columns.sort_positions(selected, "price", reverse=True)
+            return columns.price_stats()
+
+        assert legacy() == vectorised()
+        print_result(
+            f"price filter+sort+stats {count:>9,} ({backend})", measure(legacy, number), measure(vectorised, number)
+        )
+        del menus, columns
+
+
+def bench_sort_orders(loader: MenuDataLoader) -> None:
+    """
+    ソート済みの1ページ: 絞り込み結果全体をソート vs 事前計算した並び順を辿る（合成データで規模別に計測）
+    """
+    for count in SYNTHETIC_SIZES:
+        snapshot = MenuSnapshot(menus=synthetic_menus(count))
+        snapshot.sort_orders
+        postings = snapshot.postings
+        number = max(1, 20_000 // count)
+        for label, bits, key, reverse, end in (
+            ("all price desc", snapshot.all_bits, "price", True, 50),
+            ("park=tdl name", postings.parks["tdl"], "name", False, 50),
+            ("sweets scraped_at p3", postings.categories["sweets"], "scraped_at", False, 150),
+        ):
+
+            def full_sort():
+                positions = snapshot.positions(bits)
+                return list(snapshot.columns.sort_positions(positions, key, reverse=reverse)[:end])
+
+            def walk():
+                page = snapshot.walk_bits(bits, key, reverse, end)
+                if page is None:
+                    page = snapshot.sort_positions(snapshot.positions(bits), key, reverse=reverse, limit=end)
+                return list(page)
+
+            assert full_sort() == walk()
+            print_result(f"{label} {count:>9,}", measure(full_sort, number), measure(walk, number))
+        del snapshot
+
+
+def bench_cursor(loader: MenuDataLoader) -> None:
+    """
+    価格順の深いページ: page（OFFSET）vs カーソル（直前のページの最後のメニューから再開）（合成データで規模別に計測）
+    """
+    for count in SYNTHETIC_SIZES:
+        snapshot = MenuSnapshot(menus=synthetic_menus(count))
+        snapshot.sort_orders.ranks("price", False)
+        number = max(1, 20_000 // count)
+        for label, query in (
+            ("all", MenuQuery(sort="price")),
+            ("categories=sweets", MenuQuery(categories=("sweets",), sort="price")),
+        ):
+            page = min(200, len(search_positions(snapshot, query._replace(limit=count))[0]) // query.limit)
+            offset_query = query._replace(offset=(page - 1) * query.limit)
+            previous, _ = search_positions(snapshot, query._replace(offset=(page - 2) * query.limit))
+            last = int(previous[-1])
+            cursor_query = query._replace(after=(snapshot.sort_value(last, "price"), last))
+
+            def by_offset():
+                return search_positions(snapshot, offset_query)[0]
+
+            def by_cursor():
+                return search_positions(snapshot, cursor_query)[0]
+
+            assert list(by_offset()) == list(by_cursor())
+            print_result(f"page {page} {label} {count:>9,}", measure(by_offset, number), measure(by_cursor, number))
+        del snapshot
+
+
+def bench_facets(loader: MenuDataLoader) -> None:
+    """
+    フィルタの値ごとの件数: 値ごとに /menus の検索を1回ずつ実行 vs ビットマップの積のビット数（/menus/facets）
+    """
+    snapshot = loader.load_snapshot()
+    snapshot.price_bucket_bits
+    postings = snapshot.postings
+    for label, query in (
+        ("all", MenuQuery()),
+        ("park=tdl", MenuQuery(park="tdl")),
+        ("q=チョコ", MenuQuery(q="チョコ")),
+    ):
+
+        def per_value():
+            counts = {}
+            for tag in postings.tags:
+                counts[tag] = search_positions(snapshot, query._replace(tags=query.tags + (tag,), limit=1))[1]
+            for category in postings.categories:
+                counts[category] = search_positions(snapshot, query._replace(categories=(category,), limit=1))[1]
+            return counts
+
+        def facets():
+            return facet_counts(snapshot, query)
+
+        assert all(facets()["categories"].get(c, 0) == n for c, n in per_value().items() if c in postings.categories)
+        print_result(f"facets {label}", measure(per_value, 5), measure(facets, 200))
+
+
+def bench_text_search(loader: MenuDataLoader) -> None:
+    """
+    検索文字列（q）: リクエストごとに全メニューを正規化して部分文字列走査 vs 事前計算した検索キーのn-gramインデックス
+    （実データを複製して規模別に計測）
+    """
+    source = loader.load_menus()
+    for count in SYNTHETIC_SIZES:
+        menus = [source[i % len(source)] for i in range(count)]
+        snapshot = MenuSnapshot(menus=menus)
+        snapshot.text_index  # 構築はスナップショットごとに1回（計測対象外）
+        number = max(1, 20_000 // count)
+
+        for q in ("ミッキー", "ちょこれーと", "ﾋﾟ"):
+
+            def legacy():
+                q_key = normalize_search_text(q)
+                return [
+                    pos
+                    for pos, menu in enumerate(menus)
+                    if q_key in normalize_search_text(menu.get("name", ""))
+                    or q_key in normalize_search_text(menu.get("description", ""))
+                ]
+
+            def indexed():
+                return snapshot.text_bits(q)
+
+            assert legacy() == to_positions(indexed())
+            print_result(f"q={q} {count:>9,}", measure(legacy, number), measure(indexed, number * 10))
+        del menus, snapshot
+
+
+def bench_relevance(loader: MenuDataLoader) -> None:
+    """
+    sort=relevance: ポスティング全体からスコアを計算して全件ソート vs 一致したメニューのみのスコアとヒープで上位k件（1ページ分）
+    （実データを複製して規模別に計測）
+    """
+    source = loader.load_menus()
+    for count in SYNTHETIC_SIZES:
+        menus = [source[i % len(source)] for i in range(count)]
+        snapshot = MenuSnapshot(menus=menus)
+        snapshot.relevance_index  # 構築はスナップショットごとに1回（計測対象外）
+        number = max(1, 20_000 // count)
+
+        for q in ("ミッキー", "ちょこれーと", "ﾋﾟ"):
+            q_key = normalize_search_text(q)
+            positions = to_positions(snapshot.text_bits(q))
+
+            def full_sort():
+                scores = snapshot.relevance_index.scores(query_grams(q_key))
+                return sorted(positions, key=lambda pos: -scores.get(pos, 0))[:50]
+
+            def top_k():
+                return snapshot.rank_positions(positions, q, 50)
+
+            assert full_sort() == top_k()
+            print_result(f"q={q} {count:>9,}", measure(full_sort, number), measure(top_k, number))
+        del menus, snapshot
+
+
+def bench_suggest(loader: MenuDataLoader) -> None:
+    """入力中の文字列: /menus?q= の一覧検索（1ページ分） vs /suggest の前方一致インデックス"""
+    snapshot = loader.load_snapshot()
+    snapshot.suggest_index
+
+    for prefix in ("み", "ミッキ", "ちょこ"):
+
+        def legacy():
+            return search_snapshot(snapshot, MenuQuery(q=prefix, limit=10))
+
+        def indexed():
+            return snapshot.suggest(prefix, 10)
+
+        print_result(f"prefix={prefix}", measure(legacy, 200), measure(indexed, 2000))
+
+
+def bench_refinement(loader: MenuDataLoader) -> None:
+    """
+    入力途中の検索文字列: 毎回全件から検索 vs 絞り込みキャッシュ
+    （チ → チュ → チュロ → チュロス と入力し、2ページ目・価格順を表示して1文字削除する操作を
+    実データを複製した規模別に計測、1回あたりは1リクエスト分）
+    """
+    source = loader.load_menus()
+    session = [
+        MenuQuery(q="チ"),
+        MenuQuery(q="チュ"),
+        MenuQuery(q="チュロ"),
+        MenuQuery(q="チュロス"),
+        MenuQuery(q="チュロス", offset=50),
+        MenuQuery(q="チュロス", sort="price"),
+        MenuQuery(q="チュロ"),
+    ]
+    for count in SYNTHETIC_SIZES:
+        snapshot = MenuSnapshot(menus=[source[i % len(source)] for i in range(count)])
+        snapshot.text_index
+        number = max(1, 2_000 // count)
+
+        def uncached():
+            for query in session:
+                search_snapshot(snapshot, query)
+
+        def cached():
+            cache = RefinementCache()
+            for query in session:
+                search_snapshot(snapshot, query, cache)
+
+        print_result(f"{count:>9,}", measure(uncached, number) / len(session), measure(cached, number) / len(session))
+        del snapshot
+
+
+def bench_response_cache(loader: MenuDataLoader) -> None:
+    """/menus のよく使われる検索条件: 毎回検索してシリアライズ vs レスポンスキャッシュ"""
+    snapshot = loader.load_snapshot()
+    cache = ResponseCache()
+    for label, query in (
+        ("park=tdl", MenuQuery(park="tdl")),
+        ("categories=sweets", MenuQuery(categories=("sweets",))),
+        ("only_available", MenuQuery(only_available=True)),
+    ):
+
+        def uncached():
+            menus, total = loader.search_menus(query)
+            return dump_json({"success": True, "data": menus, "meta": {"total": total}})
+
+        def cached():
+            key = canonical_query(query)
+            body = cache.get(snapshot, key)
+            if body is None:
+                body = uncached()
+                cache.put(snapshot, key, body)
+            return body
+
+        print_result(label, measure(uncached, 200), measure(cached, 2000))
+
+
+def bench_pre_serialized(loader: MenuDataLoader) -> None:
+    """/menus のページ: 毎回ページ全体をシリアライズ vs メニューごとにシリアライズ済みのバイト列を連結"""
+    snapshot = loader.load_snapshot()
+    snapshot.menu_json(range(len(snapshot.menus)))
+    for label, query in (
+        ("limit=50", MenuQuery()),
+        ("limit=100 sort=price", MenuQuery(sort="price", limit=100)),
+        ("park=tds limit=20", MenuQuery(park="tds", limit=20)),
+    ):
+
+        def full():
+            menus, total = loader.search_menus(query)
+            return dump_json({"success": True, "data": menus, "meta": {"total": total}})
+
+        def concatenated():
+            bodies, total, _ = loader.search_menu_json(query)
+            return b'{"success":true,"data":[' + b",".join(bodies) + b'],"meta":' + dump_json({"total": total}) + b"}"
+
+        assert full() == concatenated()
+        print_result(label, measure(full, 200), measure(concatenated, 200))
+
+
+BENCHMARKS: Dict[str, Callable[[MenuDataLoader], None]] = {
+    "snapshot": bench_snapshot,
+    "menu_by_id": bench_menu_by_id,
+    "cold_start": bench_cold_start,
+    "memory": bench_memory,
+    "columnar": bench_columnar,
+    "sort_orders": bench_sort_orders,
+    "cursor": bench_cursor,
+    "facets": bench_facets,
+    "text_search": bench_text_search,
+    "relevance": bench_relevance,
+    "suggest": bench_suggest,
+    "refinement": bench_refinement,
+    "response_cache": bench_response_cache,
+    "pre_serialized": bench_pre_serialized,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MenuDataLoader micro-benchmark")
+    parser.add_argument("--data", default="data/menus.json", help="メニューデータJSONファイル")
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), help="実行するベンチマーク")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        help="合成データのメニュー件数（columnar, sort_orders, cursor, text_search, relevance, refinement）",
+    )
+    args = parser.parse_args()
+
+    if args.sizes:
+        global SYNTHETIC_SIZES
+        SYNTHETIC_SIZES = args.sizes
+
+    loader = MenuDataLoader(data_path=args.data)
+    print(f"Dataset: {loader.data_path} ({len(loader.load_menus())} menus)")
+
+    for name, bench in BENCHMARKS.items():
+        if args.only and name != args.only:
+            continue
+        bench(loader)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Binary snapshot build script
+Usage: python scripts/build_snapshot.py data/menus.json [--sqlite | --check]
+
+menus.jsonをパースしてインデックスまで構築し、隣にバイナリスナップショット（data/menus.snapshot）を書き出します。
+APIはJSONと内容が一致するバイナリスナップショットがあれば、JSONのパースとインデックス構築を省略して起動します。
+--sqlite を指定した場合は、SQLiteバックエンド用のファイル（data/menus.sqlite）も書き出します。
+--check を指定した場合は書き出さずに、既存のスナップショットが現在のJSON・インデックス構築コードと一致するかを確認します
+（CIでの検証用、古い場合は終了コード1）。
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import api modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.binary_snapshot import binary_snapshot_path, read_binary_snapshot, write_binary_snapshot
+from api.data_loader import MenuDataLoader
+from api.sqlite_store import SQLiteMenuStore, sqlite_store_path, write_sqlite_store
+
+
+def build_sqlite_store(loader: MenuDataLoader) -> int:
+    """SQLiteバックエンド用のファイルを生成して検証"""
+    started = time.perf_counter()
+    snapshot = loader.load_snapshot()
+    output_path = sqlite_store_path(loader.data_path)
+    write_sqlite_store(snapshot, output_path)
+
+    store = SQLiteMenuStore.open(output_path, snapshot.version)
+    if store is None:
+        print(f"❌ Error: SQLite store verification failed: {output_path}")
+        return 1
+    store.close()
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    size = output_path.stat().st_size
+    print(f"✅ Wrote {output_path} ({len(snapshot)} menus, {size:,} bytes, fts={store.fts}, {elapsed_ms:.0f} ms)")
+    return 0
+
+
+def check_snapshot(file_path: str) -> int:
+    """既存のバイナリスナップショットが現在のJSON・インデックス構築コードと一致するかを確認"""
+    loader = MenuDataLoader(data_path=file_path, use_binary_snapshot=False)
+    snapshot = loader.load_snapshot()
+    output_path = binary_snapshot_path(loader.data_path)
+    if read_binary_snapshot(output_path, snapshot.version) is None:
+        print(f"❌ {output_path} is missing or stale. Run: python scripts/build_snapshot.py {file_path}")
+        return 1
+    print(f"✅ {output_path} is up to date (version {snapshot.version})")
+    return 0
+
+
+def build_snapshot(file_path: str, sqlite: bool = False) -> int:
+    """バイナリスナップショットを生成して検証"""
+    started = time.perf_counter()
+    loader = MenuDataLoader(data_path=file_path, use_binary_snapshot=False)
+    snapshot = loader.load_snapshot()
+    if not snapshot.version:
+        print(f"❌ Error: Could not load menus from {file_path}")
+        return 1
+
+    output_path = binary_snapshot_path(loader.data_path)
+    size = write_binary_snapshot(snapshot, output_path)
+
+    # 書き出した内容が読み戻せることを確認
+    restored = read_binary_snapshot(output_path, snapshot.version)
+    if restored is None or restored.menus != snapshot.menus:
+        print(f"❌ Error: Snapshot verification failed: {output_path}")
+        return 1
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"✅ Wrote {output_path} ({len(snapshot)} menus, {size:,} bytes, version {snapshot.version}, {elapsed_ms:.0f} ms)"
+    )
+    if sqlite:
+        return build_sqlite_store(loader)
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/build_snapshot.py data/menus.json [--sqlite | --check]")
+        sys.exit(1)
+
+    file_path = sys.argv[1]
+
+    if not Path(file_path).exists():
+        print(f"❌ Error: File not found: {file_path}")
+        sys.exit(1)
+
+    if "--check" in sys.argv[2:]:
+        sys.exit(check_snapshot(file_path))
+    sys.exit(build_snapshot(file_path, sqlite="--sqlite" in sys.argv[2:]))
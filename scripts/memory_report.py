@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Menu memory footprint report (tracemalloc)
+
+使用方法:
+    python scripts/memory_report.py                           # 1k / 100k / 1M 件で計測
+    python scripts/memory_report.py --sizes 1000 100000       # 件数を指定
+
+出力:
+    メニュー1件あたりのバイト数（dict: json.loadsの辞書 / compact: __slots__ レコード + 辞書符号化）
+
+合成データは data/menus.json の実メニューを複製し、ID・名前・説明・URL・取得日時を一意に書き換えたものです。
+各計測は別プロセスで行い、json.loadsと同じく1件ごとに新しいオブジェクトを生成します。
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+# Add parent directory to path to import api modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.records import compact_menus
+
+
+def synthetic_menus(templates: List[str], count: int) -> Iterator[Dict]:
+    """実メニューを複製した合成メニューを1件ずつ生成"""
+    for i in range(count):
+        menu = json.loads(templates[i % len(templates)])
+        menu_id = f"{i:07d}"
+        menu["id"] = menu_id
+        menu["name"] = f"{menu['name']} #{i}"
+        menu["description"] = f"{menu.get('description', '')} ({menu_id})"
+        menu["source_url"] = f"https://www.tokyodisneyresort.jp/food/{menu_id}/"
+        menu["scraped_at"] = f"2026-01-30T21:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}"
+        yield menu
+
+
+def measure(data_path: str, count: int, mode: str) -> Dict[str, float]:
+    """保持しているメニューのメモリ量を計測（別プロセスで実行）"""
+    with open(data_path, "r", encoding="utf-8") as f:
+        templates = [json.dumps(menu, ensure_ascii=False) for menu in json.load(f)]
+
+    tracemalloc.start()
+    if mode == "dict":
+        menus = list(synthetic_menus(templates, count))
+    else:
+        menus = compact_menus(synthetic_menus(templates, count))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(menus) == count
+    return {"bytes_per_menu": current / count, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Menu memory footprint report (tracemalloc)")
+    parser.add_argument("--data", default="data/menus.json", help="複製元のメニューデータJSONファイル")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000], help="メニュー件数")
+    parser.add_argument("--measure", nargs=2, metavar=("COUNT", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.data, int(args.measure[0]), args.measure[1])))
+        return
+
+    print(f"{'menus':>10}  {'dict B/menu':>12}  {'compact B/menu':>15}  {'ratio':>6}  {'peak MB (dict/compact)':>24}")
+    for count in args.sizes:
+        results = {}
+        for mode in ("dict", "compact"):
+            completed = subprocess.run(
+                [sys.executable, __file__, "--data", args.data, "--measure", str(count), mode],
+                capture_output=True,
+                text=True,
+            )
+            results[mode] = json.loads(completed.stdout) if completed.returncode == 0 else None
+
+        dict_result, compact_result = results["dict"], results["compact"]
+        dict_bytes = f"{dict_result['bytes_per_menu']:,.0f}" if dict_result else "failed"
+        compact_bytes = f"{compact_result['bytes_per_menu']:,.0f}" if compact_result else "failed"
+        ratio = (
+            f"x{dict_result['bytes_per_menu'] / compact_result['bytes_per_menu']:.1f}"
+            if dict_result and compact_result
+            else "-"
+        )
+        peaks = "/".join(f"{r['peak_mb']:,.0f}" if r else "-" for r in (dict_result, compact_result))
+        print(f"{count:>10,}  {dict_bytes:>12}  {compact_bytes:>15}  {ratio:>6}  {peaks:>24}")
+
+
+if __name__ == "__main__":
+    main()
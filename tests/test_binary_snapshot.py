@@ -0,0 +1,341 @@
+"""Tests for api/binary_snapshot.py"""
+
+import json
+import marshal
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.binary_snapshot import (
+    MAGIC,
+    MappedIndex,
+    MappedRecords,
+    binary_snapshot_path,
+    read_binary_snapshot,
+    write_binary_snapshot,
+)
+from api.data_loader import MenuDataLoader
+from api.snapshot import MenuSnapshot
+
+
+def make_menus(count=12):
+    """Small dataset covering tags, categories, availability and characters"""
+    return [
+        {
+            "id": f"{i:04d}",
+            "name": f"メニュー{i}",
+            "price": {"amount": 500 + i * 10},
+            "tags": ["カレー", "ミッキー"] if i % 2 else ["ピザ", "新作"],
+            "categories": ["main_dish"] if i % 3 else ["dessert"],
+            "characters": ["ミッキーマウス"] if i % 4 == 0 else [],
+            "restaurants": [
+                {
+                    "id": str(i % 3),
+                    "name": f"レストラン{i % 3}",
+                    "park": "tdl" if i % 2 else "tds",
+                    "area": "ワールドバザール" if i % 2 else "メディテレーニアンハーバー",
+                    "availability": {"start_date": "2025-01-01", "end_date": "2025-06-30"} if i % 5 == 0 else None,
+                }
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def normalize(name, value):
+    """Compare posting tuples as mappings (their order depends on the build process) and columns by state"""
+    if name == "_normalized_postings":
+        return {key: dict(pairs) for key, pairs in value.items()}
+    if name in ("columns", "relevance_index", "sort_orders"):
+        return value.to_state()
+    return value
+
+
+@pytest.fixture
+def data_file():
+    """Temporary data file inside data/ together with its binary snapshot path"""
+    path = Path("data/binary_snapshot_test.json")
+    path.write_text(json.dumps(make_menus(), ensure_ascii=False), encoding="utf-8")
+    snapshot_path = binary_snapshot_path(path)
+    yield path
+    for p in (path, snapshot_path, Path(f"{snapshot_path}.tmp")):
+        if p.exists():
+            p.unlink()
+
+
+def build(path):
+    """Build the binary snapshot for the data file via the JSON path"""
+    loader = MenuDataLoader(data_path=str(path), use_binary_snapshot=False)
+    snapshot = loader.load_snapshot()
+    write_binary_snapshot(snapshot, binary_snapshot_path(loader.data_path))
+    return snapshot
+
+
+class TestBinarySnapshot:
+    """Tests for writing and reading binary snapshots"""
+
+    def test_roundtrip_matches_json_build(self, data_file):
+        """Test restored menus and indexes equal those built from JSON"""
+        source = build(data_file)
+        restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version)
+
+        assert restored is not None
+        assert isinstance(restored.menus, list)
+        assert restored.menus == source.menus
+        for name in (*MenuSnapshot.PERSISTED_INDEXES, *MenuSnapshot.MAPPED_INDEXES, *MenuSnapshot.DEFERRED_INDEXES):
+            assert normalize(name, getattr(restored, name)) == normalize(name, getattr(source, name)), name
+        assert restored.grouped_tags("tdl") == source.grouped_tags("tdl")
+        assert restored.get_stats() == source.get_stats()
+
+    def test_indexes_are_restored_without_rebuilding(self, data_file):
+        """Test persisted indexes are placed in the instance instead of being rebuilt"""
+        source = build(data_file)
+        with patch("api.snapshot.build_posting_lists") as build_postings:
+            restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version)
+            assert restored.postings == source.postings
+        build_postings.assert_not_called()
+
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_deferred_indexes_decode_on_first_use(self, data_file, lazy):
+        """Test the relevance index is neither decoded nor rebuilt until a relevance query needs it"""
+        source = build(data_file)
+        with patch("api.snapshot.RelevanceIndex.build") as build_relevance:
+            restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version, lazy=lazy)
+            restored.warm()
+            assert "relevance_index" not in restored.__dict__
+            assert restored.rank_positions([1, 2, 3], "めにゅー3", 1) == [3]
+            assert "relevance_index" not in restored.deferred
+        build_relevance.assert_not_called()
+
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_grouped_tags_do_not_need_menu_tag_groups(self, data_file, lazy):
+        """Test /tags/grouped for every park is served from the persisted cache"""
+        source = build(data_file)
+        restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version, lazy=lazy)
+        for park in (None, "tdl", "TDS"):
+            assert restored.grouped_tags(park) == source.grouped_tags(park)
+        assert "_menu_tag_groups" not in restored.__dict__
+        assert "_menu_tag_groups" in restored.deferred
+
+    def test_mapped_indexes_stay_in_the_file(self, data_file):
+        """Test description keys and the n-gram index are read from the mapping, not copied to the heap"""
+        source = build(data_file)
+        restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version, lazy=True)
+        assert isinstance(restored.description_keys, MappedRecords)
+        assert isinstance(restored.text_index, MappedIndex)
+        assert list(restored.description_keys) == source.description_keys
+        assert dict(restored.text_index) == source.text_index
+        assert list(restored.text_index) == sorted(source.text_index)
+        for missing in ("zz", "メニュー", "", 1):
+            assert restored.text_index.get(missing) is None
+        assert restored.text_index.get("メニ") == source.text_index["メニ"]
+        for q in ("メニュー1", "ミッキー", "存在しない"):
+            assert restored.text_bits(q) == source.text_bits(q)
+
+        eager = read_binary_snapshot(binary_snapshot_path(data_file), source.version)
+        assert type(eager.description_keys) is list and type(eager.text_index) is dict
+
+    def test_corrupt_deferred_index_is_rebuilt(self, data_file):
+        """Test a deferred index that cannot be decoded is built from the menus instead"""
+        source = build(data_file)
+        restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version)
+        restored.deferred["relevance_index"] = lambda: b"not a state"
+        assert restored.relevance_index.to_state() == source.relevance_index.to_state()
+
+    def test_strings_are_shared(self, data_file):
+        """Test repeated strings are stored once and shared after loading"""
+        source = build(data_file)
+        restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version)
+        first, second = restored.menus[1]["restaurants"][0], restored.menus[3]["restaurants"][0]
+        assert first["park"] is second["park"]
+        assert first["area"] is second["area"]
+
+    def test_stale_version_is_ignored(self, data_file):
+        """Test a snapshot built from different content is rejected"""
+        build(data_file)
+        assert read_binary_snapshot(binary_snapshot_path(data_file), "0" * 16) is None
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing snapshot file returns None"""
+        assert read_binary_snapshot(tmp_path / "missing.snapshot", "abc") is None
+
+    @pytest.mark.parametrize(
+        "content",
+        [b"", b"not a snapshot", MAGIC, MAGIC + b"\xff\xff\xff\xff", MAGIC + b"\x04\x00\x00\x00garbage"],
+        ids=["empty", "no-magic", "magic-only", "huge-header", "garbage"],
+    )
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_corrupt_file_is_ignored(self, data_file, content, lazy):
+        """Test truncated or corrupt files return None"""
+        source = build(data_file)
+        binary_snapshot_path(data_file).write_bytes(content)
+        assert read_binary_snapshot(binary_snapshot_path(data_file), source.version, lazy=lazy) is None
+
+    def test_truncated_records_are_ignored(self, data_file):
+        """Test a file cut inside the record area returns None"""
+        source = build(data_file)
+        path = binary_snapshot_path(data_file)
+        path.write_bytes(path.read_bytes()[:-10])
+        assert read_binary_snapshot(path, source.version) is None
+
+    def test_lazy_records_decode_on_access(self, data_file):
+        """Test lazy mode maps the file and decodes single records on demand"""
+        source = build(data_file)
+        restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version, lazy=True)
+
+        assert isinstance(restored.menus, MappedRecords)
+        assert len(restored) == len(source)
+        assert restored.menus[3] == source.menus[3]
+        assert restored.menus[-1] == source.menus[-1]
+        assert restored.menus[2:5] == source.menus[2:5]
+        assert list(restored.menus) == source.menus
+        with pytest.raises(IndexError):
+            restored.menus[len(source)]
+
+    def test_lazy_snapshot_does_not_touch_records_when_warming(self, data_file):
+        """Test warming a lazy snapshot only uses persisted indexes and columns"""
+        source = build(data_file)
+        with patch.object(MappedRecords, "__getitem__", side_effect=AssertionError("record decoded")):
+            restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version, lazy=True)
+            restored.warm()
+            assert list(restored.sort_positions([0, 1, 2], "price", reverse=True)) == [2, 1, 0]
+
+    def test_lazy_detail_body_matches(self, data_file):
+        """Test detail bodies served from mapped records are byte-identical"""
+        source = build(data_file)
+        restored = read_binary_snapshot(binary_snapshot_path(data_file), source.version, lazy=True)
+        assert restored.get_detail_body("0007") == source.get_detail_body("0007")
+
+    @pytest.mark.parametrize("field,value", [("marshal", -1), ("code", "0" * 16)], ids=["marshal", "code"])
+    def test_other_marshal_or_index_code_is_ignored(self, data_file, field, value):
+        """Test snapshots with another marshal format or built by different index code are rejected"""
+        source = build(data_file)
+        path = binary_snapshot_path(data_file)
+        data = path.read_bytes()
+        header_length = int.from_bytes(data[len(MAGIC) : len(MAGIC) + 4], "little")
+        header = marshal.loads(data[len(MAGIC) + 4 : len(MAGIC) + 4 + header_length])
+        header[field] = value
+        header_bytes = marshal.dumps(header)
+        body = data[len(MAGIC) + 4 + header_length :]
+        path.write_bytes(MAGIC + len(header_bytes).to_bytes(4, "little") + header_bytes + body)
+        assert read_binary_snapshot(path, source.version) is None
+
+    def test_changed_tag_categories_invalidate_snapshot(self, data_file):
+        """Test changing the code behind persisted aggregates makes the loader rebuild from JSON"""
+        source = build(data_file)
+        with patch("api.binary_snapshot.index_code_fingerprint", return_value="changed"):
+            assert read_binary_snapshot(binary_snapshot_path(data_file), source.version) is None
+            loader = MenuDataLoader(data_path=str(data_file))
+            with patch("api.data_loader.json.loads", wraps=json.loads) as loads:
+                loader.load_snapshot()
+            loads.assert_called()
+
+    def test_output_is_deterministic(self, data_file, tmp_path):
+        """Test the same data and code produce the same bytes regardless of the hash seed"""
+        script = (
+            "import sys; from pathlib import Path; from api.data_loader import MenuDataLoader; "
+            "from api.binary_snapshot import write_binary_snapshot; "
+            f"snapshot = MenuDataLoader(data_path={str(data_file)!r}, use_binary_snapshot=False).load_snapshot(); "
+            "write_binary_snapshot(snapshot, Path(sys.argv[1]))"
+        )
+        outputs = []
+        for seed in ("1", "2"):
+            output = tmp_path / f"menus-{seed}.snapshot"
+            subprocess.run(
+                [sys.executable, "-c", script, str(output)], check=True, env={**os.environ, "PYTHONHASHSEED": seed}
+            )
+            outputs.append(output.read_bytes())
+        assert outputs[0] == outputs[1]
+
+    def test_committed_snapshot_is_fresh(self):
+        """Test data/menus.snapshot matches data/menus.json and the current index code"""
+        snapshot = MenuDataLoader(use_binary_snapshot=False).load_snapshot()
+        assert (
+            read_binary_snapshot(Path("data/menus.snapshot"), snapshot.version) is not None
+        ), "data/menus.snapshot is stale: run python scripts/build_snapshot.py data/menus.json"
+
+
+class TestLoaderBinarySnapshot:
+    """Tests for MenuDataLoader using binary snapshots"""
+
+    def test_loader_uses_fresh_snapshot(self, data_file):
+        """Test the loader skips JSON parsing when the snapshot matches"""
+        source = build(data_file)
+        loader = MenuDataLoader(data_path=str(data_file))
+        with patch("api.data_loader.json.loads") as loads:
+            snapshot = loader.load_snapshot()
+        loads.assert_not_called()
+        assert snapshot.menus == source.menus
+        assert snapshot.version == source.version
+        assert snapshot.identity is not None
+
+    def test_loader_falls_back_when_stale(self, data_file):
+        """Test the loader parses JSON when the data changed after the snapshot was built"""
+        build(data_file)
+        menus = make_menus(5)
+        data_file.write_text(json.dumps(menus, ensure_ascii=False), encoding="utf-8")
+
+        loader = MenuDataLoader(data_path=str(data_file))
+        assert loader.load_menus() == menus
+
+    def test_loader_falls_back_when_corrupt(self, data_file):
+        """Test the loader parses JSON when the snapshot cannot be read"""
+        build(data_file)
+        binary_snapshot_path(data_file).write_bytes(MAGIC + b"broken")
+
+        loader = MenuDataLoader(data_path=str(data_file))
+        assert loader.load_menus() == make_menus()
+
+    def test_loader_lazy_records(self, data_file):
+        """Test lazy_records=True serves menus from the mapped file"""
+        source = build(data_file)
+        loader = MenuDataLoader(data_path=str(data_file), lazy_records=True)
+        snapshot = loader.load_snapshot()
+        assert isinstance(snapshot.menus, MappedRecords)
+        assert loader.get_menu_by_id("0004") == source.get_menu("0004")
+
+    def test_loader_lazy_records_fall_back_to_json(self, data_file):
+        """Test lazy_records=True still works without a binary snapshot"""
+        loader = MenuDataLoader(data_path=str(data_file), lazy_records=True)
+        assert loader.load_menus() == make_menus()
+
+    def test_loader_can_disable_snapshot(self, data_file):
+        """Test use_binary_snapshot=False always parses JSON"""
+        build(data_file)
+        loader = MenuDataLoader(data_path=str(data_file), use_binary_snapshot=False)
+        with patch("api.data_loader.read_binary_snapshot") as read:
+            loader.load_snapshot()
+        read.assert_not_called()
+
+
+class TestLazyRecordsApi:
+    """Tests for serving the API from mapped records"""
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            "",
+            "?q=メニュー1&sort=price&order=desc",
+            "?min_price=550&max_price=600",
+            "?park=tdl&sort=name&limit=3&page=2",
+            "?tags=カレー&tags=新作",
+        ],
+    )
+    def test_responses_match_eager_loader(self, data_file, query):
+        """Test /menus responses are identical for eager and lazy loaders"""
+        from api import index
+
+        build(data_file)
+        client = TestClient(index.app)
+        responses = []
+        for lazy in (False, True):
+            with patch.object(index, "loader", MenuDataLoader(data_path=str(data_file), lazy_records=lazy)):
+                response = client.get(f"/api/menus{query}")
+                assert response.status_code == 200
+                responses.append(response.content)
+        assert responses[0] == responses[1]
@@ -0,0 +1,31 @@
+"""Tests for api/bitmap.py"""
+
+from api.bitmap import from_positions, iter_positions, membership, to_positions, union
+
+
+class TestBitmap:
+    """Tests for bitmap helpers"""
+
+    def test_from_positions_roundtrip(self):
+        """Test positions survive a bitmap roundtrip in ascending order"""
+        bits = from_positions([9, 0, 3, 3, 1024])
+        assert to_positions(bits) == [0, 3, 9, 1024]
+
+    def test_empty_bitmap(self):
+        """Test empty inputs produce an empty bitmap"""
+        assert from_positions([]) == 0
+        assert list(iter_positions(0)) == []
+
+    def test_union(self):
+        """Test union of bitmaps"""
+        assert to_positions(union([from_positions([1]), from_positions([2, 5]), 0])) == [1, 2, 5]
+
+    def test_dense_bitmap(self):
+        """Test every position is listed for a full bitmap"""
+        assert to_positions((1 << 100) - 1) == list(range(100))
+
+    def test_membership(self):
+        """Test membership matches the positions without expanding the bitmap"""
+        contains = membership(from_positions([0, 9, 1024]))
+        assert [pos for pos in range(2048) if contains(pos)] == [0, 9, 1024]
+        assert not membership(0)(0)
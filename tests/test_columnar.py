@@ -0,0 +1,165 @@
+"""Tests for api/columnar.py"""
+
+import random
+from unittest.mock import patch
+
+import pytest
+
+from api import columnar
+from api.bitmap import from_positions, membership
+from api.columnar import MenuColumns, SortOrders, bits_to_positions
+
+
+def synthetic_menus(count, seed=0):
+    """Random menus with duplicate prices and timestamps to exercise stable sorting"""
+    rng = random.Random(seed)
+    menus = []
+    for i in range(count):
+        menu = {
+            "id": f"{i:04d}",
+            "name": rng.choice(["Curry", "pizza", "Churros", "ドリンク", "Abc"]),
+            "price": {"amount": rng.choice([0, 300, 500, 500, 800, 1200])},
+            "scraped_at": rng.choice(["2025-01-01T10:00:00", "2025-01-02T09:00:00", ""]),
+            "category": rng.choice(["drink", "sweets", "main_dish"]),
+            "is_seasonal": rng.random() < 0.3,
+            "is_new": rng.random() < 0.2,
+            "restaurants": [{"park": park} for park in rng.sample(["tdl", "tds"], rng.randint(0, 2))],
+        }
+        if i % 7 == 0:
+            del menu["scraped_at"]
+        menus.append(menu)
+    return menus
+
+
+@pytest.fixture(params=["array", "numpy"])
+def backend(request):
+    """Run each test with the array fallback and, when installed, with NumPy"""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+        yield
+    else:
+        with patch.object(columnar, "NUMPY_AVAILABLE", False):
+            yield
+
+
+class TestMenuColumns:
+    """Tests for MenuColumns"""
+
+    def test_build(self):
+        """Test per-position codes and ranks"""
+        menus = synthetic_menus(50)
+        columns = MenuColumns.build(menus)
+
+        assert len(columns) == 50
+        for pos, menu in enumerate(menus):
+            assert columns.categories[columns.category_codes[pos]] == menu["category"]
+            assert columns.prices[pos] == menu["price"]["amount"]
+            assert columns.scraped_at_values[columns.scraped_at_ranks[pos]] == (menu.get("scraped_at") or "")
+
+    @pytest.mark.parametrize("min_price,max_price", [(None, None), (500, None), (None, 500), (300, 800), (900, 100)])
+    def test_filter_price_matches_dict_walk(self, backend, min_price, max_price):
+        """Test price filtering matches the record-based filter"""
+        menus = synthetic_menus(200)
+        columns = MenuColumns.build(menus)
+        positions = list(range(0, 200, 3))
+
+        expected = positions
+        if min_price is not None:
+            expected = [p for p in expected if menus[p]["price"]["amount"] >= min_price]
+        if max_price is not None:
+            expected = [p for p in expected if menus[p]["price"]["amount"] <= max_price]
+        assert list(columns.filter_price(positions, min_price, max_price)) == expected
+
+    @pytest.mark.parametrize("key", ["price", "name", "scraped_at"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    def test_sort_matches_sorted(self, backend, key, reverse):
+        """Test sorting matches sorted() over records, including the order of ties"""
+        menus = synthetic_menus(200)
+        columns = MenuColumns.build(menus)
+        record_key = {
+            "price": lambda p: menus[p]["price"]["amount"],
+            "name": lambda p: menus[p]["name"],
+            "scraped_at": lambda p: menus[p].get("scraped_at", ""),
+        }[key]
+        positions = list(range(200))
+        assert list(columns.sort_positions(positions, key, reverse)) == sorted(
+            positions, key=record_key, reverse=reverse
+        )
+
+    def test_stats_match_dict_walk(self, backend):
+        """Test price statistics, last update and category counts"""
+        menus = synthetic_menus(200)
+        columns = MenuColumns.build(menus)
+        prices = [m["price"]["amount"] for m in menus if m["price"]["amount"] > 0]
+
+        assert columns.price_stats() == (min(prices), max(prices), sum(prices) // len(prices))
+        assert columns.last_scraped_at() == max(m["scraped_at"] for m in menus if m.get("scraped_at"))
+        assert columns.category_counts() == {
+            c: sum(m["category"] == c for m in menus) for c in {m["category"] for m in menus}
+        }
+
+    def test_empty(self, backend):
+        """Test an empty dataset"""
+        columns = MenuColumns.build([])
+        assert columns.price_stats() is None
+        assert columns.last_scraped_at() is None
+        assert list(bits_to_positions(0)) == []
+        assert list(columns.filter_price([], 100, None)) == []
+        assert list(columns.sort_positions([], "price")) == []
+
+    def test_bits_to_positions(self, backend):
+        """Test bitmap expansion returns ascending positions"""
+        positions = [0, 3, 8, 9, 63, 64, 1000]
+        assert list(bits_to_positions(from_positions(positions))) == positions
+
+    def test_state_roundtrip(self):
+        """Test to_state()/from_state() restores identical columns"""
+        columns = MenuColumns.build(synthetic_menus(30))
+        restored = MenuColumns.from_state(columns.to_state())
+        assert restored.to_state() == columns.to_state()
+
+
+class TestSortOrders:
+    """Tests for SortOrders"""
+
+    @pytest.mark.parametrize("key", ["price", "name", "scraped_at"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    @pytest.mark.parametrize("step", [1, 2, 9])
+    def test_top_matches_sorted(self, backend, key, reverse, step):
+        """Test walking the permutation with a bitmap membership yields the head of the full stable sort"""
+        columns = MenuColumns.build(synthetic_menus(300))
+        orders = SortOrders.build(columns)
+        positions = bits_to_positions(from_positions(range(0, 300, step)))
+        expected = list(columns.sort_positions(positions, key, reverse))
+        contains = None if step == 1 else membership(from_positions(positions))
+        for k in (0, 1, 20, len(expected) + 5):
+            assert orders.top(contains, key, reverse, k) == expected[:k]
+            assert (
+                orders.top(contains, key, reverse, k, start=30)
+                == [pos for pos in orders.orders[(key, reverse)][30:] if pos in set(positions)][:k]
+            )
+
+    @pytest.mark.parametrize("key", ["price", "name"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    @pytest.mark.parametrize("step", [1, 2, 9])
+    def test_top_after_resumes_after_position(self, backend, key, reverse, step):
+        """Test resuming after any position yields the next slice of the full stable sort"""
+        columns = MenuColumns.build(synthetic_menus(300))
+        orders = SortOrders.build(columns)
+        positions = bits_to_positions(from_positions(range(0, 300, step)))
+        expected = list(columns.sort_positions(positions, key, reverse))
+        for i in (0, 1, len(expected) // 2, len(expected) - 1):
+            assert orders.top_after(positions, key, reverse, expected[i], 20) == expected[i + 1 : i + 21]
+
+    def test_walkable_depends_on_density_and_depth(self):
+        """Test dense filters with shallow pages walk and sparse or deep ones sort"""
+        orders = SortOrders.build(MenuColumns.build(synthetic_menus(1000)))
+        assert orders.walkable(1000, 100)
+        assert orders.walkable(500, 50)
+        assert not orders.walkable(50, 50)
+        assert not orders.walkable(500, 1000)
+
+    def test_state_roundtrip(self):
+        """Test to_state()/from_state() restores identical permutations"""
+        orders = SortOrders.build(MenuColumns.build(synthetic_menus(30)))
+        assert SortOrders.from_state(orders.to_state()).orders == orders.orders
@@ -403,12 +403,9 @@ class TestMenuDataLoaderEdgeCases:
 class TestMenuDataLoaderCachingAndPaths:
     """Tests for caching and path handling"""
 
-    def test_load_with_cache_refresh(self, temp_menu_json):
+    def test_load_with_cache_refresh(self):
         """Test cache refresh when file is modified"""
         from pathlib import Path
-        import time
-        import os
-        from unittest.mock import patch
 
         # 一時ファイルをdata/内に作成
         test_file = Path("data/cache_test.json")
@@ -417,28 +414,48 @@ class TestMenuDataLoaderCachingAndPaths:
         try:
             loader = MenuDataLoader(data_path="data/cache_test.json")
 
-            # 初回読み込み（_cache_timestampを設定）
+            # 初回読み込み（スナップショットを作成）
             menus1 = loader.load_menus()
             assert len(menus1) == 1
-            assert loader._cache_timestamp is not None
+            assert loader._snapshot is not None
 
-            # ファイルを変更（mtimeを更新）
-            time.sleep(0.1)  # 確実にmtimeが変更されるようにする
+            # ファイルを変更（サイズが変わるため同一性も変わる）
             test_file.write_text('[{"id": "0001"}, {"id": "0002"}]', encoding="utf-8")
-            os.utime(test_file, None)  # mtimeを強制更新
 
-            # _load_from_cache()を直接呼び出してL97-98をカバー
-            # ファイルのmtimeがキャッシュタイムスタンプより新しい場合
-            file_mtime = os.path.getmtime(test_file)
-            cache_ts = loader._cache_timestamp.timestamp()
+            menus2 = loader.load_menus()
+            assert len(menus2) == 2
+            assert menus2 is not menus1
+
+        finally:
+            if test_file.exists():
+                test_file.unlink()
 
-            # mtimeがキャッシュより新しいことを確認
-            assert file_mtime > cache_ts, f"File mtime ({file_mtime}) should be > cache timestamp ({cache_ts})"
+    def test_snapshot_reused_until_file_changes(self):
+        """Test the same parsed snapshot is returned while the file is unchanged"""
+        from pathlib import Path
+        from unittest.mock import patch
 
-            # _load_from_cache()を呼び出すとL97-98が実行される
-            reloaded_data = loader._load_from_cache()
-            assert len(reloaded_data) == 2, "L97-98 should reload updated file"
+        test_file = Path("data/snapshot_reuse_test.json")
+        test_file.write_text('[{"id": "0001"}]', encoding="utf-8")
 
+        try:
+            loader = MenuDataLoader(data_path="data/snapshot_reuse_test.json")
+            snapshot1 = loader.load_snapshot()
+
+            # 2回目以降はJSONをパースしない
+            with patch("api.data_loader.json.loads") as mock_loads:
+                snapshot2 = loader.load_snapshot()
+                menus = loader.load_menus()
+                assert not mock_loads.called
+
+            assert snapshot2 is snapshot1
+            assert menus is snapshot1.menus
+            assert snapshot1.version
+
+            # force_reloadの場合は再パースする
+            snapshot3 = loader.load_snapshot(force_reload=True)
+            assert snapshot3 is not snapshot1
+            assert snapshot3.version == snapshot1.version
         finally:
             if test_file.exists():
                 test_file.unlink()
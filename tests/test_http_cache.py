@@ -0,0 +1,204 @@
+"""Tests for api/http_cache.py and conditional GET handling in api/index.py"""
+
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.data_loader import MenuDataLoader
+from api.http_cache import cache_headers, compute_etag, etag_matches, http_date, is_not_modified
+from api.snapshot import JST, FileIdentity, MenuSnapshot
+
+
+class TestHelpers:
+    """Tests for the header helpers"""
+
+    def test_etag(self):
+        """Test ETags depend on version, path, parameters (not their order) and the date"""
+        etag = compute_etag("v1", "/menus", {"park": "tdl", "page": "2"})
+        assert etag.startswith('"') and etag.endswith('"')
+        assert etag == compute_etag("v1", "/menus", {"page": "2", "park": "tdl"})
+        assert etag != compute_etag("v2", "/menus", {"park": "tdl", "page": "2"})
+        assert etag != compute_etag("v1", "/tags", {"park": "tdl", "page": "2"})
+        assert etag != compute_etag("v1", "/menus", {"park": "tds", "page": "2"})
+        assert etag != compute_etag("v1", "/menus", {"park": "tdl", "page": "2"}, date(2026, 1, 1))
+
+    def test_etag_covers_code(self):
+        """Test a deploy that changes the response code changes the ETag even if the data is the same"""
+        etag = compute_etag("v1", "/menus", {"park": "tdl"})
+        with patch("api.http_cache.response_code_fingerprint", return_value="0123456789abcdef"):
+            assert compute_etag("v1", "/menus", {"park": "tdl"}) != etag
+
+    def test_is_not_modified(self):
+        """Test If-None-Match takes precedence over If-Modified-Since"""
+        modified = datetime(2026, 1, 31, 8, 6, 31, 571650, tzinfo=timezone.utc)
+        assert is_not_modified({"if-none-match": '"a", W/"b"'}, '"b"', modified)
+        assert is_not_modified({"if-none-match": "*"}, '"b"', modified)
+        assert not is_not_modified({"if-none-match": '"a"', "if-modified-since": http_date(modified)}, '"b"', modified)
+        assert is_not_modified({"if-modified-since": http_date(modified)}, '"b"', modified)
+        assert not is_not_modified({"if-modified-since": http_date(modified - timedelta(seconds=1))}, '"b"', modified)
+        assert not is_not_modified({"if-modified-since": "garbage"}, '"b"', modified)
+        assert not is_not_modified({"if-modified-since": http_date(modified)}, '"b"', None)
+        assert not is_not_modified({}, '"b"', modified)
+
+    def test_etag_matches(self):
+        """Test only the ETag itself (not "*") proves the request would return 200"""
+        assert etag_matches({"if-none-match": '"a", W/"b"'}, '"b"')
+        assert not etag_matches({"if-none-match": "*"}, '"b"')
+        assert not etag_matches({"if-modified-since": "Sat, 31 Jan 2026 08:06:31 GMT"}, '"b"')
+
+    def test_cache_headers(self):
+        """Test Cache-Control for data-only and date-dependent responses"""
+        modified = datetime(2026, 1, 31, 8, 6, 31, tzinfo=timezone.utc)
+        headers = cache_headers('"e"', modified)
+        assert headers["Last-Modified"] == "Sat, 31 Jan 2026 08:06:31 GMT"
+        assert "s-maxage=3600" in headers["Cache-Control"] and "stale-while-revalidate" in headers["Cache-Control"]
+        assert cache_headers('"e"', None, max_age=30) == {
+            "ETag": '"e"',
+            "Cache-Control": "public, max-age=30, s-maxage=30",
+        }
+
+    def test_snapshot_last_modified(self):
+        """Test the dataset timestamp is the later of the newest scraped_at (JST) and the file mtime"""
+        menus = [{"scraped_at": "2026-01-31T08:06:31.571650"}, {"scraped_at": "2026-01-01T00:00:00"}]
+        assert MenuSnapshot(menus=menus).last_modified == datetime(2026, 1, 30, 23, 6, 31, 571650, tzinfo=timezone.utc)
+        mtime = datetime(2026, 2, 1, tzinfo=timezone.utc)
+        identity = FileIdentity(int(mtime.timestamp() * 1_000_000_000), 0, 0)
+        assert MenuSnapshot(menus=menus, identity=identity).last_modified == mtime
+        assert MenuSnapshot(menus=[{}]).last_modified is None
+
+
+class TestConditionalRequests:
+    """Tests for ETag / Last-Modified handling on the API"""
+
+    @pytest.fixture
+    def client(self):
+        """Client with a real loader"""
+        from api import index
+
+        with patch.object(index, "loader", MenuDataLoader(use_binary_snapshot=False)):
+            yield TestClient(index.app), index
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/api/menus?park=tdl",
+            "/api/menus/0012",
+            "/api/menus/batch?ids=0012,0013",
+            "/api/menus/facets?park=tdl",
+            "/api/suggest?prefix=み",
+            "/api/restaurants",
+            "/api/tags",
+            "/api/tags/grouped",
+            "/api/categories",
+            "/api/stats?date=2026-01-01",
+        ],
+    )
+    def test_if_none_match(self, client, url):
+        """Test a matching ETag returns 304 (without running the search for /menus)"""
+        client, index = client
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert response.headers["last-modified"]
+        assert "public" in response.headers["cache-control"]
+
+        with patch.object(index.loader, "search_menu_json", side_effect=AssertionError("filters ran")):
+            not_modified = client.get(url, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+        assert client.get(url, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    def test_if_modified_since(self, client):
+        """Test If-Modified-Since compares against the dataset timestamp"""
+        client, _ = client
+        response = client.get("/api/tags")
+        last_modified = response.headers["last-modified"]
+        assert client.get("/api/tags", headers={"If-Modified-Since": last_modified}).status_code == 304
+        assert (
+            client.get("/api/tags", headers={"If-Modified-Since": "Thu, 01 Jan 2015 00:00:00 GMT"}).status_code == 200
+        )
+
+    def test_parameters_change_etag(self, client):
+        """Test different parameters produce different ETags and reordering does not"""
+        client, _ = client
+        first = client.get("/api/menus?park=tdl&limit=5").headers["etag"]
+        assert client.get("/api/menus?limit=5&park=tdl").headers["etag"] == first
+        assert client.get("/api/menus?park=tds&limit=5").headers["etag"] != first
+
+    def test_batch_etag_covers_all_ids(self, client):
+        """Test the batch ETag depends on the requested IDs and their order"""
+        client, _ = client
+        etag = client.get("/api/menus/batch?ids=0012,0013").headers["etag"]
+        assert client.get("/api/menus/batch?ids=0012,0013").headers["etag"] == etag
+        assert client.get("/api/menus/batch?ids=0013,0012").headers["etag"] != etag
+        assert client.get("/api/menus/batch?ids=0012").headers["etag"] != etag
+
+    def test_date_dependent_responses(self, client):
+        """Test responses based on today (JST) expire at midnight and are revalidated per day"""
+        client, index = client
+        now = datetime(2026, 3, 1, 23, 59, 0, tzinfo=JST)
+        # データの最終更新日時を固定する（実際のデータファイルの更新日時はチェックアウトごとに異なる）
+        data_modified = datetime(2026, 1, 31, 8, 6, 31, tzinfo=timezone.utc)
+        with patch.object(MenuSnapshot, "last_modified", data_modified), patch(
+            "api.index.today_jst", return_value=now.date()
+        ), patch("api.index.datetime") as mock_datetime:
+            mock_datetime.now.return_value = now
+            mock_datetime.combine.side_effect = datetime.combine
+            mock_datetime.min = datetime.min
+            response = client.get("/api/stats")
+            assert response.headers["cache-control"] == "public, max-age=60, s-maxage=60"
+            assert response.headers["last-modified"] == "Sat, 28 Feb 2026 15:00:00 GMT"
+            etag = response.headers["etag"]
+            available = client.get("/api/menus?only_available=true").headers["etag"]
+            unfiltered = client.get("/api/menus?only_available=false").headers["etag"]
+        with patch("api.index.today_jst", return_value=date(2026, 3, 2)):
+            assert client.get("/api/stats", headers={"If-None-Match": etag}).status_code == 200
+            assert client.get("/api/menus?only_available=true").headers["etag"] != available
+            assert client.get("/api/menus?only_available=false").headers["etag"] == unfiltered
+
+    def test_errors_and_metrics_are_not_cached(self, client):
+        """Test error responses and runtime metrics carry no validators"""
+        client, _ = client
+        assert "etag" not in client.get("/api/menus/9999").headers
+        assert "etag" not in client.get("/api/metrics").headers
+        assert "etag" not in client.get("/api/menus?sort=bogus").headers
+
+    @pytest.mark.parametrize(
+        "url, status",
+        [
+            ("/api/menus/9999", 404),
+            ("/api/menus/abcd", 400),
+            ("/api/menus?limit=1000", 422),
+            ("/api/menus?cursor=bogus", 400),
+            ("/api/menus/facets?min_price=-1", 422),
+            ("/api/menus/batch?ids=abcd", 400),
+            ("/api/nothing", 404),
+        ],
+    )
+    def test_errors_are_never_not_modified(self, client, url, status):
+        """Test only requests that would return 200 get a 304 (routing and validation still run)"""
+        client, index = client
+        path, _, query = url.removeprefix("/api").partition("?")
+        params = dict(pair.split("=") for pair in query.split("&")) if query else {}
+        etag = compute_etag(index.loader.load_snapshot().version, path, params)
+        future = "Fri, 01 Jan 2100 00:00:00 GMT"
+        for headers in ({"If-None-Match": "*"}, {"If-None-Match": etag}, {"If-Modified-Since": future}):
+            assert client.get(url, headers=headers).status_code == status
+
+    def test_wildcard_after_success(self, client):
+        """Test If-None-Match: * returns 304 for requests that would return 200"""
+        client, _ = client
+        assert client.get("/api/menus/0012", headers={"If-None-Match": "*"}).status_code == 304
+        assert client.get("/api/menus?park=tdl", headers={"If-None-Match": "*"}).status_code == 304
+
+    def test_cors_headers_on_304(self, client):
+        """Test 304 responses still carry CORS headers"""
+        client, _ = client
+        origin = {"Origin": "http://localhost:5173"}
+        etag = client.get("/api/tags", headers=origin).headers["etag"]
+        response = client.get("/api/tags", headers={**origin, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
@@ -4,6 +4,9 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch
 from pathlib import Path
+from datetime import date
+from api.query import facet_counts, search_positions, search_snapshot
+from api.snapshot import MenuSnapshot
 
 
 @pytest.fixture
@@ -11,6 +14,18 @@ def mock_data_loader(sample_menus_list, sample_menu_data):
     """Create mock MenuDataLoader"""
     mock = Mock()
     mock.load_menus.return_value = sample_menus_list
+    mock.load_snapshot.side_effect = lambda *args, **kwargs: MenuSnapshot(menus=mock.load_menus())
+    mock.search_menus.side_effect = lambda query: search_snapshot(mock.load_snapshot(), query)
+
+    def search_menu_json(query):
+        snapshot = mock.load_snapshot()
+        positions, total = search_positions(snapshot, query)
+        last = int(positions[-1]) if len(positions) else None
+        last_key = (snapshot.sort_value(last, query.sort, query.q), last) if last is not None else None
+        return snapshot.menu_json(positions), total, last_key
+
+    mock.search_menu_json.side_effect = search_menu_json
+    mock.get_facets.side_effect = lambda query: facet_counts(mock.load_snapshot(), query)
     mock.get_menu_by_id.side_effect = lambda id: next((menu for menu in sample_menus_list if menu["id"] == id), None)
     mock.filter_by_availability.return_value = sample_menus_list
     mock.get_all_restaurants.return_value = [
@@ -156,6 +171,37 @@ class TestGetMenus:
         assert len(data["data"]) == 0
         assert data["meta"]["total"] == 0
 
+    @pytest.mark.parametrize("params", ["", "&sort=price&order=desc", "&sort=name"])
+    def test_get_menus_cursor_pagination(self, client, params):
+        """Test following next_cursor returns every menu once in the same order as page/limit"""
+        expected = [m["id"] for m in client.get(f"/api/menus?limit=100{params}").json()["data"]]
+        first = client.get(f"/api/menus?limit=2{params}").json()
+        ids = [m["id"] for m in first["data"]]
+        cursor = first["meta"]["next_cursor"]
+        while cursor:
+            data = client.get(f"/api/menus?limit=2{params}&cursor={cursor}").json()
+            assert data["meta"]["page"] is None
+            assert data["meta"]["total"] == len(expected)
+            ids.extend(m["id"] for m in data["data"])
+            cursor = data["meta"]["next_cursor"]
+        assert ids == expected
+
+    def test_get_menus_last_page_has_no_cursor(self, client):
+        """Test the last offset page does not return a cursor"""
+        assert client.get("/api/menus?limit=100").json()["meta"]["next_cursor"] is None
+
+    def test_get_menus_invalid_cursor(self, client):
+        """Test malformed, stale and mismatched cursors are rejected with 400"""
+        from api.query import MenuQuery, encode_cursor
+
+        assert client.get("/api/menus?cursor=garbage").status_code == 400
+        stale = encode_cursor("old-version", MenuQuery(sort="price"), (500, 0))
+        response = client.get(f"/api/menus?sort=price&cursor={stale}")
+        assert response.status_code == 400
+        assert "expired" in response.json()["detail"]
+        cursor = client.get("/api/menus?sort=price&limit=1").json()["meta"]["next_cursor"]
+        assert client.get(f"/api/menus?sort=name&limit=1&cursor={cursor}").status_code == 400
+
 
 class TestGetMenuById:
     """Tests for GET /api/menus/{menu_id} endpoint"""
@@ -178,6 +224,17 @@ class TestGetMenuById:
         assert "detail" in data
         assert "not found" in data["detail"].lower()
 
+    def test_get_menu_by_id_matches_response_model(self, client, sample_menus_list):
+        """Test the pre-serialized body is byte-identical to the MenuResponse serialization"""
+        from fastapi.responses import JSONResponse
+        from fastapi.encoders import jsonable_encoder
+        from api.index import MenuResponse
+
+        response = client.get("/api/menus/4371")
+        expected = JSONResponse(jsonable_encoder(MenuResponse(data=sample_menus_list[1]))).body
+        assert response.content == expected
+        assert response.headers["content-type"] == "application/json"
+
     def test_get_menu_by_id_valid_ids(self, client):
         """Test get menu with various valid IDs"""
         for menu_id in ["4370", "4371", "4372"]:
@@ -185,6 +242,108 @@ class TestGetMenuById:
             assert response.status_code in [200, 404]
 
 
+class TestGetMenusBatch:
+    """Tests for GET /api/menus/batch endpoint"""
+
+    def test_batch_keeps_order_and_marks_missing(self, client, sample_menus_list):
+        """Test menus are returned in the requested order with null for unknown IDs"""
+        response = client.get("/api/menus/batch?ids=4372,9999,4370,4372")
+        assert response.status_code == 200
+        data = response.json()
+        assert [menu and menu["id"] for menu in data["data"]] == ["4372", None, "4370", "4372"]
+        assert data["data"][0] == sample_menus_list[2]
+        assert data["meta"] == {"requested": 4, "found": 3, "not_found": ["9999"]}
+
+    def test_batch_matches_response_model(self, client, sample_menus_list):
+        """Test the concatenated body is byte-identical to the MenuBatchResponse serialization"""
+        from fastapi.responses import JSONResponse
+        from fastapi.encoders import jsonable_encoder
+        from api.index import MenuBatchResponse
+
+        response = client.get("/api/menus/batch?ids=4371,0000")
+        meta = {"requested": 2, "found": 1, "not_found": ["0000"]}
+        expected = JSONResponse(jsonable_encoder(MenuBatchResponse(data=[sample_menus_list[1], None], meta=meta))).body
+        assert response.content == expected
+
+    @pytest.mark.parametrize(
+        "query,status",
+        [("", 422), ("?ids=437", 422), ("?ids=4370,abcd", 400), ("?ids=,,,,", 400), ("?ids=4370,43710", 400)],
+    )
+    def test_batch_validation(self, client, query, status):
+        """Test malformed IDs are rejected"""
+        assert client.get(f"/api/menus/batch{query}").status_code == status
+
+    def test_batch_id_limit(self, client):
+        """Test the number of IDs is bounded"""
+        from api.index import BATCH_MAX_IDS
+
+        assert client.get(f"/api/menus/batch?ids={','.join(['4370'] * BATCH_MAX_IDS)}").status_code == 200
+        response = client.get(f"/api/menus/batch?ids={','.join(['4370'] * (BATCH_MAX_IDS + 1))}")
+        assert response.status_code == 400
+        assert response.json()["detail"] == f"Too many menu IDs. Maximum is {BATCH_MAX_IDS}."
+
+    def test_batch_ids_with_spaces(self, client):
+        """Test spaces after commas are accepted up to the ID limit"""
+        from api.index import BATCH_MAX_IDS
+
+        response = client.get(f"/api/menus/batch?ids={',  '.join(['4370'] * BATCH_MAX_IDS)}")
+        assert response.status_code == 200
+        assert response.json()["meta"]["requested"] == BATCH_MAX_IDS
+        assert client.get(f"/api/menus/batch?ids={',  '.join(['4370'] * (BATCH_MAX_IDS + 1))}").status_code == 400
+
+    def test_batch_counts_separators(self, client):
+        """Test the ID limit is checked from the number of separators, including empty ones"""
+        from api.index import BATCH_MAX_IDS
+
+        response = client.get(f"/api/menus/batch?ids={','.join(['4370'] * 10_000)}")
+        assert response.status_code == 400
+        assert response.json()["detail"] == f"Too many menu IDs. Maximum is {BATCH_MAX_IDS}."
+        assert client.get(f"/api/menus/batch?ids=4370{',' * (BATCH_MAX_IDS - 1)}").status_code == 200
+        assert client.get(f"/api/menus/batch?ids=4370{',' * BATCH_MAX_IDS}").status_code == 400
+
+
+class TestGetMenuFacets:
+    """Tests for GET /api/menus/facets endpoint"""
+
+    @pytest.mark.parametrize("params", ["", "?park=tdl", "?min_price=400&max_price=600", "?q=テスト&tags=テストタグ"])
+    def test_facets_match_menus(self, client, params):
+        """Test facets accept the /menus filters and count the same result set"""
+        response = client.get(f"/api/menus/facets{params}")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["total"] == client.get(f"/api/menus{params}").json()["meta"]["total"]
+        assert sum(bucket["count"] for bucket in data["price"]) == data["total"]
+
+    def test_facets_is_not_a_menu_id(self, client, mock_data_loader):
+        """Test the facets route is not handled as /menus/{menu_id}"""
+        assert client.get("/api/menus/facets").status_code == 200
+        mock_data_loader.get_menu_by_id.assert_not_called()
+
+    def test_facets_validation(self, client):
+        """Test facets validate parameters like /menus"""
+        assert client.get("/api/menus/facets?min_price=-1").status_code == 422
+        assert client.get("/api/menus/facets?park=invalid").status_code == 422
+
+
+class TestGetSuggestions:
+    """Tests for GET /api/suggest endpoint"""
+
+    def test_suggest(self, client):
+        """Test completions for a prefix"""
+        response = client.get("/api/suggest?prefix=てすと&limit=2")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert len(data["data"]) == 2
+        assert all(item["text"].startswith("テスト") for item in data["data"])
+        assert set(data["data"][0]) == {"text", "type", "count"}
+
+    @pytest.mark.parametrize("params", ["", "prefix=", "prefix=a&limit=0", "prefix=a&limit=21", "prefix=" + "a" * 101])
+    def test_suggest_validation(self, client, params):
+        """Test invalid parameters are rejected"""
+        assert client.get(f"/api/suggest?{params}").status_code == 422
+
+
 class TestGetRestaurants:
     """Tests for GET /api/restaurants endpoint"""
 
@@ -239,6 +398,50 @@ class TestGetTags:
         assert len(data["data"]) > 0
 
 
+class TestPreSerializedResponses:
+    """Tests for responses assembled from pre-serialized bytes"""
+
+    @pytest.mark.parametrize("url", ["/api/restaurants?park=tdl", "/api/tags", "/api/categories"])
+    def test_list_bodies_match_response_model(self, client, url):
+        """Test list bodies are byte-identical to rendering ListResponse"""
+        from api.index import ListResponse
+        from api.serialization import dump_json
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == dump_json(ListResponse(**response.json()).model_dump())
+
+    def test_menus_body_matches_response_model(self, client, sample_menus_list):
+        """Test concatenated menu bytes equal rendering MenuListResponse"""
+        from api.index import MenuListResponse
+        from api.serialization import dump_json
+
+        response = client.get("/api/menus?sort=price&limit=2&page=2")
+        meta = {
+            "total": len(sample_menus_list),
+            "page": 2,
+            "limit": 2,
+            "pages": -(-len(sample_menus_list) // 2),
+            "next_cursor": response.json()["meta"]["next_cursor"],
+        }
+        menus = sorted(sample_menus_list, key=lambda m: m["price"]["amount"])[2:4]
+        assert response.content == dump_json(MenuListResponse(data=menus, meta=meta).model_dump())
+
+    def test_openapi_keeps_response_models(self):
+        """Test raw responses still document their response models"""
+        from api.index import app
+
+        paths = app.openapi()["paths"]
+        for path, model in [
+            ("/menus", "MenuListResponse"),
+            ("/menus/{menu_id}", "MenuResponse"),
+            ("/tags", "ListResponse"),
+        ]:
+            schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+            assert schema["$ref"].endswith(model)
+
+
 class TestGetStatistics:
     """Tests for GET /api/stats endpoint"""
 
@@ -271,6 +474,19 @@ class TestGetStatistics:
         assert isinstance(stats["total_menus"], int)
 
 
+class TestGetMetrics:
+    """Tests for GET /api/metrics endpoint"""
+
+    def test_get_metrics(self, client, mock_data_loader):
+        """Test metrics are returned from the loader"""
+        mock_data_loader.get_metrics.return_value = {"refinement_cache": {"hits": 1}}
+        response = client.get("/api/metrics")
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["refinement_cache"] == {"hits": 1}
+        assert {"hits", "misses", "size", "bytes", "evictions"} <= set(data["response_cache"])
+
+
 class TestCORS:
     """Tests for CORS configuration"""
 
@@ -383,11 +599,29 @@ class TestDataLoaderIntegration:
         assert mock_data_loader.load_menus.called
 
     def test_data_loader_filter_called(self, client, mock_data_loader):
-        """Test data loader filter method is called when only_available=True"""
-        # only_available=Trueの場合のみfilter_by_availabilityが呼ばれる
-        client.get("/api/menus?only_available=true")
+        """Test availability filter is applied when only_available=True"""
+        # 販売期間はスナップショットの販売期間インデックスで判定される
+        with patch("api.snapshot.today_jst", return_value=date(2026, 1, 1)):
+            response = client.get("/api/menus?only_available=true")
         assert mock_data_loader.load_menus.called
-        assert mock_data_loader.filter_by_availability.called
+        # サンプルデータの販売期間は2025年のみ
+        assert response.json()["meta"]["total"] == 0
+
+    def test_availability_date_parameter(self, client):
+        """Test date parameter filters menus available on that date"""
+        assert client.get("/api/menus?date=2025-06-01").json()["meta"]["total"] == 5
+        assert client.get("/api/menus?only_available=true&date=2024-12-31").json()["meta"]["total"] == 0
+
+    def test_availability_invalid_date(self, client):
+        """Test invalid date parameter is rejected"""
+        assert client.get("/api/menus?date=2025-13-01").status_code == 422
+        assert client.get("/api/stats?date=tomorrow").status_code == 422
+
+    def test_stats_date_parameter(self, client, mock_data_loader):
+        """Test date parameter is passed to get_stats"""
+        response = client.get("/api/stats?date=2025-06-01")
+        assert response.status_code == 200
+        mock_data_loader.get_stats.assert_called_with(date(2025, 6, 1))
 
 
 class TestSortFeature:
@@ -693,3 +927,66 @@ class TestDebugMode:
             assert response.status_code == 200
             data = response.json()
             assert len(data["data"]) == 1
+
+
+class TestIndexedFilters:
+    """Tests for posting-list based filters on /api/menus"""
+
+    @pytest.fixture
+    def indexed_client(self, client, mock_data_loader):
+        """Client backed by menus spread across parks, areas and restaurants"""
+        mock_data_loader.load_menus.return_value = [
+            {
+                "id": "0001",
+                "name": "カレー",
+                "price": {"amount": 1200},
+                "tags": ["カレー"],
+                "category": "main_dish",
+                "characters": ["ミッキーマウス"],
+                "restaurants": [{"id": "1", "name": "カフェA", "park": "tdl", "area": "ワールドバザール"}],
+            },
+            {
+                "id": "0002",
+                "name": "ピザ",
+                "price": {"amount": 900},
+                "tags": ["ピザ", "ソフトドリンク"],
+                "category": "main_dish",
+                "characters": [],
+                "restaurants": [
+                    {"id": "2", "name": "リストランテB", "park": "tds", "area": "メディテレーニアンハーバー"}
+                ],
+            },
+            {
+                "id": "0003",
+                "name": "チュロス",
+                "price": {"amount": 500},
+                "tags": ["スナック"],
+                "category": "snack",
+                "characters": ["ドナルドダック"],
+                "restaurants": [
+                    {"id": "1", "name": "カフェA", "park": "tdl", "area": "ワールドバザール"},
+                    {"id": "3", "name": "ワゴンC", "park": "tds", "area": "ポートディスカバリー"},
+                ],
+            },
+        ]
+        return client
+
+    @pytest.mark.parametrize(
+        "params, expected",
+        [
+            ("park=tds", ["0002", "0003"]),
+            ("area=バザール", ["0001", "0003"]),
+            ("restaurant=カフェ", ["0001", "0003"]),
+            ("character=ドナルド", ["0003"]),
+            ("categories=main_dish,snack", ["0001", "0002", "0003"]),
+            ("tags=カレー,ピザ", ["0001", "0002"]),
+            ("tags=ピザ,ソフトドリンク", ["0002"]),
+            ("park=tdl&categories=main_dish", ["0001"]),
+            ("area=存在しない", []),
+        ],
+    )
+    def test_filters(self, indexed_client, params, expected):
+        """Test index-backed filters return the same menus as a linear scan would"""
+        response = indexed_client.get(f"/api/menus?{params}")
+        assert response.status_code == 200
+        assert [m["id"] for m in response.json()["data"]] == expected
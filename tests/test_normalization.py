@@ -0,0 +1,43 @@
+"""Tests for api/normalization.py"""
+
+import pytest
+
+from api.normalization import normalize_search_text
+
+
+class TestNormalizeSearchText:
+    """Tests for search text normalisation"""
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("ぴざ", "ピザ"),
+            ("ﾋﾟｻﾞ", "ピザ"),
+            ("ピザ", "ピザ"),
+            ("ﾐｯｷｰ", "ミッキー"),
+            ("ＭＩＣＫＥＹ", "mickey"),
+            ("Mickey Mouse", "mickey mouse"),
+            ("ゔぁ", "ヴァ"),
+            ("ゝ", "ヽ"),
+            ("１２３円", "123円"),
+        ],
+    )
+    def test_kana_width_and_case_folding(self, text, expected):
+        """Test hiragana, width and case variants fold to one key"""
+        assert normalize_search_text(text) == expected
+
+    @pytest.mark.parametrize("text", ["ミッキー", "ミッキ-", "ミッキ－", "ミッキ―", "ミッキーー", "みっきー"])
+    def test_long_vowel_variants(self, text):
+        """Test hyphen-like marks after katakana and repeated long-vowel marks become one mark"""
+        assert normalize_search_text(text) == "ミッキー"
+
+    def test_hyphens_elsewhere_are_kept(self):
+        """Test hyphens not following kana are left alone"""
+        assert normalize_search_text("T-shirt") == "t-shirt"
+        assert normalize_search_text("ー") == "ー"
+        assert normalize_search_text("") == ""
+
+    def test_idempotent(self):
+        """Test normalising twice gives the same key"""
+        for text in ("ﾋﾟｻﾞ・ﾊﾟｰﾃｨｰ", "Ｃｏｆｆｅｅ－ミルク", "ちょこれーと"):
+            assert normalize_search_text(normalize_search_text(text)) == normalize_search_text(text)
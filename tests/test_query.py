@@ -0,0 +1,346 @@
+"""Tests for api/query.py"""
+
+import random
+from collections import defaultdict
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+from api.constants import PRICE_BUCKETS, TAG_CATEGORIES, TAG_CATEGORY_MAP
+from api.data_loader import MenuDataLoader
+from api.query import (
+    MenuQuery,
+    RefinementCache,
+    canonical_query,
+    decode_cursor,
+    encode_cursor,
+    facet_counts,
+    group_tags,
+    search_positions,
+    search_snapshot,
+    tag_filter_bits,
+)
+from api.snapshot import MenuSnapshot
+
+
+def legacy_tag_filter(menus, tag_list):
+    """Reference implementation: the original linear AND-of-OR tag filter in get_menus"""
+    tags_by_category = defaultdict(list)
+    for tag in tag_list:
+        category_found = False
+        for category, category_tags in TAG_CATEGORIES.items():
+            if tag in category_tags:
+                tags_by_category[category].append(tag)
+                category_found = True
+                break
+        if not category_found:
+            tags_by_category[f"dynamic_{tag}"].append(tag)
+
+    def matches_tag_filter(menu):
+        menu_tags = set(menu.get("tags", []))
+        for category, category_tag_list in tags_by_category.items():
+            if not any(tag in menu_tags for tag in category_tag_list):
+                return False
+        return True
+
+    return [m for m in menus if matches_tag_filter(m)]
+
+
+@pytest.fixture(scope="module")
+def real_snapshot():
+    """Snapshot of the bundled dataset"""
+    snapshot = MenuDataLoader().load_snapshot()
+    if not snapshot.menus:
+        pytest.skip("Menu data file not found")
+    return snapshot
+
+
+class TestTagCategoryMap:
+    """Tests for the precomputed tag → category reverse map"""
+
+    def test_first_category_wins(self):
+        """Test tags defined in several categories map to the first one"""
+        assert TAG_CATEGORY_MAP["ワンハンドメニュー"] == "food_type"
+        assert TAG_CATEGORY_MAP["ホット"] == "drink_type"
+        assert TAG_CATEGORY_MAP["スナック"] == "features"
+
+    def test_map_is_read_only(self):
+        """Test the reverse map cannot be modified"""
+        with pytest.raises(TypeError):
+            TAG_CATEGORY_MAP["新タグ"] = "food_type"
+
+
+class TestGroupTags:
+    """Tests for group_tags"""
+
+    def test_dynamic_tags_grouped_per_tag(self):
+        """Test undefined tags get one dynamic group per tag"""
+        groups = group_tags(["カレー", "ワールドバザール", "ピザ", "ワールドバザール", "カフェ"])
+        assert groups == {
+            "food_type": ["カレー", "ピザ"],
+            "dynamic_ワールドバザール": ["ワールドバザール", "ワールドバザール"],
+            "dynamic_カフェ": ["カフェ"],
+        }
+
+
+class TestTagFilterDifferential:
+    """Differential tests: bitmap engine vs the original linear implementation"""
+
+    def test_random_combinations_match_legacy(self, real_snapshot):
+        """Test random tag combinations give exactly the legacy result"""
+        rng = random.Random(20260101)
+        known_tags = sorted(real_snapshot.postings.tags)
+        defined_tags = sorted(TAG_CATEGORY_MAP)
+        pool = known_tags + defined_tags + ["存在しないタグ", ""]
+
+        for _ in range(500):
+            tag_list = rng.sample(pool, rng.randint(1, 5))
+            expected = legacy_tag_filter(real_snapshot.menus, tag_list)
+            actual = real_snapshot.select(tag_filter_bits(real_snapshot, tag_list))
+            assert actual == expected, tag_list
+
+    def test_every_single_tag_matches_legacy(self, real_snapshot):
+        """Test every tag in the dataset on its own"""
+        for tag in real_snapshot.postings.tags:
+            assert real_snapshot.select(tag_filter_bits(real_snapshot, [tag])) == legacy_tag_filter(
+                real_snapshot.menus, [tag]
+            )
+
+
+class TestSortedPages:
+    """Tests for sorted pages produced from the precomputed permutations"""
+
+    @pytest.mark.parametrize("sort", ["price", "name", "scraped_at"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    @pytest.mark.parametrize("filters", [{}, {"park": "tdl"}, {"categories": ("sweets",)}, {"q": "チュロス"}])
+    def test_pages_match_full_sort(self, real_snapshot, sort, reverse, filters):
+        """Test every page equals slicing the fully sorted result"""
+        full, total = search_snapshot(real_snapshot, MenuQuery(**filters, limit=len(real_snapshot.menus)))
+        key = {
+            "price": lambda m: (m.get("price") or {}).get("amount") or 0,
+            "name": lambda m: m.get("name", ""),
+            "scraped_at": lambda m: m.get("scraped_at") or "",
+        }[sort]
+        expected = [m["id"] for m in sorted(full, key=key, reverse=reverse)]
+        for offset, limit in [(0, 1), (0, 50), (40, 20), (total - 3, 10), (total + 5, 10)]:
+            query = MenuQuery(**filters, sort=sort, reverse=reverse, offset=max(offset, 0), limit=limit)
+            page, page_total = search_snapshot(real_snapshot, query)
+            assert page_total == total
+            assert [m["id"] for m in page] == expected[max(offset, 0) : max(offset, 0) + limit]
+
+
+def walk_cursor(snapshot, query):
+    """Collect every page by following cursors from the first page"""
+    seen = []
+    positions, total = search_positions(snapshot, query)
+    while len(positions):
+        seen.extend(int(pos) for pos in positions)
+        last = int(positions[-1])
+        after = (snapshot.sort_value(last, query.sort, query.q), last)
+        cursor = encode_cursor(snapshot.version, query, after)
+        positions, page_total = search_positions(
+            snapshot, query._replace(after=decode_cursor(cursor, snapshot.version, query))
+        )
+        assert page_total == total
+    return seen
+
+
+class TestCursor:
+    """Tests for keyset pagination with opaque cursors"""
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            MenuQuery(limit=37),
+            MenuQuery(sort="price", limit=37),
+            MenuQuery(sort="price", reverse=True, park="tds", limit=13),
+            MenuQuery(sort="name", categories=("sweets",), limit=5),
+            MenuQuery(sort="scraped_at", reverse=True, limit=100),
+            MenuQuery(sort="relevance", q="チョコ", limit=7),
+            MenuQuery(sort="relevance", limit=300),
+        ],
+    )
+    def test_cursor_pages_match_offset_pages(self, real_snapshot, query):
+        """Test following cursors visits the same menus in the same order as the full result"""
+        expected, total = search_positions(real_snapshot, query._replace(limit=len(real_snapshot.menus)))
+        assert walk_cursor(real_snapshot, query) == list(expected)
+        assert len(expected) == total
+
+    def test_roundtrip_and_opacity(self):
+        """Test cursors are URL-safe and decode to the encoded key"""
+        query = MenuQuery(sort="name", reverse=True)
+        cursor = encode_cursor("v1", query, ("チュロス", 12))
+        assert cursor.isascii() and "=" not in cursor and "/" not in cursor and "+" not in cursor
+        assert decode_cursor(cursor, "v1", query) == ("チュロス", 12)
+
+    @pytest.mark.parametrize(
+        "cursor,version,query,message",
+        [
+            ("not-a-cursor", "v1", MenuQuery(sort="price"), "Invalid cursor"),
+            ("", "v1", MenuQuery(sort="price"), "Invalid cursor"),
+            ("W10", "v1", MenuQuery(sort="price"), "Invalid cursor"),
+            (None, "v2", MenuQuery(sort="price"), "expired"),
+            (None, "v1", MenuQuery(sort="name"), "sort order"),
+            (None, "v1", MenuQuery(sort="price", reverse=True), "sort order"),
+        ],
+    )
+    def test_rejected(self, cursor, version, query, message):
+        """Test malformed cursors, changed data and a different sort order are rejected"""
+        if cursor is None:
+            cursor = encode_cursor("v1", MenuQuery(sort="price"), (500, 3))
+        with pytest.raises(ValueError, match=message):
+            decode_cursor(cursor, version, query)
+
+    def test_mismatched_key_is_rejected(self, real_snapshot):
+        """Test a cursor whose sort value does not match the menu at its position is rejected"""
+        query = MenuQuery(sort="price")
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            search_positions(real_snapshot, query._replace(after=(-1, 0)))
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            search_positions(real_snapshot, query._replace(after=(500, len(real_snapshot.menus))))
+
+
+class TestFacetCounts:
+    """Tests for per-value counts computed with bitmap popcounts"""
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            MenuQuery(),
+            MenuQuery(park="tdl"),
+            MenuQuery(categories=("sweets",), min_price=500),
+            MenuQuery(q="チョコ", max_price=999),
+            MenuQuery(tags=("カレー",), only_available=True, check_date=date(2026, 1, 1)),
+        ],
+    )
+    def test_counts_match_result_set(self, real_snapshot, query):
+        """Test every count equals counting the /menus result by hand"""
+        menus, total = search_snapshot(real_snapshot, query._replace(limit=len(real_snapshot.menus)))
+        expected = {name: defaultdict(int) for name in ("tags", "categories", "parks", "areas", "restaurants")}
+        price = [0] * len(PRICE_BUCKETS)
+        for menu in menus:
+            for tag in set(menu.get("tags", [])):
+                expected["tags"][tag] += 1
+            if menu.get("category"):
+                expected["categories"][menu["category"]] += 1
+            for name, key in (("parks", "park"), ("areas", "area"), ("restaurants", "name")):
+                for value in {restaurant.get(key) for restaurant in menu.get("restaurants", [])} - {None, ""}:
+                    expected[name][value] += 1
+            amount = (menu.get("price") or {}).get("amount") or 0
+            price[max(i for i, lower in enumerate(PRICE_BUCKETS) if amount >= lower)] += 1
+
+        facets = facet_counts(real_snapshot, query)
+        assert facets["total"] == total
+        for name, counts in expected.items():
+            assert facets[name] == dict(counts), name
+            assert list(facets[name].values()) == sorted(counts.values(), reverse=True)
+        assert [bucket["count"] for bucket in facets["price"]] == price
+        assert facets["price"][0]["min"] == 0 and facets["price"][-1]["max"] is None
+
+    def test_empty_result(self, real_snapshot):
+        """Test an empty result has no values and zero price buckets"""
+        facets = facet_counts(real_snapshot, MenuQuery(q="存在しないメニュー名"))
+        assert facets["total"] == 0 and facets["tags"] == {} and facets["parks"] == {}
+        assert all(bucket["count"] == 0 for bucket in facets["price"])
+
+
+class TestCanonicalQuery:
+    """Tests for canonical_query (cache keys)"""
+
+    def test_equivalent_queries_share_a_key(self):
+        """Test tag order, duplicates, spelling variants and ignored order collapse to one key"""
+        base = canonical_query(MenuQuery(q="チュロス", tags=("カレー", "ピザ"), area="バザール", sort="relevance"))
+        assert base == canonical_query(
+            MenuQuery(q="ﾁｭﾛｽ", tags=("ピザ", "カレー", "ピザ"), area="ばざーる", sort="relevance", reverse=True)
+        )
+        assert canonical_query(MenuQuery(reverse=True)) == canonical_query(MenuQuery())
+
+    def test_distinct_queries_keep_distinct_keys(self):
+        """Test parameters that change the result are kept"""
+        keys = {
+            canonical_query(query)
+            for query in (
+                MenuQuery(),
+                MenuQuery(sort="price"),
+                MenuQuery(sort="price", reverse=True),
+                MenuQuery(offset=50),
+                MenuQuery(tags=("カレー", "")),
+                MenuQuery(tags=("カレー",)),
+                MenuQuery(q="チュロ"),
+            )
+        }
+        assert len(keys) == 7
+
+    def test_only_available_is_resolved_to_today(self):
+        """Test only_available and an explicit date for today share a key"""
+        with patch("api.query.today_jst", return_value=date(2025, 3, 1)):
+            assert canonical_query(MenuQuery(only_available=True)) == canonical_query(
+                MenuQuery(check_date=date(2025, 3, 1))
+            )
+
+    @pytest.mark.parametrize(
+        "pair",
+        [
+            (MenuQuery(tags=("カレー", "ピザ")), MenuQuery(tags=("ピザ", "カレー", "カレー"))),
+            (MenuQuery(categories=("dessert", "drink")), MenuQuery(categories=("drink", "dessert"))),
+            (MenuQuery(q="ちょこ", character="みっきー"), MenuQuery(q="ﾁｮｺ", character="ミッキー")),
+        ],
+    )
+    def test_same_key_means_same_result(self, real_snapshot, pair):
+        """Test queries sharing a key return the same page"""
+        first, second = pair
+        assert canonical_query(first) == canonical_query(second)
+        assert search_snapshot(real_snapshot, first) == search_snapshot(real_snapshot, second)
+
+
+class TestRefinementCache:
+    """Tests for the search-as-you-type refinement cache"""
+
+    @pytest.mark.parametrize(
+        "filters",
+        [{}, {"park": "tds"}, {"tags": ("スイーツ",)}, {"only_available": True}, {"check_date": date(2025, 3, 1)}],
+    )
+    def test_results_match_uncached(self, real_snapshot, filters):
+        """Test typed-out queries return exactly what an uncached search returns"""
+        cache = RefinementCache()
+        for q in ("ち", "ちゅ", "チュロ", "ﾁｭﾛｽ", "チュロス", "チ", "ミッキー", "ミッキーチュロス", "ちゅ"):
+            query = MenuQuery(q=q, limit=100, **filters)
+            assert search_snapshot(real_snapshot, query, cache) == search_snapshot(real_snapshot, query), q
+
+    def test_refinement_rescans_only_cached_candidates(self, real_snapshot):
+        """Test extending a cached query only re-checks the cached matches"""
+        cache = RefinementCache()
+        search_snapshot(real_snapshot, MenuQuery(q="チュ"), cache)
+        cached = real_snapshot.text_bits("チュ")
+        with patch.object(MenuSnapshot, "text_bits", autospec=True, side_effect=MenuSnapshot.text_bits) as text_bits:
+            search_snapshot(real_snapshot, MenuQuery(q="ちゅろ"), cache)
+        assert text_bits.call_args.args[2] == cached
+
+        metrics = cache.metrics()
+        assert (metrics["hits"], metrics["refinements"], metrics["misses"]) == (0, 1, 1)
+        assert metrics["skipped_candidates"] == len(real_snapshot) - cached.bit_count()
+
+        search_snapshot(real_snapshot, MenuQuery(q="ちゅろ", sort="price", offset=10), cache)
+        metrics = cache.metrics()
+        assert metrics["hits"] == 1
+        assert metrics["hit_rate"] == 2 / 3
+
+    def test_filters_are_part_of_the_key(self, real_snapshot):
+        """Test cached results are not reused for other filters"""
+        cache = RefinementCache()
+        search_snapshot(real_snapshot, MenuQuery(q="チュロ", park="tdl"), cache)
+        search_snapshot(real_snapshot, MenuQuery(q="チュロス", park="tds"), cache)
+        assert cache.metrics()["misses"] == 2
+
+    def test_lru_eviction_and_snapshot_change(self, real_snapshot):
+        """Test the oldest entries are evicted and a new snapshot clears the cache"""
+        cache = RefinementCache(maxsize=2)
+        for q in ("カレー", "ピザ", "パン"):
+            search_snapshot(real_snapshot, MenuQuery(q=q), cache)
+        assert cache.metrics()["size"] == 2
+        search_snapshot(real_snapshot, MenuQuery(q="カレーパン"), cache)
+        assert cache.metrics()["refinements"] == 0
+
+        other = MenuSnapshot(menus=list(real_snapshot.menus))
+        assert search_snapshot(other, MenuQuery(q="パン"), cache) == search_snapshot(other, MenuQuery(q="パン"))
+        assert cache.metrics()["size"] == 1
@@ -0,0 +1,153 @@
+"""Tests for api/ranking.py and sort=relevance"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.data_loader import MenuDataLoader
+from api.normalization import normalize_search_text
+from api.query import MenuQuery, search_snapshot
+from api.ranking import RelevanceIndex, gram_counts
+from api.snapshot import MenuSnapshot, query_grams
+
+
+def make_menu(i, name, description="", tags=(), characters=()):
+    """Minimal menu for ranking tests"""
+    return {
+        "id": f"{i:04d}",
+        "name": name,
+        "description": description,
+        "tags": list(tags),
+        "characters": list(characters),
+    }
+
+
+@pytest.fixture(scope="module")
+def real_snapshot():
+    """Snapshot of the bundled dataset"""
+    snapshot = MenuDataLoader(use_binary_snapshot=False).load_snapshot()
+    if not snapshot.menus:
+        pytest.skip("Menu data file not found")
+    return snapshot
+
+
+class TestRelevanceIndex:
+    """Tests for the BM25F index"""
+
+    def test_gram_counts(self):
+        """Test unigrams and bigrams are counted with repetitions"""
+        assert gram_counts("aab") == {"a": 2, "b": 1, "aa": 1, "ab": 1}
+        assert gram_counts("") == {}
+
+    def test_name_outranks_description(self):
+        """Test a match in the name scores higher than the same match in the description"""
+        snapshot = MenuSnapshot(
+            menus=[
+                make_menu(0, "パン", "カレーの付け合わせ"),
+                make_menu(1, "カレー", "パンの付け合わせ"),
+                make_menu(2, "サラダ"),
+            ]
+        )
+        assert snapshot.rank_positions([0, 1], "かれー", 2) == [1, 0]
+
+    def test_shorter_fields_and_repeated_terms(self):
+        """Test length normalisation and term frequency affect the score"""
+        snapshot = MenuSnapshot(
+            menus=[
+                make_menu(0, "ミッキーのとても大きなスペシャルセットメニュー"),
+                make_menu(1, "ミッキーパン"),
+                make_menu(2, "ミッキー＆ミッキーパン"),
+                make_menu(3, "サラダ"),
+            ]
+        )
+        assert snapshot.rank_positions([0, 1, 2], "ミッキー", 3) == [2, 1, 0]
+
+    def test_tags_and_characters_contribute(self):
+        """Test tags and characters raise the score without being required to match"""
+        snapshot = MenuSnapshot(
+            menus=[
+                make_menu(0, "ドーナツ"),
+                make_menu(1, "ドーナツ", characters=["ミッキーマウス"]),
+                make_menu(2, "ドーナツ", tags=["ミッキー"]),
+            ]
+        )
+        scores = snapshot.relevance_index.scores({"ミッ", "ッキ"})
+        assert 0 not in scores and scores[1] > 0 and scores[2] > 0
+
+    def test_ties_keep_position_order_and_k(self):
+        """Test equal scores keep the input order and only k positions are returned"""
+        snapshot = MenuSnapshot(menus=[make_menu(i, "カレー") for i in range(5)])
+        assert snapshot.rank_positions([0, 1, 2, 3, 4], "カレー", 3) == [0, 1, 2]
+        assert snapshot.rank_positions([], "カレー", 3) == []
+
+    def test_scores_for_positions(self, real_snapshot):
+        """Test scoring only the given positions (binary search path) matches scoring whole postings"""
+        index = real_snapshot.relevance_index
+        terms = query_grams(normalize_search_text("ミッキー"))
+        everything = index.scores(terms)
+        for positions in ([0, 5, 17], sorted(everything)[::7], list(range(len(real_snapshot)))):
+            restricted = index.scores(terms, positions)
+            assert {pos: restricted.get(pos, 0) for pos in positions} == {
+                pos: everything.get(pos, 0) for pos in positions
+            }
+
+    def test_state_roundtrip(self, real_snapshot):
+        """Test to_state()/from_state() restores identical postings"""
+        index = real_snapshot.relevance_index
+        restored = RelevanceIndex.from_state(index.to_state())
+        assert restored.to_state() == index.to_state()
+        assert [(term, list(p), list(c)) for term, p, c in restored.items()] == [
+            (term, list(p), list(c)) for term, p, c in index.items()
+        ]
+
+    def test_flat_postings(self, real_snapshot):
+        """Test postings are slices of shared arrays (one pair of arrays for all terms)"""
+        index = real_snapshot.relevance_index
+        assert len(index.offsets) == len(index.terms) + 1
+        assert index.offsets[-1] == len(index.positions) == len(index.contributions)
+        positions, contributions = index.posting("ミ")
+        assert list(positions) == sorted(positions) and len(positions) == len(contributions)
+        assert positions.obj is index.positions
+        assert index.posting("存在しない語") is None
+
+    def test_not_built_when_warming(self):
+        """Test warm() leaves the opt-in relevance index for the first relevance query"""
+        snapshot = MenuSnapshot(menus=[make_menu(0, "カレー"), make_menu(1, "パン")]).warm()
+        assert "relevance_index" not in snapshot.__dict__
+        assert snapshot.rank_positions([0, 1], "パン", 1) == [1]
+        assert "relevance_index" in snapshot.__dict__
+
+
+class TestRelevanceSort:
+    """Tests for search_snapshot(sort="relevance")"""
+
+    @pytest.mark.parametrize("q", ["ミッキー", "かれー", "ピ", "チョコレート"])
+    def test_matches_full_ranking(self, real_snapshot, q):
+        """Test pages equal slices of the fully sorted ranking and the total is unchanged"""
+        _, total = search_snapshot(real_snapshot, MenuQuery(q=q, limit=100))
+        everything, _ = search_snapshot(real_snapshot, MenuQuery(q=q, limit=1000))
+        positions = [real_snapshot.id_index[menu["id"]] for menu in everything]
+        scores = real_snapshot.relevance_index.scores(query_grams(normalize_search_text(q)))
+        expected = sorted(positions, key=lambda pos: -scores.get(pos, 0))
+
+        for offset in (0, 3, 10):
+            page, page_total = search_snapshot(
+                real_snapshot, MenuQuery(q=q, sort="relevance", reverse=True, offset=offset, limit=5)
+            )
+            assert page_total == total
+            assert [real_snapshot.id_index[menu["id"]] for menu in page] == expected[offset : offset + 5]
+
+    def test_without_q_keeps_file_order(self, real_snapshot):
+        """Test sort=relevance without q returns menus in file order"""
+        assert search_snapshot(real_snapshot, MenuQuery(sort="relevance", park="tds")) == search_snapshot(
+            real_snapshot, MenuQuery(park="tds")
+        )
+
+    def test_api(self, real_snapshot):
+        """Test /menus accepts sort=relevance"""
+        from api import index
+
+        client = TestClient(index.app)
+        response = client.get("/api/menus", params={"q": "ミッキー", "sort": "relevance", "limit": 3})
+        assert response.status_code == 200
+        assert response.json()["data"][0]["name"].startswith("ミッキー")
+        assert client.get("/api/menus", params={"sort": "score"}).status_code == 422
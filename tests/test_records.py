@@ -0,0 +1,186 @@
+"""Tests for api/records.py"""
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.data_loader import MenuDataLoader
+from api.records import MenuRecord, MenuRestaurantRecord, PriceRecord, RestaurantRecord, as_dict, compact_menus
+from api.serialization import dump_json
+from api.snapshot import MenuSnapshot
+
+
+@pytest.fixture(scope="module")
+def real_menus():
+    """The shipped dataset as plain dicts"""
+    with open("data/menus.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TestRecords:
+    """Tests for slotted records"""
+
+    def test_mapping_interface(self):
+        """Test records behave like read-only dicts"""
+        menu = compact_menus([{"id": "0001", "name": "カレー", "price": {"amount": 500}, "tags": ["a", "b"]}])[0]
+
+        assert isinstance(menu, MenuRecord)
+        assert menu["name"] == "カレー"
+        assert menu.get("description") is None
+        assert menu.get("description", "") == ""
+        assert "price" in menu and "description" not in menu
+        assert list(menu) == ["id", "name", "price", "tags"]
+        assert len(menu) == 4
+        assert menu["price"]["amount"] == 500
+        assert menu["tags"] == ("a", "b")
+        with pytest.raises(KeyError):
+            menu["description"]
+        with pytest.raises(TypeError):
+            menu["name"] = "x"
+
+    def test_records_use_slots(self):
+        """Test records carry no per-instance __dict__"""
+        menu = compact_menus([{"id": "0001", "price": {"amount": 1}, "restaurants": [{"id": "1"}]}])[0]
+        for record in (menu, menu["price"], menu["restaurants"][0]):
+            assert not hasattr(record, "__dict__")
+
+    def test_unknown_keys_are_kept(self):
+        """Test keys outside the schema round-trip through the extra mapping"""
+        data = {"id": "0001", "price": {"amount": 1, "currency": "JPY"}, "custom": {"x": [1, 2]}}
+        menu = compact_menus([data])[0]
+        assert menu["custom"] == {"x": (1, 2)}
+        assert menu.get("get") is None
+        assert as_dict(menu) == data
+
+    def test_strings_and_records_are_shared(self):
+        """Test repeated strings, tuples, prices and restaurants are stored once"""
+        restaurant = {"id": "323", "name": "クリスタルパレス・レストラン", "park": "tdl", "availability": None}
+        menus = compact_menus(
+            [
+                {"id": "0001", "price": {"amount": 500}, "tags": ["a", "b"], "restaurants": [dict(restaurant)]},
+                {"id": "0002", "price": {"amount": 500}, "tags": ["a", "b"], "restaurants": [dict(restaurant)]},
+            ]
+        )
+        first, second = menus
+        assert first["price"] is second["price"]
+        assert isinstance(first["price"], PriceRecord)
+        assert first["tags"] is second["tags"]
+        assert first["restaurants"][0] is second["restaurants"][0]
+        assert isinstance(first["restaurants"][0], MenuRestaurantRecord)
+
+    def test_restaurants_are_normalised(self):
+        """Test menus reference one shared restaurant row and keep their own availability"""
+        restaurant = {"id": "323", "name": "R", "park": "tdl", "area": "A", "url": "u", "service_types": []}
+        menus = compact_menus(
+            [
+                {"id": "0001", "restaurants": [dict(restaurant, availability=None)]},
+                {"id": "0002", "restaurants": [dict(restaurant, availability={"start_date": "2025-01-01"})]},
+                {"id": "0003", "restaurants": [dict(restaurant)]},
+            ]
+        )
+        edges = [menu["restaurants"][0] for menu in menus]
+        assert isinstance(edges[0].restaurant, RestaurantRecord)
+        assert edges[0].restaurant is edges[1].restaurant is edges[2].restaurant
+        assert edges[0]["availability"] is None
+        assert edges[1]["availability"]["start_date"] == "2025-01-01"
+        assert "availability" not in edges[2]
+        # キーの順序は元のレストラン情報と同じ
+        assert list(edges[1]) == ["id", "name", "park", "area", "url", "availability", "service_types"]
+        assert edges[1]["name"] == "R"
+        assert as_dict(edges[2]) == restaurant
+
+    def test_json_shape_matches_source(self, real_menus):
+        """Test every shipped menu converts back to byte-identical JSON"""
+        for record, menu in zip(compact_menus(real_menus), real_menus):
+            assert dump_json(as_dict(record)) == dump_json(menu)
+
+    def test_as_dict_passes_dicts_through(self):
+        """Test plain dicts are returned unchanged"""
+        menu = {"id": "0001"}
+        assert as_dict(menu) is menu
+
+
+class TestCompactSnapshot:
+    """Tests for snapshots holding compact records"""
+
+    def test_indexes_match_dict_snapshot(self, real_menus):
+        """Test indexes built from records equal those built from dicts"""
+        plain = MenuSnapshot(menus=real_menus).warm()
+        compact = MenuSnapshot(menus=compact_menus(real_menus)).warm()
+
+        assert compact.postings == plain.postings
+        assert compact.availability == plain.availability
+        assert compact.columns.to_state() == plain.columns.to_state()
+        assert compact.all_restaurants == plain.all_restaurants
+        assert compact.get_stats() == plain.get_stats()
+        assert compact.grouped_tags("tds") == plain.grouped_tags("tds")
+
+    def test_outputs_are_dicts(self, real_menus):
+        """Test records are converted to the API's JSON shape on the way out"""
+        snapshot = MenuSnapshot(menus=compact_menus(real_menus))
+        menu_id = real_menus[10]["id"]
+
+        assert snapshot.get_menu(menu_id) == real_menus[10]
+        assert type(snapshot.get_menu(menu_id)) is dict
+        assert snapshot.records([3, 1]) == [real_menus[3], real_menus[1]]
+        assert snapshot.select(0b101) == [real_menus[0], real_menus[2]]
+        assert snapshot.get_detail_body(menu_id) == dump_json({"success": True, "data": real_menus[10]})
+
+    def test_with_menus_keeps_indexes(self, real_menus):
+        """Test with_menus reuses built indexes instead of rebuilding them"""
+        plain = MenuSnapshot(menus=real_menus, version="v1").warm()
+        compact = plain.with_menus(compact_menus(real_menus))
+        assert compact.version == "v1"
+        assert compact.postings is plain.postings
+
+
+class TestLoaderCompactRecords:
+    """Tests for MenuDataLoader(compact_records=True)"""
+
+    def test_loader_holds_records(self, real_menus):
+        """Test the loader keeps records and serves dicts"""
+        loader = MenuDataLoader(compact_records=True, use_binary_snapshot=False)
+        assert isinstance(loader.load_menus()[0], MenuRecord)
+        assert loader.get_menu_by_id(real_menus[0]["id"]) == real_menus[0]
+
+    def test_lazy_records_take_precedence(self, tmp_path):
+        """Test compaction is skipped for memory-mapped records"""
+        from api.binary_snapshot import MappedRecords, binary_snapshot_path, write_binary_snapshot
+
+        path = Path("data/records_test.json")
+        path.write_text(json.dumps([{"id": "0001", "name": "x"}]), encoding="utf-8")
+        try:
+            source = MenuDataLoader(data_path=str(path), use_binary_snapshot=False).load_snapshot()
+            write_binary_snapshot(source, binary_snapshot_path(path.resolve()))
+            loader = MenuDataLoader(data_path=str(path), lazy_records=True, compact_records=True)
+            assert isinstance(loader.load_snapshot().menus, MappedRecords)
+        finally:
+            for p in (path, binary_snapshot_path(path)):
+                if p.exists():
+                    p.unlink()
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/api/menus?limit=100",
+            "/api/menus?q=ミッキー&sort=price&order=desc",
+            "/api/menus?park=tds&sort=name&page=2",
+            "/api/menus/0012",
+            "/api/restaurants?park=tdl",
+            "/api/stats",
+        ],
+    )
+    def test_api_responses_match(self, url):
+        """Test API responses are byte-identical with compact records"""
+        from api import index
+
+        client = TestClient(index.app)
+        responses = []
+        for compact in (False, True):
+            with patch.object(index, "loader", MenuDataLoader(compact_records=compact, use_binary_snapshot=False)):
+                response = client.get(url)
+                responses.append((response.status_code, response.content))
+        assert responses[0] == responses[1]
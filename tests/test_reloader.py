@@ -0,0 +1,230 @@
+"""Tests for api/reloader.py and background snapshot reloading"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.data_loader import MenuDataLoader
+from api.reloader import SnapshotReloader
+from api.snapshot import MenuSnapshot
+
+
+def wait_for(predicate, timeout=5.0):
+    """Poll until predicate() is true or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def write_version(path, version, atomic=True):
+    """Write a dataset whose size and names both encode the version number"""
+    menus = [
+        {
+            "id": f"{i:04d}",
+            "name": f"v{version}",
+            "price": {"amount": 100 + i},
+            "tags": ["カレー"] if i % 2 else ["ピザ"],
+            "category": "main_dish",
+            "restaurants": [{"id": "1", "name": "R", "park": "tdl", "area": "A", "availability": None}],
+        }
+        for i in range(10 + version)
+    ]
+    content = json.dumps(menus, ensure_ascii=False, indent=2)
+    if atomic:
+        tmp = Path(f"{path}.tmp")
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, path)
+    else:
+        Path(path).write_text(content, encoding="utf-8")
+
+
+@pytest.fixture
+def make_loader():
+    """Create background-reloading loaders and stop their worker threads afterwards"""
+    loaders = []
+
+    def factory(path, **kwargs):
+        loader = MenuDataLoader(data_path=str(path), background_reload=True, **kwargs)
+        loaders.append(loader)
+        return loader
+
+    yield factory
+    for loader in loaders:
+        loader.close()
+
+
+@pytest.fixture
+def data_file():
+    """Temporary data file inside data/"""
+    path = Path("data/reload_test.json")
+    write_version(path, 0)
+    yield path
+    for p in (path, Path(f"{path}.tmp")):
+        if p.exists():
+            p.unlink()
+
+
+class TestSnapshotReloader:
+    """Tests for SnapshotReloader"""
+
+    def test_concurrent_requests_collapse(self):
+        """Test triggers arriving during a rebuild collapse into one rebuild"""
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def rebuild():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+
+        reloader = SnapshotReloader(rebuild)
+        reloader.request()
+        assert started.wait(5)
+
+        for _ in range(50):
+            reloader.request()
+        release.set()
+
+        assert wait_for(lambda: reloader.rebuild_count == 2)
+        time.sleep(0.05)
+        reloader.stop()
+        assert len(calls) == 2
+
+    def test_polling_triggers_rebuild(self):
+        """Test the worker rebuilds periodically when polling is enabled"""
+        calls = []
+        reloader = SnapshotReloader(lambda: calls.append(1), poll_interval=0.01)
+        reloader.start()
+        assert wait_for(lambda: len(calls) >= 3)
+        reloader.stop()
+        stopped_at = len(calls)
+        time.sleep(0.05)
+        assert len(calls) == stopped_at
+
+    def test_rebuild_error_keeps_worker_alive(self, capsys):
+        """Test a failing rebuild does not stop the worker"""
+        calls = []
+
+        def rebuild():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+
+        reloader = SnapshotReloader(rebuild)
+        reloader.request()
+        assert wait_for(lambda: len(calls) == 1)
+        reloader.request()
+        assert wait_for(lambda: reloader.rebuild_count == 1)
+        reloader.stop()
+
+
+class TestBackgroundReload:
+    """Tests for MenuDataLoader(background_reload=True)"""
+
+    def test_serves_previous_snapshot_until_swap(self, data_file, make_loader):
+        """Test a changed file is rebuilt off the request path and swapped in"""
+        loader = make_loader(data_file)
+        first = loader.load_snapshot()
+        assert len(first.menus) == 10
+
+        write_version(data_file, 1)
+        # 要求したスレッドは再構築を待たずに現在のスナップショットを受け取る
+        assert loader.load_snapshot() in (first, loader._snapshot)
+        assert wait_for(lambda: len(loader.load_snapshot().menus) == 11)
+
+        new = loader.load_snapshot()
+        assert new is not first
+        # 差し替え前にインデックスが構築済み
+        assert "postings" in vars(new)
+        assert "availability" in vars(new)
+
+    def test_invalid_json_keeps_previous_snapshot(self, data_file, make_loader):
+        """Test an unreadable file does not replace the current snapshot"""
+        loader = make_loader(data_file)
+        first = loader.load_snapshot()
+
+        data_file.write_text('[{"id": "0001"', encoding="utf-8")
+        loader.load_snapshot()
+        assert wait_for(lambda: loader._failed_identity is not None)
+        assert loader.load_snapshot() is first
+
+        write_version(data_file, 2)
+        assert wait_for(lambda: len(loader.load_snapshot().menus) == 12)
+
+    def test_polling_picks_up_changes_without_requests(self, data_file, make_loader):
+        """Test polling rebuilds the snapshot without waiting for a request"""
+        loader = make_loader(data_file, poll_interval=0.01)
+        loader.load_snapshot()
+
+        write_version(data_file, 3)
+        assert wait_for(lambda: loader._snapshot is not None and len(loader._snapshot.menus) == 13)
+
+
+class TestReloadStress:
+    """Stress test: hammer /menus while menus.json is rewritten repeatedly"""
+
+    def test_requests_always_see_a_complete_snapshot(self, data_file, make_loader):
+        """Test every response is internally consistent while the file keeps changing"""
+        from api.index import app
+
+        loader = make_loader(data_file)
+        loader.load_snapshot()
+        errors = []
+        responses = []
+        stop = threading.Event()
+        builds = []
+        real_snapshot_class = MenuSnapshot
+
+        def counting_snapshot(*args, **kwargs):
+            builds.append(1)
+            return real_snapshot_class(*args, **kwargs)
+
+        def hammer():
+            client = TestClient(app)
+            while not stop.is_set():
+                response = client.get("/api/menus?limit=100&tags=カレー,ピザ&park=tdl")
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+                    continue
+                body = response.json()
+                names = {m["name"] for m in body["data"]}
+                # 1レスポンス内のデータとインデックスは同じバージョンでなければならない
+                if len(names) != 1:
+                    errors.append(names)
+                    continue
+                version = int(names.pop()[1:])
+                if body["meta"]["total"] != 10 + version or len(body["data"]) != 10 + version:
+                    errors.append((version, body["meta"]["total"], len(body["data"])))
+                responses.append(version)
+
+        writes = 30
+        with patch("api.index.loader", loader), patch("api.data_loader.MenuSnapshot", side_effect=counting_snapshot):
+            threads = [threading.Thread(target=hammer) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            try:
+                for version in range(1, writes + 1):
+                    # アトミックな置き換えとその場での上書きを交互に行う
+                    write_version(data_file, version, atomic=version % 2 == 0)
+                    time.sleep(0.01)
+                assert wait_for(lambda: len(loader.load_snapshot().menus) == 10 + writes)
+            finally:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+
+        assert errors == []
+        assert responses
+        assert max(responses) == writes
+        # 再構築はまとめられるため、構築回数は書き込み回数以下に収まる
+        assert len(builds) <= writes
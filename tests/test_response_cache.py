@@ -0,0 +1,113 @@
+"""Tests for api/response_cache.py and the /menus response cache"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.data_loader import MenuDataLoader
+from api.query import MenuQuery
+from api.response_cache import ResponseCache
+from api.serialization import dump_json
+from api.snapshot import MenuSnapshot
+
+
+@pytest.fixture
+def snapshot():
+    """Small versioned snapshot"""
+    return MenuSnapshot(menus=[{"id": "0001"}], version="v1")
+
+
+class TestResponseCache:
+    """Tests for the LRU/TTL cache"""
+
+    def test_hit_and_miss(self, snapshot):
+        """Test stored bodies are returned and counted"""
+        cache = ResponseCache()
+        assert cache.get(snapshot, MenuQuery()) is None
+        cache.put(snapshot, MenuQuery(), b"body")
+        assert cache.get(snapshot, MenuQuery()) == b"body"
+        metrics = cache.metrics()
+        assert (metrics["hits"], metrics["misses"], metrics["size"], metrics["bytes"]) == (1, 1, 1, 4)
+        assert metrics["hit_rate"] == 0.5
+
+    def test_size_and_memory_eviction(self, snapshot):
+        """Test least recently used bodies are evicted by count and total bytes"""
+        cache = ResponseCache(maxsize=2, max_bytes=10)
+        cache.put(snapshot, "a", b"1234")
+        cache.put(snapshot, "b", b"1234")
+        cache.get(snapshot, "a")
+        cache.put(snapshot, "c", b"12")
+        assert cache.get(snapshot, "b") is None
+        assert cache.get(snapshot, "a") == b"1234"
+
+        cache.put(snapshot, "d", b"12345678")
+        assert cache.get(snapshot, "a") is None and cache.get(snapshot, "c") is None
+        assert cache.metrics()["bytes"] == 8
+        assert cache.metrics()["evictions"] == 3
+
+        cache.put(snapshot, "e", b"x" * 11)
+        assert cache.get(snapshot, "e") is None
+        assert cache.get(snapshot, "d") == b"12345678"
+
+    def test_ttl(self, snapshot):
+        """Test expired bodies are dropped"""
+        cache = ResponseCache(ttl=10)
+        with patch("api.response_cache.time.monotonic", return_value=100.0):
+            cache.put(snapshot, "a", b"1")
+        with patch("api.response_cache.time.monotonic", return_value=109.0):
+            assert cache.get(snapshot, "a") == b"1"
+        with patch("api.response_cache.time.monotonic", return_value=110.0):
+            assert cache.get(snapshot, "a") is None
+        assert cache.metrics()["expirations"] == 1
+        assert cache.metrics()["size"] == 0
+
+    def test_new_snapshot_clears(self, snapshot):
+        """Test a different snapshot (even with the same version) does not see old bodies"""
+        cache = ResponseCache()
+        cache.put(snapshot, "a", b"1")
+        other = MenuSnapshot(menus=[{"id": "0002"}], version="v1")
+        assert cache.get(other, "a") is None
+        assert cache.metrics()["size"] == 0
+
+    def test_disabled(self, snapshot):
+        """Test maxsize=0 disables caching"""
+        cache = ResponseCache(maxsize=0)
+        cache.put(snapshot, "a", b"1")
+        assert cache.get(snapshot, "a") is None
+
+
+class TestMenusResponseCache:
+    """Tests for the cache in GET /api/menus"""
+
+    @pytest.fixture
+    def client(self):
+        """Client with a real loader and an empty cache"""
+        from api import index
+
+        with patch.object(index, "loader", MenuDataLoader(use_binary_snapshot=False)), patch.object(
+            index, "response_cache", ResponseCache()
+        ):
+            yield TestClient(index.app), index
+
+    def test_equivalent_requests_hit(self, client):
+        """Test reordered tags and spelling variants are served from the cache with identical bytes"""
+        client, index = client
+        first = client.get("/api/menus?tags=スイーツ,ミッキー&q=ちょこ&park=tdl")
+        with patch.object(index.loader, "search_menu_json", side_effect=AssertionError("not cached")):
+            second = client.get("/api/menus?tags= ミッキー , スイーツ&q=ﾁｮｺ&park=tdl")
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert index.response_cache.metrics()["hits"] == 1
+
+    def test_body_matches_response_model(self, client):
+        """Test the cached body is byte-identical to rendering MenuListResponse"""
+        client, index = client
+        response = client.get("/api/menus?park=tds&sort=price&page=2&limit=7")
+        menus, total = index.loader.search_menus(MenuQuery(park="tds", sort="price", offset=7, limit=7))
+        meta = {"total": total, "page": 2, "limit": 7, "pages": -(-total // 7)}
+        model = index.MenuListResponse(data=menus, meta={**meta, "next_cursor": response.json()["meta"]["next_cursor"]})
+        assert response.content == dump_json(model.model_dump())
+        assert response.headers["content-type"] == "application/json"
+        assert json.loads(response.content)["meta"]["page"] == 2
@@ -6,6 +6,8 @@ OWASP Top 10およびCWE Top 25に基づくセキュリティテスト
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch
+from api.query import search_positions, search_snapshot
+from api.snapshot import MenuSnapshot
 
 
 @pytest.fixture
@@ -13,6 +15,17 @@ def mock_data_loader_security():
     """セキュリティテスト用のモックDataLoader"""
     mock = Mock()
     mock.load_menus.return_value = []
+    mock.load_snapshot.side_effect = lambda *args, **kwargs: MenuSnapshot(menus=mock.load_menus())
+    mock.search_menus.side_effect = lambda query: search_snapshot(mock.load_snapshot(), query)
+
+    def search_menu_json(query):
+        snapshot = mock.load_snapshot()
+        positions, total = search_positions(snapshot, query)
+        last = int(positions[-1]) if len(positions) else None
+        last_key = (snapshot.sort_value(last, query.sort, query.q), last) if last is not None else None
+        return snapshot.menu_json(positions), total, last_key
+
+    mock.search_menu_json.side_effect = search_menu_json
     mock.get_menu_by_id.return_value = None
     mock.filter_by_availability.return_value = []
     mock.get_all_restaurants.return_value = []
@@ -0,0 +1,387 @@
+"""Tests for api/snapshot.py"""
+
+from datetime import date, timedelta
+
+import pytest
+from api.bitmap import to_positions
+from api.data_loader import MenuDataLoader
+from api.normalization import normalize_search_text
+from api.snapshot import MenuSnapshot
+
+
+@pytest.fixture
+def indexed_menus():
+    """Menus covering every indexed field"""
+    return [
+        {
+            "id": "0001",
+            "tags": ["カレー", "ワールドバザール"],
+            "category": "main_dish",
+            "characters": ["ミッキーマウス"],
+            "restaurants": [
+                {"id": "316", "name": "スウィートハート・カフェ", "park": "tdl", "area": "ワールドバザール"},
+                {"id": "317", "name": "センターストリート・コーヒーハウス", "park": "tdl", "area": "ワールドバザール"},
+            ],
+        },
+        {
+            "id": "0002",
+            "tags": ["ピザ"],
+            "category": "main_dish",
+            "characters": [],
+            "restaurants": [
+                {
+                    "id": "403",
+                    "name": "ザンビーニ・ブラザーズ・リストランテ",
+                    "park": "tds",
+                    "area": "メディテレーニアンハーバー",
+                }
+            ],
+        },
+        {"id": "0003", "tags": ["カレー"], "category": "sweets", "characters": ["Duffy"], "restaurants": []},
+    ]
+
+
+@pytest.fixture
+def real_snapshot():
+    """Snapshot of the bundled dataset"""
+    snapshot = MenuDataLoader().load_snapshot()
+    if not snapshot.menus:
+        pytest.skip("Menu data file not found")
+    return snapshot
+
+
+class TestPostingLists:
+    """Tests for per-snapshot posting lists"""
+
+    def test_postings_by_field(self, indexed_menus):
+        """Test each field maps values to menu positions"""
+        postings = MenuSnapshot(menus=indexed_menus).postings
+        assert to_positions(postings.tags["カレー"]) == [0, 2]
+        assert to_positions(postings.categories["main_dish"]) == [0, 1]
+        assert to_positions(postings.parks["tdl"]) == [0]
+        assert to_positions(postings.areas["ワールドバザール"]) == [0]
+        assert to_positions(postings.restaurant_ids["403"]) == [1]
+        assert to_positions(postings.restaurant_names["スウィートハート・カフェ"]) == [0]
+        assert to_positions(postings.characters["Duffy"]) == [2]
+
+    def test_postings_built_once(self, indexed_menus):
+        """Test posting lists are cached on the snapshot"""
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        assert snapshot.postings is snapshot.postings
+
+    def test_union_and_substring_bits(self, indexed_menus):
+        """Test OR over values and case-insensitive substring matching"""
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        assert to_positions(snapshot.union_bits(snapshot.postings.tags, ["ピザ", "カレー", "存在しない"])) == [0, 1, 2]
+        assert to_positions(snapshot.substring_bits("areas", "ハーバー")) == [1]
+        assert to_positions(snapshot.substring_bits("characters", "duf")) == [2]
+        assert snapshot.substring_bits("restaurant_names", "存在しない") == 0
+        # 正規化したキーで比較する（ひらがな・半角カタカナ・全角英字）
+        assert to_positions(snapshot.substring_bits("areas", "はーばー")) == [1]
+        assert to_positions(snapshot.substring_bits("restaurant_names", "ｶﾌｪ")) == [0]
+        assert to_positions(snapshot.substring_bits("characters", "ＤＵＦＦＹ")) == [2]
+
+    def test_select_keeps_file_order(self, indexed_menus):
+        """Test selecting a bitmap returns menus in file order"""
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        assert [m["id"] for m in snapshot.select(snapshot.all_bits)] == ["0001", "0002", "0003"]
+
+    @pytest.mark.parametrize("needle", ["ランド", "ハーバー", "バザール", "ポート"])
+    def test_area_matches_linear_scan(self, real_snapshot, needle):
+        """Test area postings agree with the linear restaurant scan"""
+        expected = [
+            m["id"] for m in real_snapshot.menus if any(needle.lower() in r["area"].lower() for r in m["restaurants"])
+        ]
+        assert [m["id"] for m in real_snapshot.select(real_snapshot.substring_bits("areas", needle))] == expected
+
+    @pytest.mark.parametrize("park", ["tdl", "tds"])
+    def test_park_matches_linear_scan(self, real_snapshot, park):
+        """Test park postings agree with the linear restaurant scan"""
+        expected = [m["id"] for m in real_snapshot.menus if any(r["park"] == park for r in m["restaurants"])]
+        assert [m["id"] for m in real_snapshot.select(real_snapshot.postings.parks[park])] == expected
+
+
+class TestIdIndex:
+    """Tests for the id index and pre-serialized detail bodies"""
+
+    def test_get_menu(self, indexed_menus):
+        """Test O(1) lookup by id"""
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        assert snapshot.get_menu("0002") is indexed_menus[1]
+        assert snapshot.get_menu("9999") is None
+
+    def test_duplicate_id_returns_first(self, indexed_menus):
+        """Test the first menu wins when ids are duplicated"""
+        duplicate = dict(indexed_menus[0], tags=[])
+        snapshot = MenuSnapshot(menus=indexed_menus + [duplicate])
+        assert snapshot.get_menu("0001") is indexed_menus[0]
+
+    def test_detail_body_serialized_once(self, indexed_menus):
+        """Test the detail body is rendered once and reused"""
+        import json
+
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        body = snapshot.get_detail_body("0001")
+        assert json.loads(body) == {"success": True, "data": indexed_menus[0]}
+        assert snapshot.get_detail_body("0001") is body
+        assert snapshot.get_detail_body("9999") is None
+
+    def test_menu_json_rendered_once(self, indexed_menus):
+        """Test per-menu bytes match dump_json and are reused across calls"""
+        from api.serialization import dump_json
+
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        first = snapshot.menu_json([2, 0])
+        assert first == [dump_json(indexed_menus[2]), dump_json(indexed_menus[0])]
+        assert snapshot.menu_json([0])[0] is first[1]
+        assert snapshot.get_detail_body("0001") == b'{"success":true,"data":' + first[1] + b"}"
+
+    def test_response_body_memoized(self, indexed_menus):
+        """Test list bodies are built once per key and unknown parks are not cached"""
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        calls = []
+        body = snapshot.response_body("tags", lambda: calls.append(1) or {"data": snapshot.all_tags})
+        assert snapshot.response_body("tags", lambda: calls.append(1)) is body
+        assert len(calls) == 1
+
+        assert snapshot.grouped_tags_body("TDL") is snapshot.grouped_tags_body("tdl")
+        assert snapshot.grouped_tags_body("unknown") == b"{}"
+        assert ("tags/grouped", "unknown") not in snapshot._response_bodies
+
+
+class TestAvailabilityIndex:
+    """Tests for the availability interval index"""
+
+    @staticmethod
+    def _menu(*availabilities):
+        return {
+            "id": "0001",
+            "restaurants": [{"id": str(i), "availability": a} for i, a in enumerate(availabilities)],
+        }
+
+    def test_interval_semantics(self):
+        """Test bounds, open ends, invalid dates and missing periods"""
+        menus = [
+            self._menu({"start_date": "2025-01-01", "end_date": "2025-01-31"}),
+            self._menu({"start_date": "2025-01-15"}),
+            self._menu({"end_date": "2025-01-10"}),
+            self._menu(None),
+            self._menu({"start_date": "invalid", "end_date": "2025-01-20"}),
+            {"id": "0006", "restaurants": []},
+            self._menu({"start_date": "2025-03-01", "end_date": "2025-03-31"}, {"start_date": "2025-01-05"}),
+        ]
+        snapshot = MenuSnapshot(menus=menus)
+
+        assert to_positions(snapshot.available_bits(date(2024, 12, 31))) == [2, 3, 4]
+        assert to_positions(snapshot.available_bits(date(2025, 1, 1))) == [0, 2, 3, 4]
+        assert to_positions(snapshot.available_bits(date(2025, 1, 15))) == [0, 1, 3, 4, 6]
+        assert to_positions(snapshot.available_bits(date(2025, 1, 31))) == [0, 1, 3, 6]
+        assert to_positions(snapshot.available_bits(date(2025, 2, 1))) == [1, 3, 6]
+
+    def test_matches_linear_filter(self, real_snapshot):
+        """Test the index agrees with filter_by_availability on every boundary date"""
+        loader = MenuDataLoader()
+        dates = {date.fromordinal(o) for o in real_snapshot.availability.boundaries}
+        dates |= {date.fromordinal(o - 1) for o in real_snapshot.availability.boundaries}
+        dates |= {date(2020, 1, 1), date(2030, 1, 1)}
+        for check_date in sorted(dates):
+            expected = loader.filter_by_availability(real_snapshot.menus, check_date)
+            assert real_snapshot.select(real_snapshot.available_bits(check_date)) == expected, check_date
+
+    def test_today_recomputed_at_jst_midnight(self):
+        """Test the cached bitmap for today follows the JST date"""
+        from unittest.mock import patch
+
+        menus = [self._menu({"end_date": "2025-01-10"}), self._menu({"start_date": "2025-01-11"})]
+        snapshot = MenuSnapshot(menus=menus)
+
+        with patch("api.snapshot.today_jst", return_value=date(2025, 1, 10)):
+            assert to_positions(snapshot.available_bits()) == [0]
+            assert to_positions(snapshot.available_bits()) == [0]
+        with patch("api.snapshot.today_jst", return_value=date(2025, 1, 11)):
+            assert to_positions(snapshot.available_bits()) == [1]
+
+    def test_today_jst(self):
+        """Test today is computed in Asia/Tokyo"""
+        from datetime import datetime, timezone
+        from api.snapshot import today_jst
+
+        assert today_jst() == (datetime.now(timezone.utc) + timedelta(hours=9)).date()
+
+
+def legacy_grouped_tags(menus, park=None):
+    """Reference implementation: the original per-request /tags/grouped scan"""
+    from api.constants import CATEGORY_LABELS, TAG_CATEGORIES
+
+    if park:
+        menus = [m for m in menus if any(r.get("park", "").lower() == park.lower() for r in m.get("restaurants", []))]
+    groups = {category: set() for category in TAG_CATEGORIES}
+    groups["area"] = set()
+    groups["restaurant"] = set()
+    for menu in menus:
+        for tag in menu.get("tags", []):
+            category = next((c for c, tags in TAG_CATEGORIES.items() if tag in tags), None)
+            if category is None and any(tag == r.get("area") for r in menu.get("restaurants", [])):
+                category = "area"
+            elif category is None and any(tag == r.get("name") for r in menu.get("restaurants", [])):
+                category = "restaurant"
+            if category is not None:
+                groups[category].add(tag)
+    return {c: {"label": CATEGORY_LABELS.get(c, c), "tags": sorted(t)} for c, t in groups.items() if t}
+
+
+class TestAggregates:
+    """Tests for memoised per-snapshot aggregates"""
+
+    @pytest.mark.parametrize("park", [None, "tdl", "TDS", "unknown"])
+    def test_grouped_tags_match_legacy(self, real_snapshot, park):
+        """Test grouped tags (overall and per park) match the original scan"""
+        assert real_snapshot.grouped_tags(park) == legacy_grouped_tags(real_snapshot.menus, park)
+
+    def test_grouped_tags_memoised_per_park(self, indexed_menus):
+        """Test grouped tags are computed once per park and unknown parks are not cached"""
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        assert snapshot.grouped_tags("tdl") is snapshot.grouped_tags("TDL")
+        assert snapshot.grouped_tags() is snapshot.grouped_tags(None)
+        assert snapshot.grouped_tags("unknown") == {}
+        assert "unknown" not in snapshot._grouped_tags_cache
+
+    def test_lists_and_counts(self, indexed_menus):
+        """Test tags, restaurants and category counts"""
+        snapshot = MenuSnapshot(menus=indexed_menus)
+        assert snapshot.all_tags == ["カレー", "ピザ", "ワールドバザール"]
+        assert [r["id"] for r in snapshot.all_restaurants] == ["316", "317", "403"]
+        assert snapshot.category_counts == {"main_dish": 2, "sweets": 1}
+        assert snapshot.all_tags is snapshot.all_tags
+
+    def test_stats(self, indexed_menus):
+        """Test stats reuse the memoised aggregates"""
+        menus = [
+            dict(m, price={"amount": 100 * (i + 1)}, scraped_at=f"2025-01-0{i + 1}")
+            for i, m in enumerate(indexed_menus)
+        ]
+        stats = MenuSnapshot(menus=menus).get_stats(date(2025, 1, 1))
+        assert stats == {
+            "total_menus": 3,
+            "available_menus": 2,
+            "total_tags": 3,
+            "total_categories": 0,
+            "total_restaurants": 3,
+            "min_price": 100,
+            "max_price": 300,
+            "avg_price": 200,
+            "last_updated": "2025-01-03",
+        }
+
+
+class TestColumns:
+    """Tests for search/sort columns"""
+
+    @pytest.fixture
+    def snapshot(self):
+        return MenuSnapshot(
+            menus=[
+                {"id": "0001", "name": "Mickey Curry", "price": {"amount": 1200}, "scraped_at": "2025-01-02"},
+                {"id": "0002", "name": "ピザ", "description": "mickey shaped", "price": {"amount": 800}},
+                {"id": "0003", "name": "Churros", "price": {"amount": 500}, "scraped_at": "2025-01-01"},
+                {"id": "0004", "name": "Abc", "price": {"amount": 800}, "scraped_at": "2025-01-03"},
+            ]
+        )
+
+    def test_columns(self, snapshot):
+        """Test columns hold per-position values"""
+        columns = snapshot.columns
+        assert list(columns.prices) == [1200, 800, 500, 800]
+        assert columns.names[0] == "Mickey Curry"
+        assert [columns.scraped_at_values[rank] for rank in columns.scraped_at_ranks] == [
+            "2025-01-02",
+            "",
+            "2025-01-01",
+            "2025-01-03",
+        ]
+
+    def test_match_text_checks_name_then_description(self, snapshot):
+        """Test search matches names and descriptions case-insensitively"""
+        assert snapshot.match_text([0, 1, 2, 3], "MICKEY") == [0, 1]
+        assert snapshot.match_text([2, 3], "mickey") == []
+
+    def test_sort_positions_is_stable(self, snapshot):
+        """Test sorting matches sorted() over records, including ties"""
+        positions = [0, 1, 2, 3]
+        for key, record_key in (
+            ("price", lambda m: m["price"]["amount"]),
+            ("name", lambda m: m["name"]),
+            ("scraped_at", lambda m: m.get("scraped_at", "")),
+        ):
+            for reverse in (False, True):
+                expected = sorted(snapshot.menus, key=record_key, reverse=reverse)
+                result = snapshot.records(snapshot.sort_positions(positions, key, reverse=reverse))
+                assert result == expected, (key, reverse)
+
+
+class TestTextIndex:
+    """Tests for the n-gram index behind the q search parameter"""
+
+    @staticmethod
+    def linear_scan(menus, q):
+        """A normalised substring scan over every menu"""
+        q_key = normalize_search_text(q)
+        return [
+            pos
+            for pos, menu in enumerate(menus)
+            if q_key in normalize_search_text(menu.get("name", ""))
+            or q_key in normalize_search_text(menu.get("description", ""))
+        ]
+
+    def test_matches_linear_scan(self, real_snapshot):
+        """Test results are identical to a substring scan for 1, 2 and longer queries"""
+        menus = real_snapshot.menus
+        queries = [
+            "ー",
+            "カ",
+            "ミッキー",
+            "カレー",
+            "MICKEY",
+            "ミニー&",
+            "チョコレートの",
+            "存在しない文字列",
+            "ザ・",
+            "ﾐｯｷｰ",
+            "ちょこ",
+        ]
+        for menu in menus[::50]:
+            name = menu["name"]
+            description = menu.get("description", "")
+            queries += [name[:1], name[1:3], name[-4:], description[5:12], name[-2:] + description[:2]]
+        for q in queries:
+            if q:
+                assert to_positions(real_snapshot.text_bits(q)) == self.linear_scan(menus, q), q
+
+    def test_candidates_are_verified(self):
+        """Test grams spread across name and description do not produce false positives"""
+        snapshot = MenuSnapshot(
+            menus=[
+                {"name": "abc", "description": "cde"},
+                {"name": "ab", "description": "bc"},
+                {"name": "x", "description": "ABCD"},
+            ]
+        )
+        assert to_positions(snapshot.text_bits("abc")) == [0, 2]
+        assert to_positions(snapshot.text_bits("cd")) == [0, 2]
+        assert to_positions(snapshot.text_bits("abc", bits=0b011)) == [0]
+        assert snapshot.match_text([2, 1, 0], "ABC") == [2, 0]
+
+    def test_kana_and_width_variants_match(self):
+        """Test hiragana, half-width katakana and long-vowel variants find the same menus"""
+        snapshot = MenuSnapshot(
+            menus=[
+                {"name": "ピザ", "description": ""},
+                {"name": "ミッキーのカレー", "description": ""},
+                {"name": "ドリンク", "description": "ＣＯＦＦＥＥ"},
+            ]
+        )
+        for q in ("ぴざ", "ﾋﾟｻﾞ", "ピザ"):
+            assert to_positions(snapshot.text_bits(q)) == [0], q
+        for q in ("みっきー", "ﾐｯｷｰ", "ミッキ-", "ミッキーー"):
+            assert to_positions(snapshot.text_bits(q)) == [1], q
+        assert to_positions(snapshot.text_bits("coffee")) == [2]
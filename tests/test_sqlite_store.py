@@ -0,0 +1,307 @@
+"""Tests for api/sqlite_store.py (conformance with the in-memory backend)"""
+
+import gc
+import json
+import shutil
+import sqlite3
+from datetime import date
+from itertools import product
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.data_loader import MenuDataLoader
+from api.query import MenuQuery, search_positions, search_snapshot
+from api.snapshot import MenuSnapshot
+from api.sqlite_store import SQLiteMenuStore, sqlite_store_path, write_sqlite_store
+
+
+def make_menus():
+    """Small dataset covering ties, missing values, mixed case and availability edge cases"""
+    return [
+        {
+            "id": f"{i:04d}",
+            "name": ["Mickey Curry", "ミッキーパン", "PIZZA", "ピザ", "カレー"][i % 5] + f" {i % 3}",
+            "description": ['Spicy "HOT" curry', "ふわふわ", "", "チーズたっぷり", "Mickey シェイプ"][i % 4],
+            "price": {"amount": [500, 500, 800, None][i % 4]} if i % 7 else None,
+            "tags": ["カレー", "ミッキー", "カレー"] if i % 2 else ["ピザ", "新作"],
+            "category": [None, "main_dish", "dessert", "other"][i % 4],
+            "characters": ["ミッキーマウス", "Minnie Mouse"] if i % 3 == 0 else [],
+            "scraped_at": f"2026-01-{i % 5 + 1:02d}T00:00:00",
+            "restaurants": [
+                {
+                    "id": str(i % 4),
+                    "name": f"Restaurant {i % 4}",
+                    "park": "tdl" if i % 2 else "tds",
+                    "area": ["ワールドバザール", "Mediterranean Harbor"][i % 2],
+                    "availability": (
+                        {"start_date": "2025-01-01", "end_date": "2025-06-30"}
+                        if i % 5 == 0
+                        else {"start_date": "2025-07-01"} if i % 5 == 1 else None
+                    ),
+                }
+            ]
+            + ([{"id": "9", "name": "Second", "park": "tds", "area": None}] if i % 6 == 0 else []),
+        }
+        for i in range(40)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    """SQLite store and in-memory snapshot of the same data"""
+    snapshot = MenuSnapshot(menus=make_menus(), version="v1").warm()
+    path = tmp_path / "menus.sqlite"
+    write_sqlite_store(snapshot, path)
+    store = SQLiteMenuStore.open(path, "v1")
+    yield snapshot, store
+    store.close()
+
+
+@pytest.fixture
+def data_file():
+    """Copy of the shipped dataset inside data/ (the loader only reads from data/)"""
+    path = Path("data/sqlite_test.json")
+    shutil.copyfile("data/menus.json", path)
+    yield path
+    for p in (path, sqlite_store_path(path), path.with_suffix(".snapshot")):
+        if p.exists():
+            p.unlink()
+
+
+class TestSQLiteMenuStore:
+    """Tests for importing and opening the SQLite store"""
+
+    def test_schema(self, store, tmp_path):
+        """Test tables, indexes and the FTS5 table exist"""
+        _, store = store
+        connection = sqlite3.connect(tmp_path / "menus.sqlite")
+        names = {name for (name,) in connection.execute("SELECT name FROM sqlite_master")}
+        connection.close()
+        for name in (
+            "menus",
+            "menu_restaurants",
+            "menu_tags",
+            "menu_characters",
+            "menu_availability",
+            "menu_terms",
+            "menu_fts",
+        ):
+            assert name in names
+        for name in ("menus_price", "menu_restaurants_park", "menu_restaurants_area", "menus_category"):
+            assert name in names
+        assert store.fts
+
+    def test_open_rejects_stale_or_missing(self, store, tmp_path):
+        """Test a version mismatch or missing file returns None"""
+        assert SQLiteMenuStore.open(tmp_path / "menus.sqlite", "v2") is None
+        assert SQLiteMenuStore.open(tmp_path / "missing.sqlite", "v1") is None
+        (tmp_path / "broken.sqlite").write_bytes(b"not a database")
+        assert SQLiteMenuStore.open(tmp_path / "broken.sqlite", "v1") is None
+
+    def test_open_rejects_other_code(self, store, tmp_path):
+        """Test a store written by different normalization/ranking code is not reused"""
+        with patch("api.sqlite_store.index_code_fingerprint", return_value="other"):
+            assert SQLiteMenuStore.open(tmp_path / "menus.sqlite", "v1") is None
+        reopened = SQLiteMenuStore.open(tmp_path / "menus.sqlite", "v1")
+        assert reopened is not None
+        reopened.close()
+
+    def test_total_beyond_last_page(self, store):
+        """Test the total is reported for pages past the end"""
+        snapshot, store = store
+        assert store.search(MenuQuery(offset=1000)) == ([], 40)
+        assert store.search(MenuQuery(q="存在しない", offset=50)) == ([], 0)
+
+
+class TestConformance:
+    """The SQLite backend must return exactly what the in-memory backend returns"""
+
+    QUERIES = [
+        MenuQuery(),
+        MenuQuery(q="mickey"),
+        MenuQuery(q="MiC"),
+        MenuQuery(q="hot"),
+        MenuQuery(q='"hot"'),
+        MenuQuery(q="ピ"),
+        MenuQuery(q="ミッキーパ"),
+        MenuQuery(q="%"),
+        MenuQuery(q="ぴざ"),
+        MenuQuery(q="ﾐｯｷｰﾊﾟ"),
+        MenuQuery(q="ｍｉｃｋｅｙ"),
+        MenuQuery(tags=("カレー",)),
+        MenuQuery(tags=("カレー", "ピザ")),
+        MenuQuery(tags=("カレー", "新作", "存在しない")),
+        MenuQuery(categories=("main_dish", "dessert")),
+        MenuQuery(categories=("other",)),
+        MenuQuery(park="tds"),
+        MenuQuery(area="バザー"),
+        MenuQuery(area="harbor"),
+        MenuQuery(restaurant="restaurant 1"),
+        MenuQuery(restaurant="SECOND"),
+        MenuQuery(character="minnie"),
+        MenuQuery(character="みっきー"),
+        MenuQuery(min_price=0, max_price=0),
+        MenuQuery(min_price=500),
+        MenuQuery(max_price=700),
+        MenuQuery(only_available=True),
+        MenuQuery(check_date=date(2025, 3, 1)),
+        MenuQuery(check_date=date(2025, 7, 1)),
+        MenuQuery(park="tdl", q="curry", min_price=100, check_date=date(2025, 3, 1)),
+    ]
+
+    @pytest.mark.parametrize("query", QUERIES)
+    def test_queries_match(self, store, query):
+        """Test filters, sorts and totals match the in-memory backend"""
+        snapshot, store = store
+        for sort, reverse in product([None, "price", "name", "scraped_at", "relevance"], [False, True]):
+            sorted_query = query._replace(sort=sort, reverse=reverse, limit=100)
+            assert store.search(sorted_query) == search_snapshot(snapshot, sorted_query)
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            MenuQuery(limit=9),
+            MenuQuery(sort="price", reverse=True, limit=9),
+            MenuQuery(sort="name", park="tdl", limit=4),
+            MenuQuery(sort="scraped_at", limit=9),
+            MenuQuery(sort="relevance", q="curry", limit=2),
+        ],
+    )
+    def test_cursor_pages_match(self, store, query):
+        """Test keyset pages and their cursor keys match the in-memory backend"""
+        snapshot, store = store
+        after = None
+        while True:
+            bodies, total, last_key = store.search_json(query._replace(after=after))
+            positions, expected_total = search_positions(snapshot, query._replace(after=after))
+            assert (bodies, total) == (snapshot.menu_json(positions), expected_total)
+            if not len(positions):
+                assert last_key is None
+                break
+            last = int(positions[-1])
+            assert last_key == (snapshot.sort_value(last, query.sort, query.q), last)
+            after = last_key
+
+    def test_mismatched_cursor_is_rejected(self, store):
+        """Test a cursor key that does not match the stored row is rejected"""
+        _, store = store
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            store.search_json(MenuQuery(sort="price", after=(-1, 0)))
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            store.search_json(MenuQuery(after=(None, 10**6)))
+
+    def test_search_json_matches_menu_json(self, store):
+        """Test stored rows are byte-identical to the snapshot's pre-serialized menus"""
+        snapshot, store = store
+        query = MenuQuery(sort="name", limit=100)
+        bodies, total, _ = store.search_json(query)
+        positions, expected_total = search_positions(snapshot, query)
+        assert (bodies, total) == (snapshot.menu_json(positions), expected_total)
+
+    def test_pagination_matches(self, store):
+        """Test LIMIT/OFFSET pages match list slicing"""
+        snapshot, store = store
+        for offset, limit in product([0, 3, 39, 40], [1, 7, 50]):
+            query = MenuQuery(sort="price", reverse=True, offset=offset, limit=limit)
+            assert store.search(query) == search_snapshot(snapshot, query)
+
+    def test_without_fts(self, store):
+        """Test the instr() fallback gives the same results as the FTS5 path"""
+        snapshot, store = store
+        store.fts = False
+        for q in ("mickey", "ミッキーパ", "curry"):
+            assert store.search(MenuQuery(q=q)) == search_snapshot(snapshot, MenuQuery(q=q))
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/api/menus",
+            "/api/menus?limit=100",
+            "/api/menus?q=ミッキー&sort=price&order=desc",
+            "/api/menus?q=ﾁｮｺﾚｰﾄ&area=ふぁんたじー",
+            "/api/menus?q=カレー&limit=100&sort=name",
+            "/api/menus?q=みっきー&sort=relevance&page=2&limit=5",
+            "/api/menus?park=tds&sort=name&page=2",
+            "/api/menus?tags=カレー,ピザ&park=tdl&sort=scraped_at&order=desc",
+            "/api/menus?categories=dessert,drink&min_price=300&max_price=800",
+            "/api/menus?area=アドベンチャー&limit=100",
+            "/api/menus?restaurant=レストラン&character=ミッキー",
+            "/api/menus?only_available=true&limit=100&sort=price",
+            "/api/menus?date=2025-12-01&limit=100",
+            "/api/menus?page=1000",
+        ],
+    )
+    def test_api_responses_are_byte_identical(self, data_file, url):
+        """Test /menus responses are byte-identical for the json and sqlite backends"""
+        from api import index
+
+        client = TestClient(index.app)
+        responses = []
+        for backend in ("json", "sqlite"):
+            loader = MenuDataLoader(data_path=str(data_file), use_binary_snapshot=False, backend=backend)
+            with patch.object(index, "loader", loader):
+                response = client.get(url)
+                responses.append((response.status_code, response.content))
+        assert responses[0] == responses[1]
+
+
+class TestLoaderBackend:
+    """Tests for MenuDataLoader(backend="sqlite")"""
+
+    def test_imports_and_reuses_store(self, data_file):
+        """Test the store is imported once and reused while menus.json is unchanged"""
+        loader = MenuDataLoader(data_path=str(data_file), use_binary_snapshot=False, backend="sqlite")
+        loader.load_snapshot()
+        assert loader._store is not None
+        assert loader._store.version == loader.load_snapshot().version
+        mtime = loader.sqlite_path.stat().st_mtime_ns
+
+        other = MenuDataLoader(data_path=str(data_file), use_binary_snapshot=False, backend="sqlite")
+        other.load_snapshot()
+        assert loader.sqlite_path.stat().st_mtime_ns == mtime
+
+    def test_reimports_when_data_changes(self, data_file):
+        """Test a changed menus.json is imported again on reload"""
+        loader = MenuDataLoader(data_path=str(data_file), use_binary_snapshot=False, backend="sqlite")
+        loader.load_snapshot()
+        data_file.write_text(json.dumps([{"id": "0001", "name": "x"}]), encoding="utf-8")
+        snapshot = loader.load_snapshot(force_reload=True)
+        assert loader._store.version == snapshot.version
+        assert loader.search_menus(MenuQuery()) == ([{"id": "0001", "name": "x"}], 1)
+
+    def test_closes_replaced_store(self, data_file):
+        """Test the previous store is closed once its snapshot is released, and close() closes the current one"""
+        loader = MenuDataLoader(data_path=str(data_file), use_binary_snapshot=False, backend="sqlite")
+        snapshot = loader.load_snapshot()
+        old_store = loader._store
+        data_file.write_text(json.dumps([{"id": "0001", "name": "x"}]), encoding="utf-8")
+        loader.load_snapshot(force_reload=True)
+        # A request still holding the old snapshot can keep using the old store
+        assert old_store.search(MenuQuery(limit=1))[1] == len(snapshot.menus)
+
+        del snapshot
+        gc.collect()
+        with pytest.raises(sqlite3.ProgrammingError):
+            old_store.search(MenuQuery(limit=1))
+
+        current = loader._store
+        loader.close()
+        assert loader._store is None
+        with pytest.raises(sqlite3.ProgrammingError):
+            current.search(MenuQuery(limit=1))
+
+    def test_falls_back_when_store_cannot_be_written(self, data_file):
+        """Test the in-memory backend is used if the store cannot be created"""
+        loader = MenuDataLoader(data_path=str(data_file), use_binary_snapshot=False, backend="sqlite")
+        with patch("api.data_loader.write_sqlite_store", side_effect=OSError("read-only file system")):
+            snapshot = loader.load_snapshot()
+        assert loader._store is None
+        assert loader.search_menus(MenuQuery(limit=3)) == search_snapshot(snapshot, MenuQuery(limit=3))
+
+    def test_invalid_backend(self):
+        """Test unknown backends are rejected"""
+        with pytest.raises(ValueError):
+            MenuDataLoader(backend="postgres")
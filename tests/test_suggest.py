@@ -0,0 +1,91 @@
+"""Tests for api/suggest.py"""
+
+import pytest
+
+from api.data_loader import MenuDataLoader
+from api.normalization import normalize_search_text
+from api.snapshot import MenuSnapshot
+from api.suggest import build_suggest_index, suggest
+
+
+@pytest.fixture(scope="module")
+def real_snapshot():
+    """Snapshot of the bundled dataset"""
+    snapshot = MenuDataLoader(use_binary_snapshot=False).load_snapshot()
+    if not snapshot.menus:
+        pytest.skip("Menu data file not found")
+    return snapshot
+
+
+class TestSuggestIndex:
+    """Tests for the prefix index"""
+
+    def test_prefix_match_and_order(self):
+        """Test completions are prefix matches ordered by count, then type"""
+        index = build_suggest_index(
+            {
+                "menu": {"カレーパン": 1, "チキンカレー": 5},
+                "tag": {"カレー": 3, "カクテル": 3},
+                "restaurant": {"カフェ": 3},
+            }
+        )
+        assert suggest(index, "か", 10) == [
+            {"text": "カフェ", "type": "restaurant", "count": 3},
+            {"text": "カクテル", "type": "tag", "count": 3},
+            {"text": "カレー", "type": "tag", "count": 3},
+            {"text": "カレーパン", "type": "menu", "count": 1},
+        ]
+        assert [s["text"] for s in suggest(index, "カレ", 1)] == ["カレー"]
+        assert suggest(index, "ちきん", 10)[0]["text"] == "チキンカレー"
+        assert suggest(index, "パン", 10) == []
+
+    def test_normalised_prefix(self):
+        """Test the prefix is normalised like q"""
+        index = build_suggest_index({"character": {"ミッキーマウス": 2}, "menu": {"Pizza": 1}})
+        for prefix in ("みっきー", "ﾐｯｷｰ", "ミッキ-", "ミッキーマウス"):
+            assert [s["text"] for s in suggest(index, prefix, 5)] == ["ミッキーマウス"], prefix
+        assert [s["text"] for s in suggest(index, "ｐＩ", 5)] == ["Pizza"]
+        assert suggest(index, "", 5) == []
+
+    def test_duplicates_keep_specific_type(self):
+        """Test a string that is both a restaurant and a tag is suggested once as a restaurant"""
+        index = build_suggest_index({"tag": {"カフェ": 4}, "restaurant": {"カフェ": 4}})
+        assert suggest(index, "カ", 5) == [{"text": "カフェ", "type": "restaurant", "count": 4}]
+
+
+class TestSnapshotSuggest:
+    """Tests for MenuSnapshot.suggest on the bundled dataset"""
+
+    @pytest.mark.parametrize("prefix", ["み", "ミッキ", "ちょこ", "ﾄﾞﾘ", "ば", "x"])
+    def test_matches_linear_scan(self, real_snapshot, prefix):
+        """Test every completion is a prefix match and the best-counted candidates come first"""
+        key = normalize_search_text(prefix)
+        results = real_snapshot.suggest(prefix, 20)
+        assert all(normalize_search_text(s["text"]).startswith(key) for s in results)
+        counts = [s["count"] for s in results]
+        assert counts == sorted(counts, reverse=True)
+
+        menu_counts = {}
+        for menu in real_snapshot.menus:
+            if normalize_search_text(menu["name"]).startswith(key):
+                menu_counts[menu["name"]] = menu_counts.get(menu["name"], 0) + 1
+        for s in results:
+            if s["type"] == "menu":
+                assert menu_counts[s["text"]] == s["count"]
+
+    def test_counts(self, real_snapshot):
+        """Test counts are the number of menus having the value"""
+        character = real_snapshot.suggest("ミッキーマウス", 1)[0]
+        assert character == {
+            "text": "ミッキーマウス",
+            "type": "character",
+            "count": sum("ミッキーマウス" in (m.get("characters") or []) for m in real_snapshot.menus),
+        }
+
+    def test_limit(self, real_snapshot):
+        """Test the number of completions is capped"""
+        assert len(real_snapshot.suggest("ミ", 3)) == 3
+
+    def test_empty_snapshot(self):
+        """Test an empty snapshot returns no completions"""
+        assert MenuSnapshot(menus=[]).suggest("ミ") == []